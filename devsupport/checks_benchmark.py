@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Measure the cost of the quality checks.
+
+PO files with a mix of typical messages (variables, accelerators, markup,
+URLs, plurals, untranslated and fuzzy units) are generated for a few sizes
+and target languages. For every checker in C{ChecksController.checker_info}:
+
+    - all units are checked, and the time spent in every check is measured;
+    - the work that L{QualityCheckMode} does when it is selected and when
+      checks are toggled in its menu is timed: checking the store, building
+      the filter index and setting the indices of the cursor. This is done
+      the first time, again without changes, after editing a few units, and
+      with a new store that finds all results in the disk cache;
+    - checking a new store in the background with several processes, the
+      way that the mode does it, until the first results arrive and until
+      all units are checked.
+
+The results are printed as a table, and can be written as JSON to compare
+runs and catch regressions.
+
+Usage: python devsupport/checks_benchmark.py [--sizes N,N] [--languages af,de]
+    [--checkers default,gnome] [--top N] [--json FILE]"""
+
+import os
+import sys
+import time
+
+
+MESSAGES = [
+    # (source, {language: target}); %(n)d is replaced with the unit number
+    (u'Open the file number %(n)d', {
+        'af': u'Maak lêer nommer %(n)d oop',
+        'de': u'Datei Nummer %(n)d öffnen',
+        'fr': u'Ouvrir le fichier numéro %(n)d',
+        'ja': u'ファイル番号 %(n)d を開く',
+    }),
+    (u'_Save %%s', {
+        'af': u'_Stoor %%s',
+        'de': u'_Speichern',
+        'fr': u'_Enregistrer %%s',
+        'ja': u'%%s を保存(_S)',
+    }),
+    (u'Visit <a href="http://example.com/%(n)d">our website</a>.', {
+        'af': u'Besoek <a href="http://example.com/%(n)d">ons webwerf</a>.',
+        'de': u'Besuchen Sie <a href="http://example.com/%(n)d">unsere Website</a>',
+        'fr': u'Visitez <a href="http://example.com/">notre site</a>.',
+        'ja': u'<a href="http://example.com/%(n)d">ウェブサイト</a>をご覧ください。',
+    }),
+    (u'Deleted %%d files in %%s.', {
+        'af': u'%%d lêers in %%s geskrap.',
+        'de': u'%%d Dateien in %%s gelöscht.',
+        'fr': u'%%s : %%d fichiers supprimés.',
+        'ja': u'%%s の %%d 個のファイルを削除しました。',
+    }),
+    (u'Are you sure you want to quit?', {
+        'af': u'Is jy seker jy wil afsluit?',
+        'de': u'Wollen Sie wirklich beenden?',
+        'fr': u'Voulez-vous vraiment quitter ?',
+        'ja': u'終了してもよろしいですか?',
+    }),
+    (u'Error: could not connect to %%s:%%d', {
+        'af': u'Fout: kon nie aan %%s:%%d koppel nie',
+        'de': u'Fehler: keine Verbindung zu %%s:%%d möglich',
+        'fr': u'erreur : connexion à %%s impossible',
+        'ja': u'エラー: %%s:%%d に接続できませんでした',
+    }),
+    (u'Press Ctrl+Q to quit "%%s"', {
+        'af': u'Druk Ctrl+Q om "%%s" af te sluit',
+        'de': u'Drücken Sie Strg+Q, um „%%s“ zu beenden',
+        'fr': u'Appuyez sur Ctrl+Q pour quitter « %%s »',
+        'ja': u'「%%s」を終了するには Ctrl+Q を押します',
+    }),
+    (u'Item %(n)d of the list\n', {
+        'af': u'Item %(n)d  van die lys',
+        'de': u'Element %(n)d der Liste\n',
+        'fr': u'Élément %(n)d de la liste\n',
+        'ja': u'リストの項目 %(n)d\n',
+    }),
+    (u'OK', {
+        'af': u'OK',
+        'de': u'OK',
+        'fr': u'OK',
+        'ja': u'OK',
+    }),
+]
+
+PLURAL = (
+    (u'%%d unit', u'%%d units'), {
+        'af': (u'%%d eenheid', u'%%d eenhede'),
+        'de': (u'%%d Einheit', u'Einheiten'),
+        'fr': (u'%%d unité', u'%%d unités'),
+        'ja': (u'%%d 個のユニット',),
+    }
+)
+
+PLURAL_FORMS = {
+    'af': 'nplurals=2; plural=(n != 1);',
+    'de': 'nplurals=2; plural=(n != 1);',
+    'fr': 'nplurals=2; plural=(n > 1);',
+    'ja': 'nplurals=1; plural=0;',
+}
+
+
+def generate_po(filename, count, language):
+    """Write a PO file with C{count} units translated into C{language}."""
+    from translate.misc.multistring import multistring
+    from translate.storage import po
+    store = po.pofile()
+    header = store.init_headers(charset='UTF-8', encoding='8bit', language=language)
+    header.target = header.target.replace(u'Plural-Forms: nplurals=INTEGER; plural=EXPRESSION;',
+            u'Plural-Forms: %s' % (PLURAL_FORMS.get(language, PLURAL_FORMS['af'])))
+    for i in xrange(count):
+        params = {'n': i}
+        if i % 13 == 12:
+            sources, targets = PLURAL
+            unit = store.addsourceunit(multistring([source % params for source in sources]))
+            targets = targets.get(language, targets['af'])
+            unit.target = multistring([target % params for target in targets])
+        else:
+            source, targets = MESSAGES[i % len(MESSAGES)]
+            unit = store.addsourceunit(source % params)
+            if i % 7 != 3:
+                unit.target = targets.get(language, targets['af']) % params
+        unit.addlocation('src/file%d.c:%d' % (i % 100, i))
+        if i % 11 == 5:
+            unit.markfuzzy(True)
+    f = open(filename, 'w')
+    f.write(str(store))
+    f.close()
+
+def get_checker_name(code):
+    return code or 'default'
+
+def make_checker(checker_class, language):
+    checker = checker_class()
+    checker.config.updatetargetlanguage(language)
+    return checker
+
+def timed(func, *args):
+    start = time.time()
+    result = func(*args)
+    return time.time() - start, result
+
+
+def time_checks(checker, units):
+    """Run C{checker} over C{units} and measure the time spent in every
+        check.
+
+        @returns: The total time, and a dictionary mapping check names to
+            their time and number of failures."""
+    times = {}
+    failures = {}
+    run_test = checker.run_test
+    def timed_run_test(test, unit):
+        start = time.time()
+        try:
+            return run_test(test, unit)
+        finally:
+            times[test.__name__] = times.get(test.__name__, 0.0) + time.time() - start
+    checker.run_test = timed_run_test
+
+    start = time.time()
+    for unit in units:
+        for name in checker.run_filters(unit):
+            failures[name] = failures.get(name, 0) + 1
+    total = time.time() - start
+    del checker.run_test
+
+    checks = {}
+    for name in times:
+        checks[name] = {'seconds': times[name], 'failures': failures.get(name, 0)}
+    return total, checks
+
+def time_mode_cycle(filename, checker_class, language):
+    """Time the steps of QualityCheckMode on a new store: selecting the mode
+        and toggling every failing check on and then off again in the menu.
+
+        @returns: A dictionary mapping step names to seconds."""
+    from virtaal.controllers.cursor import Cursor
+    from virtaal.models.storemodel import StoreModel
+    store = StoreModel(filename, None)
+    checker = make_checker(checker_class, language)
+    cursor = Cursor(store, [])
+    results = {}
+
+    def select():
+        # QualityCheckMode._prepare_stats() and update_indices()
+        checks = store.update_checks(checker)
+        filter_index = store.get_filter_index()
+        names = [name for name, indices in checks.iteritems() if indices]
+        cursor.indices = filter_index.get_all()
+        return filter_index, names
+
+    def toggle(filter_index, filter_checks):
+        # QualityCheckMode._on_check_menuitem_toggled()
+        indices = filter_index.union(filter_checks)
+        if not indices:
+            indices = filter_index.get_all()
+        cursor.indices = indices
+
+    results['select'], (filter_index, names) = timed(select)
+
+    start = time.time()
+    for i in xrange(len(names)):
+        toggle(filter_index, names[:i+1])
+    for i in xrange(len(names), 0, -1):
+        toggle(filter_index, names[:i-1])
+    results['toggle'] = (time.time() - start) / max(2 * len(names), 1)
+
+    results['select again'], result = timed(select)
+
+    # A few edits make their units stale
+    indices = range(0, len(store), max(len(store) / 10, 1))
+    store.set_targets(indices, [u'Changed %d.' % (index) for index in indices])
+    results['select after edits'], result = timed(select)
+    return results
+
+def time_background_select(filename, checker_class, language):
+    """Time checking a new store in the background, as QualityCheckMode does
+        when it is selected, by running the main loop until all units are
+        checked."""
+    import gobject
+    from virtaal.models.storemodel import StoreModel
+    store = StoreModel(filename, None)
+    progress = []
+    done = []
+    store.connect('checks-progress', lambda store, fraction: progress.append(time.time()))
+    store.connect('checks-updated', lambda store: done.append(time.time()))
+
+    context = gobject.main_context_default()
+    # Make sure that we wake up regularly, even if nothing else happens
+    poll_id = gobject.timeout_add(20, lambda: True)
+    start = time.time()
+    try:
+        store.update_checks(make_checker(checker_class, language), background=True)
+        returned = time.time()
+        while not done:
+            context.iteration(True)
+    finally:
+        gobject.source_remove(poll_id)
+    return {
+        'select (background, returns)': returned - start,
+        'select (background, first results)': (progress and progress[0] or done[0]) - start,
+        'select (background, all results)': done[0] - start,
+    }
+
+def time_cached_select(filename, checker_class, language, cache_dir):
+    """Time selecting QualityCheckMode for a new store, first while filling
+        an empty disk cache of check results, and then with all results in
+        the cache."""
+    from virtaal.common import pan_app
+    from virtaal.models import checkcache
+    from virtaal.models.storemodel import StoreModel
+    results = {}
+    cache_filename = os.path.join(cache_dir, 'checkcache.db')
+    if os.path.exists(cache_filename):
+        os.remove(cache_filename)
+    pan_app.CHECK_CACHE = True
+    checkcache._cache = checkcache.CheckCache(cache_filename)
+    try:
+        for step in ('select (filling cache)', 'select (cached)'):
+            store = StoreModel(filename, None)
+            results[step], result = timed(store.update_checks, make_checker(checker_class, language))
+    finally:
+        pan_app.CHECK_CACHE = False
+        checkcache._cache = None
+    return results
+
+
+def print_results(results, top):
+    for result in results:
+        print
+        print '%s, %d units, %s: %.3fs for all checks' % (
+            result['checker'], result['units'], result['language'], result['seconds']
+        )
+        checks = sorted(result['checks'].iteritems(), key=lambda item: item[1]['seconds'], reverse=True)
+        print '    %-22s %9s %14s %7s %9s' % ('check', 'seconds', 'ms/1000 units', 'share', 'failures')
+        for name, check in checks[:top]:
+            print '    %-22s %9.4f %14.2f %6.1f%% %9d' % (
+                name, check['seconds'], check['seconds'] * 1000000.0 / max(result['units'], 1),
+                check['seconds'] * 100.0 / max(result['seconds'], 1e-9), check['failures']
+            )
+        if len(checks) > top:
+            print '    (%d more checks)' % (len(checks) - top)
+        steps = (
+            'select', 'toggle', 'select again', 'select after edits',
+            'select (background, returns)', 'select (background, first results)',
+            'select (background, all results)', 'select (filling cache)', 'select (cached)',
+        )
+        for step in steps:
+            print '    %-52s %9.4fs' % ('QualityCheckMode: ' + step, result['mode'][step])
+
+
+def main(argv):
+    from optparse import OptionParser
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("--sizes", dest="sizes", default="1000,10000",
+            help="comma separated numbers of units of the generated files (default: %default)")
+    parser.add_option("--languages", dest="languages", default="af,de,fr,ja",
+            help="comma separated target languages of the generated files (default: %default)")
+    parser.add_option("--checkers", dest="checkers", default="",
+            help="comma separated checker codes to measure, with 'default' for the standard checker (default: all)")
+    parser.add_option("--top", dest="top", type="int", default=10,
+            help="number of the slowest checks to show for every run (default: %default)")
+    parser.add_option("--json", dest="json",
+            help="also write the results to this file as JSON")
+    options, args = parser.parse_args(argv[1:])
+
+    topdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, topdir)
+    from translate.__version__ import sver as toolkit_version
+    from translate.storage import factory
+    from virtaal.common import pan_app
+    from virtaal.controllers.checkscontroller import get_checker_info
+    # Don't use (or fill) the check result and snapshot caches of the user
+    pan_app.CHECK_CACHE = False
+    pan_app.SNAPSHOT_CACHE = False
+    # The background checks report their results from worker threads
+    import gobject
+    gobject.threads_init()
+
+    checker_info = get_checker_info()
+    codes = sorted(checker_info, key=get_checker_name)
+    if options.checkers:
+        names = options.checkers.split(',')
+        codes = [code for code in codes if get_checker_name(code) in names]
+    sizes = [int(size) for size in options.sizes.split(',')]
+    languages = options.languages.split(',')
+
+    import shutil
+    import tempfile
+    tempdir = tempfile.mkdtemp()
+    results = []
+    try:
+        for size in sizes:
+            for language in languages:
+                filename = os.path.join(tempdir, '%s-%d.po' % (language, size))
+                print 'Generating %d units in %s' % (size, filename)
+                generate_po(filename, size, language)
+                units = [unit for unit in factory.getobject(filename).units if not unit.isheader()]
+                for code in codes:
+                    checker_class = checker_info[code]
+                    seconds, checks = time_checks(make_checker(checker_class, language), units)
+                    mode = time_mode_cycle(filename, checker_class, language)
+                    mode.update(time_background_select(filename, checker_class, language))
+                    mode.update(time_cached_select(filename, checker_class, language, tempdir))
+                    results.append({
+                        'checker': get_checker_name(code),
+                        'language': language,
+                        'units': len(units),
+                        'seconds': seconds,
+                        'checks': checks,
+                        'mode': mode,
+                    })
+                    sys.stdout.write('.')
+                    sys.stdout.flush()
+                print
+    finally:
+        shutil.rmtree(tempdir)
+
+    print_results(results, options.top)
+    if options.json:
+        try:
+            import simplejson as json
+        except ImportError:
+            import json
+        f = open(options.json, 'w')
+        json.dump({
+            'toolkit': toolkit_version,
+            'python': sys.version.split()[0],
+            'results': results,
+        }, f, indent=1, sort_keys=True)
+        f.close()
+        print 'Results written to %s' % (options.json)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
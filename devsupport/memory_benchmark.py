@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Measure the memory used per unit for keeping the editing state of units.
+
+A PO file with many units is generated, and every unit is then "visited" the
+way the UnitController does it: once with the state stored as attributes on
+the toolkit units (as Virtaal used to do), and once with the state kept in an
+L{EditStateTable}. Every measurement runs in its own process, so that memory
+freed by one doesn't hide the cost of the next.
+
+Usage: python devsupport/memory_benchmark.py [--units N] [FILE.po]"""
+
+import gc
+import os
+import subprocess
+import sys
+
+
+STATE_NAMES = {
+    -100: 'Obsolete',
+    0: 'Untranslated',
+    30: 'Needs work',
+    60: 'Rejected',
+    80: 'Needs review',
+    100: 'Translated',
+    120: 'Reviewed',
+}
+
+
+def get_rss():
+    """Return the resident memory of this process in bytes."""
+    try:
+        statm = open('/proc/self/statm').read().split()
+        return int(statm[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        import resource
+        # Peak usage only, but good enough if we measure in a fresh process
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            return maxrss
+        return maxrss * 1024
+
+def generate_po(filename, count):
+    f = open(filename, 'w')
+    f.write('msgid ""\nmsgstr ""\n"Content-Type: text/plain; charset=UTF-8\\n"\n\n')
+    for i in xrange(count):
+        f.write('#: src/file%d.c:%d\n' % (i % 100, i))
+        f.write('msgid "Source string number %d"\n' % (i))
+        if i % 3:
+            f.write('msgstr "Target string number %d"\n\n' % (i))
+        else:
+            f.write('msgstr ""\n\n')
+    f.close()
+
+
+def visit_with_attributes(units):
+    """The way units used to be prepared for editing and finished."""
+    from translate.storage import workflow
+    for unit in units:
+        unit._modified = False
+        unit._state_sticky = False
+        unit._current_state = unit.get_state_n()
+        unit._workflow = workflow.create_unit_workflow(unit, STATE_NAMES)
+        unit._workflow.reset(unit, init_state=STATE_NAMES[unit.get_state_id()])
+        # unit-done
+        del unit._modified
+        del unit._state_sticky
+        del unit._current_state
+
+def visit_with_table(units):
+    from translate.storage import workflow
+    from virtaal.models.editstate import EditStateTable
+    states = EditStateTable(len(units))
+    for index, unit in enumerate(units):
+        states.reset(index, unit.get_state_n())
+        states.set_workflow(index, workflow.create_unit_workflow(unit, STATE_NAMES))
+        states.get_workflow(index).reset(unit, init_state=STATE_NAMES[unit.get_state_id()])
+        # unit-done
+        states.clear(index)
+    return states
+
+def measure(mode, filename):
+    """Return the memory used by the parsed store and by the editing state
+        for the given mode."""
+    from translate.storage import factory
+    gc.collect()
+    start = get_rss()
+    store = factory.getobject(filename)
+    units = [unit for unit in store.units if unit.istranslatable()]
+    gc.collect()
+    parsed = get_rss()
+    # Keep the table alive until we measured it
+    table = None
+    if mode == 'attributes':
+        visit_with_attributes(units)
+    else:
+        table = visit_with_table(units)
+    gc.collect()
+    return len(units), parsed - start, get_rss() - parsed
+
+
+def main(argv):
+    from optparse import OptionParser, SUPPRESS_HELP
+    parser = OptionParser(usage="%prog [options] [file.po]")
+    parser.add_option("--units", dest="units", type="int", default=300000,
+            help="number of units in the generated file (default: %default)")
+    parser.add_option("--measure", dest="measure", help=SUPPRESS_HELP)
+    options, args = parser.parse_args(argv[1:])
+
+    if options.measure:
+        print '%d %d %d' % measure(options.measure, args[0])
+        return 0
+
+    tempdir = None
+    if args:
+        filename = args[0]
+    else:
+        import tempfile
+        tempdir = tempfile.mkdtemp()
+        filename = os.path.join(tempdir, 'benchmark.po')
+        print 'Generating %d units in %s' % (options.units, filename)
+        generate_po(filename, options.units)
+
+    try:
+        env = dict(os.environ)
+        topdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env['PYTHONPATH'] = os.pathsep.join([topdir] + filter(None, [env.get('PYTHONPATH')]))
+        print '%-12s %12s %16s %16s' % ('', 'units', 'store bytes/unit', 'state bytes/unit')
+        for mode, label in (('attributes', 'before'), ('table', 'after')):
+            output = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--measure', mode, filename],
+                stdout=subprocess.PIPE, env=env
+            ).communicate()[0]
+            count, store_bytes, state_bytes = [int(n) for n in output.split()]
+            print '%-12s %12d %16.1f %16.1f' % (
+                label, count, store_bytes / float(count), state_bytes / float(count)
+            )
+    finally:
+        if tempdir:
+            import shutil
+            shutil.rmtree(tempdir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
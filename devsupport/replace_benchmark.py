@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Measure "Replace all" on a large file.
+
+A PO file with many units is generated, and a word that occurs in every
+translated unit is replaced everywhere: once by changing every match on its
+own (the way matches used to be replaced without the unit view), and once
+with C{StoreModel.replace_matches()}. Undoing the bulk replacement and the
+size of its undo data are measured as well.
+
+Usage: python devsupport/replace_benchmark.py [--units N] [FILE.po]"""
+
+import os
+import sys
+import time
+
+
+def generate_po(filename, count):
+    f = open(filename, 'w')
+    f.write('msgid ""\nmsgstr ""\n"Content-Type: text/plain; charset=UTF-8\\n"\n\n')
+    for i in xrange(count):
+        f.write('#: src/file%d.c:%d\n' % (i % 100, i))
+        f.write('msgid "Open the file number %d"\n' % (i))
+        if i % 3:
+            f.write('msgstr "Maak die lêer nommer %d oop"\n\n' % (i))
+        else:
+            f.write('msgstr ""\n\n')
+    f.close()
+
+def find_matches(store, searchstring):
+    from translate.tools.pogrep import GrepFilter
+    grepfilter = GrepFilter(searchstring, ('target',), ignorecase=True)
+    matches, indexes = grepfilter.getmatches(store.get_units())
+    return matches
+
+def replace_each(matches, replace_str):
+    """Replace every match separately."""
+    for match in reversed(matches):
+        text = match.get_getter()()
+        match.get_setter()(text[:match.start] + replace_str + text[match.end:])
+
+def timed(func, *args):
+    start = time.time()
+    result = func(*args)
+    return time.time() - start, result
+
+
+def main(argv):
+    from optparse import OptionParser
+    parser = OptionParser(usage="%prog [options] [file.po]")
+    parser.add_option("--units", dest="units", type="int", default=100000,
+            help="number of units in the generated file (default: %default)")
+    options, args = parser.parse_args(argv[1:])
+
+    topdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, topdir)
+    from virtaal.models.storemodel import StoreModel
+
+    tempdir = None
+    if args:
+        filename = args[0]
+    else:
+        import tempfile
+        tempdir = tempfile.mkdtemp()
+        filename = os.path.join(tempdir, 'benchmark.po')
+        print 'Generating %d units in %s' % (options.units, filename)
+        generate_po(filename, options.units)
+
+    try:
+        store = StoreModel(filename, None)
+        matches = find_matches(store, u'lêer')
+        print '%d matches in %d units' % (len(matches), len(store))
+        seconds, result = timed(replace_each, matches, u'dokument')
+        print '%-24s %8.2fs' % ('replace each match', seconds)
+
+        store = StoreModel(filename, None)
+        matches = find_matches(store, u'lêer')
+        seconds, (indices, old_targets) = timed(store.replace_matches, matches, u'dokument')
+        print '%-24s %8.2fs' % ('replace_matches()', seconds)
+        undo_bytes = indices.itemsize * len(indices) + sum([sys.getsizeof(target) for target in old_targets])
+        print '%-24s %8.1f bytes/unit' % ('undo data', undo_bytes / float(max(len(indices), 1)))
+        seconds, result = timed(store.set_targets, indices, old_targets)
+        print '%-24s %8.2fs' % ('undo', seconds)
+        assert not find_matches(store, u'dokument')
+    finally:
+        if tempdir:
+            import shutil
+            shutil.rmtree(tempdir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -105,6 +105,7 @@ options = {
     ] + mo_files,
     'scripts': [
         "bin/virtaal",
+        "bin/virtaal-pretranslate",
     ],
     'packages': [
         "virtaal",
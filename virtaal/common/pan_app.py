@@ -64,6 +64,9 @@ DEBUG = True # Enable debugging by default, while bin/virtaal still disables it
              # This means that if Virtaal (or parts thereof) is run in some other strange way,
              # debugging is enabled.
 
+SNAPSHOT_CACHE = True # Keep snapshots of parsed files to speed up reopening them.
+CHECK_CACHE = True # Keep the quality check results of units to avoid checking them again.
+
 
 x_generator = 'Virtaal ' + ver
 default_config_name = u"virtaal.ini"
@@ -132,7 +135,29 @@ def get_default_font():
 
     return default_font
 
-defaultfont = get_default_font()
+_default_font = None
+
+def get_cached_default_font():
+    """Return the result of L{get_default_font()}, which is only looked up
+        the first time, because it needs gtk."""
+    global _default_font
+    if _default_font is None:
+        _default_font = get_default_font()
+    return _default_font
+
+
+class LanguageSettings(dict):
+    """The language settings. Fonts that are not set default to the
+        monospace font of the desktop, which is only looked up when a font is
+        asked for, so that tools without a GUI can use the settings."""
+
+    FONT_KEYS = ('sourcefont', 'targetfont')
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if not value and key in self.FONT_KEYS:
+            value = get_cached_default_font()
+        return value
 
 
 class Settings:
@@ -150,17 +175,19 @@ class Settings:
         "maximized": '',
         "windowwidth": 796,
         "windowheight": 544,
+        "snapshotcachesize": 256,
+        "checkcachesize": 200000,
     }
-    language =      {
+    language =      LanguageSettings({
         "nplurals": 0,
         "plural": None,
         "recentlangs": "",
-        "sourcefont": defaultfont,
+        "sourcefont": "",
         "sourcelang": "en",
-        "targetfont": defaultfont,
+        "targetfont": "",
         "targetlang": None,
         "uilang": "",
-    }
+    })
     placeable_state = {
         "altattrplaceable": "disabled",
         "fileplaceable": "disabled",
@@ -205,26 +232,21 @@ class Settings:
         for key, value in self.config.items("undo"):
             self.undo[key] = value
 
-        # Make sure we have some kind of font names to work with
-        for font in ('sourcefont', 'targetfont'):
-            if not self.language[font]:
-                self.language[font] = defaultfont
-
     def write(self):
         """Write the configuration file."""
 
         # Don't save the default font to file
-        fonts = (self.language['sourcefont'], self.language['targetfont'])
-        for font in ('sourcefont', 'targetfont'):
-            if self.language[font] == defaultfont:
+        fonts = [dict.__getitem__(self.language, font) for font in LanguageSettings.FONT_KEYS]
+        for font in LanguageSettings.FONT_KEYS:
+            if dict.__getitem__(self.language, font) == _default_font:
                 self.language[font] = ''
 
         for key in self.translator:
             self.config.set("translator", key, self.translator[key])
         for key in self.general:
             self.config.set("general", key, self.general[key])
-        for key in self.language:
-            self.config.set("language", key, self.language[key])
+        for key, value in self.language.iteritems():
+            self.config.set("language", key, value)
         for key in self.placeable_state:
             self.config.set("placeable_state", key, self.placeable_state[key])
         for key in self.plugin_state:
@@ -19,6 +19,8 @@
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import threading
+from collections import OrderedDict
 from gobject import SIGNAL_RUN_FIRST, timeout_add, PRIORITY_LOW
 
 from virtaal.common import GObjectWrapper
@@ -76,6 +78,26 @@ check_names = {
 #  -  isreview
 }
 
+_checker_info = None
+
+def get_checker_info():
+    """Return the checker classes that can be chosen, by checker code (the
+        project style of a file)."""
+    global _checker_info
+    if not _checker_info:
+        from translate.filters import checks
+        _checker_info = {
+            # XXX: Add other checkers below with a localisable string as key
+            #      (used on the GUI) and a checker class as the value.
+            None:    checks.StandardChecker,
+            'openoffice': checks.OpenOfficeChecker,
+            'mozilla':    checks.MozillaChecker,
+            'drupal':     checks.DrupalChecker,
+            'gnome':      checks.GnomeChecker,
+            'kde':        checks.KdeChecker,
+        }
+    return _checker_info
+
 
 class ChecksController(BaseController):
     """Controller for quality checks."""
@@ -88,6 +110,8 @@ class ChecksController(BaseController):
 
     CHECK_TIMEOUT = 500
     """Time to wait before performing checks on the current unit."""
+    RESULT_CACHE_SIZE = 1000
+    """The number of recent unit check results kept in memory."""
 
     # INITIALIZERS #
     def __init__(self, main_controller):
@@ -98,6 +122,7 @@ class ChecksController(BaseController):
         self.store_controller = main_controller.store_controller
 
         main_controller.store_controller.connect('store-loaded', self._on_store_loaded)
+        main_controller.store_controller.connect('store-closed', self._on_store_closed)
         main_controller.unit_controller.connect('unit-modified', self._on_unit_modified)
         if main_controller.lang_controller:
             main_controller.lang_controller.connect('target-lang-changed', self._on_target_lang_changed)
@@ -118,10 +143,15 @@ class ChecksController(BaseController):
               "drupal": _('Drupal'),
         }
         self._checker_name_to_code = dict([(value, key) for (key, value) in self._checker_code_to_name.items()])
-        self._checker_info = None
         self._checker_menu_items = {}
-        self._cursor_connection = ()
+        self._cursor_connections = []
         self.last_unit = None
+        self.last_failures = None
+        # Units are checked in a worker thread with a checker of its own
+        self._check_jobs = {}
+        self._check_lock = threading.Lock()
+        self._worker_checker = None
+        self._results = OrderedDict()
 
         self._projview = None
         self._unitview = None
@@ -132,19 +162,7 @@ class ChecksController(BaseController):
 
     # ACCESSORS #
     def _get_checker_info(self):
-        if not self._checker_info:
-            from translate.filters import checks
-            self._checker_info = {
-                # XXX: Add other checkers below with a localisable string as key
-                #      (used on the GUI) and a checker class as the value.
-                None:    checks.StandardChecker,
-                'openoffice': checks.OpenOfficeChecker,
-                'mozilla':    checks.MozillaChecker,
-                'drupal':     checks.DrupalChecker,
-                'gnome':      checks.GnomeChecker,
-                'kde':        checks.KdeChecker,
-            }
-        return self._checker_info
+        return get_checker_info()
     checker_info = property(_get_checker_info)
 
     def _get_projview(self):
@@ -185,16 +203,80 @@ class ChecksController(BaseController):
 
     # METHODS #
     def check_unit(self, unit):
+        """Check C{unit} with the current checker.
+
+            Units are checked in a worker thread, so that slow checks don't
+            hold up navigation. When the result is ready, "unit-checked" is
+            emitted, and the unit view is updated if the unit is still the
+            current one. Results for text that changed in the meantime are
+            not reported. Recent results are kept by the content of the unit and the
+            checker, so that checking a unit again that did not change is
+            immediate.
+
+            @returns: The failures if they were known already, otherwise
+                C{None}."""
         checker = self.get_checker()
         if not checker:
             logging.debug('No checker instantiated :(')
             return
-        self.last_failures = checker.run_filters(unit)
-        if self.last_failures:
-            logging.debug('Failures: %s' % (self.last_failures))
-        self.unitview.update(self.last_failures)
-        self.emit('unit-checked', unit, checker, self.last_failures)
-        return self.last_failures
+        from virtaal.models.checkcache import get_cache, get_unit_hash
+        from virtaal.models.checkresults import get_checker_key
+        key = (get_checker_key(checker), get_unit_hash(unit))
+        if key in self._results:
+            failures = self._results.pop(key)
+            self._results[key] = failures
+            self._set_unit_failures(unit, checker, failures)
+            return dict(failures)
+        if key in self._check_jobs:
+            # Already being checked
+            return None
+
+        from virtaal.support.parallelchecks import make_check_units
+        from virtaal.support.thread import BackgroundJob
+        self._check_jobs[key] = BackgroundJob(
+            self._run_check, (checker.__class__, key, make_check_units([unit])[0], get_cache()),
+            on_done=lambda failures: self._on_check_done(unit, checker, key, failures),
+            on_error=lambda exc: self._on_check_error(key, exc),
+        ).start()
+
+    def _cancel_checks(self):
+        for job in self._check_jobs.values():
+            job.cancel()
+        self._check_jobs = {}
+
+    def _run_check(self, job, checker_class, key, check_unit, cache):
+        # Runs in the worker thread, with only a copy of the unit's text
+        from virtaal.models.checkresults import get_checker_key
+        from virtaal.support.parallelchecks import make_unit
+        checker_key, unit_hash = key
+        if cache is not None:
+            cached = cache.lookup(checker_key, [unit_hash])
+            if unit_hash in cached:
+                return cached[unit_hash]
+
+        self._check_lock.acquire()
+        try:
+            if job.cancelled:
+                return None
+            if self._worker_checker is None or get_checker_key(self._worker_checker) != checker_key:
+                self._worker_checker = checker_class()
+                self._worker_checker.config.updatetargetlanguage(checker_key[1])
+            failures = self._worker_checker.run_filters(make_unit(check_unit))
+        finally:
+            self._check_lock.release()
+
+        if cache is not None:
+            cache.store(checker_key, [(unit_hash, failures)])
+        return failures
+
+    def _set_unit_failures(self, unit, checker, failures):
+        if unit is self.last_unit:
+            # The unit view changes the dictionary that it gets
+            self.last_failures = dict(failures)
+            if self.last_failures:
+                logging.debug('Failures: %s' % (self.last_failures))
+            self.unitview.update(self.last_failures)
+        self.emit('unit-checked', unit, checker, dict(failures))
 
     def _check_timer_expired(self, unit):
         self._check_timer_active = False
@@ -227,7 +309,32 @@ class ChecksController(BaseController):
         if controller is main_controller.lang_controller:
             controller.connect('target-lang-changed', self._on_target_lang_changed)
 
+    def _on_check_done(self, unit, checker, key, failures):
+        self._check_jobs.pop(key, None)
+        if failures is None:
+            return
+        self._results[key] = failures
+        if len(self._results) > self.RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+        if checker is not self._checker:
+            # The checker was replaced while the unit was checked
+            return
+        from virtaal.models.checkcache import get_unit_hash
+        if get_unit_hash(unit) != key[1]:
+            # The unit changed while it was checked
+            return
+        self._set_unit_failures(unit, checker, failures)
+
+    def _on_check_error(self, key, exc):
+        self._check_jobs.pop(key, None)
+        logging.debug('Unable to check unit: %s' % (exc))
+
     def _on_cursor_changed(self, cursor):
+        # A check of the unit that was left still updates the store
+        self.last_unit = cursor.deref()
+
+    def _on_cursor_settled(self, cursor):
+        # Only check the unit that the user stopped at
         self.last_unit = cursor.deref()
         self.check_unit(self.last_unit)
 
@@ -241,14 +348,18 @@ class ChecksController(BaseController):
 
     def _on_store_loaded(self, store_controller):
         self.set_checker_by_code(store_controller.store._trans_store.getprojectstyle())
-        if self._cursor_connection:
-            widget, connect_id = self._cursor_connection
+        for widget, connect_id in self._cursor_connections:
             widget.disconnect(connect_id)
-        self._cursor_connection = (
-            store_controller.cursor,
-            store_controller.cursor.connect('cursor-changed', self._on_cursor_changed)
-        )
-        self._on_cursor_changed(store_controller.cursor)
+        cursor = store_controller.cursor
+        self._cursor_connections = [
+            (cursor, cursor.connect('cursor-changed', self._on_cursor_changed)),
+            (cursor, cursor.connect('cursor-settled', self._on_cursor_settled)),
+        ]
+        self._on_cursor_settled(cursor)
+
+    def _on_store_closed(self, store_controller):
+        self._cancel_checks()
+        self.last_unit = None
 
     def _on_unit_modified(self, unit_controller, unit):
         self._start_check_timer()
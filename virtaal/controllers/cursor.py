@@ -19,10 +19,12 @@
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import gobject
 from gobject import SIGNAL_RUN_FIRST
-from bisect import bisect_left
+from bisect import bisect_left, insort
 
 from virtaal.common import GObjectWrapper
+from virtaal.support.bitset import Bitset
 
 
 class Cursor(GObjectWrapper):
@@ -31,6 +33,11 @@ class Cursor(GObjectWrapper):
 
     NOTE: Assigning to C{self.pos} causes the "cursor-changed" signal
     to be emitted.
+
+    If the cursor has a settle delay, "cursor-settled" is emitted once the
+    cursor did not move for that long. Expensive work for the current item
+    should wait for that, so that it isn't done for every item that is
+    passed while moving quickly.
     """
 
     __gtype_name__ = "Cursor"
@@ -38,23 +45,34 @@ class Cursor(GObjectWrapper):
     __gsignals__ = {
         "cursor-changed": (SIGNAL_RUN_FIRST, None, ()),
         "cursor-empty":   (SIGNAL_RUN_FIRST, None, ()),
+        "cursor-settled": (SIGNAL_RUN_FIRST, None, ()),
     }
 
 
     # INITIALIZERS #
-    def __init__(self, model, indices, circular=True):
+    def __init__(self, model, indices, circular=True, settle_delay=0):
         """Constructor.
             @type  model: anything
             @param model: The model (usually a collection) to which the cursor is applicable.
             @type  indices: ordered collection
-            @param indices: The valid values for C{self.index}."""
+            @param indices: The valid values for C{self.index}. A L{Bitset} is
+                used as is, while other collections are copied.
+            @param settle_delay: The time (in milliseconds) that the cursor
+                has to stay in place before "cursor-settled" is emitted, or
+                C{0} to never emit it."""
         GObjectWrapper.__init__(self)
 
         self.model = model
-        self._indices = indices
+        if isinstance(indices, Bitset):
+            self._indices = indices
+        else:
+            self._indices = list(indices)
         self.circular = circular
+        self.settle_delay = settle_delay
 
         self._pos = 0
+        self._deferred_removals = set()
+        self._settle_id = 0
 
 
     # ACCESSORS #
@@ -69,7 +87,9 @@ class Cursor(GObjectWrapper):
             self._pos = 0
         else:
             self._pos = value
-        self.emit('cursor-changed')
+        if self._deferred_removals:
+            self._apply_deferred_removals()
+        self._emit_changed()
     pos = property(_get_pos, _set_pos)
 
     def _get_index(self):
@@ -83,7 +103,7 @@ class Cursor(GObjectWrapper):
         """Move the cursor to the cursor to the position specified by C{index}.
             @type  index: int
             @param index: The index that the cursor should point to."""
-        self.pos = bisect_left(self._indices, index)
+        self.pos = self._position_of(index)
     index = property(_get_index, _set_index)
 
     def _get_indices(self):
@@ -92,16 +112,29 @@ class Cursor(GObjectWrapper):
         oldindex = self.index
         oldpos = self.pos
 
-        self._indices = list(value)
+        self._deferred_removals = set()
+        if isinstance(value, Bitset):
+            # The modes build a new bitset every time, so we can keep (and
+            # change) it without a copy.
+            self._indices = value
+        else:
+            self._indices = list(value)
 
         self.index = oldindex
         if len(self._indices) == 0:
             self.emit('cursor-empty')
         if oldpos == self.pos and oldindex != self.index:
-            self.emit('cursor-changed')
+            self._emit_changed()
     indices = property(_get_indices, _set_indices)
 
     # METHODS #
+    def cancel_settle(self):
+        """Don't emit "cursor-settled" for the last move (for example because
+            the cursor is not used anymore)."""
+        if self._settle_id:
+            gobject.source_remove(self._settle_id)
+            self._settle_id = 0
+
     def deref(self):
         """Dereference the cursor to the item in the model that the cursor is
             currently pointing to.
@@ -118,17 +151,52 @@ class Cursor(GObjectWrapper):
             C{self.indices} list.
             This should only be used when absolutely necessary. Be prepared to
             deal with the consequences of using this method."""
-        oldindex = self.index
-        if index not in self.indices:
+        if isinstance(self._indices, Bitset):
+            if index not in self._indices:
+                newindices = self._indices.copy()
+                newindices.add(index)
+                self.indices = newindices
+            self.index = index
+            return
+        insert_pos = bisect_left(self.indices, index)
+        if insert_pos == len(self.indices) or self.indices[insert_pos] != index:
             newindices = list(self.indices)
-            insert_pos = bisect_left(self.indices, index)
-            if insert_pos == len(self.indices):
-                newindices.append(index)
-            else:
-                newindices.insert(insert_pos, index)
+            newindices.insert(insert_pos, index)
             self.indices = newindices
         self.index = index
 
+    def add_index(self, index):
+        """Make C{index} valid, without moving the cursor."""
+        self._deferred_removals.discard(index)
+        if self._contains(index):
+            return
+        was_empty = len(self._indices) == 0
+        oldindex = self.index
+        if isinstance(self._indices, Bitset):
+            self._indices.add(index)
+        else:
+            insort(self._indices, index)
+        if was_empty:
+            self._pos = 0
+            self._emit_changed()
+        else:
+            self._pos = self._position_of(oldindex)
+
+    def remove_index(self, index):
+        """Make C{index} invalid, without moving the cursor.
+
+            If the cursor is at C{index}, it is only removed once the cursor
+            moved away from it, so that the current unit doesn't disappear
+            while it is being worked on."""
+        if not self._contains(index):
+            return
+        if index == self.index:
+            self._deferred_removals.add(index)
+            return
+        oldindex = self.index
+        self._remove(index)
+        self._pos = self._position_of(oldindex)
+
     def move(self, offset):
         """Move the cursor C{offset} positions down.
             The cursor will wrap around to the beginning if C{circular=True}
@@ -143,3 +211,46 @@ class Cursor(GObjectWrapper):
                 self.pos = self.pos + offset + len(self._indices)
         else:
             raise IndexError()
+
+    def _emit_changed(self):
+        self.emit('cursor-changed')
+        if self.settle_delay:
+            # Every move starts waiting again
+            self.cancel_settle()
+            self._settle_id = gobject.timeout_add(self.settle_delay, self._on_settle_timeout)
+
+    def _apply_deferred_removals(self):
+        index = self._indices[self._pos]
+        for removed in self._deferred_removals:
+            if removed != index:
+                self._remove(removed)
+        self._deferred_removals &= set([index])
+        self._pos = self._position_of(index)
+
+    def _contains(self, index):
+        if isinstance(self._indices, Bitset):
+            return index in self._indices
+        pos = bisect_left(self._indices, index)
+        return pos < len(self._indices) and self._indices[pos] == index
+
+    def _remove(self, index):
+        if isinstance(self._indices, Bitset):
+            self._indices.discard(index)
+        else:
+            pos = bisect_left(self._indices, index)
+            if pos < len(self._indices) and self._indices[pos] == index:
+                del self._indices[pos]
+
+    def _position_of(self, index):
+        """Return the position of C{index} in C{self.indices}, or where it
+            would be inserted."""
+        if isinstance(self._indices, Bitset):
+            return self._indices.rank(index)
+        return bisect_left(self._indices, index)
+
+
+    # EVENT HANDLERS #
+    def _on_settle_timeout(self):
+        self._settle_id = 0
+        self.emit('cursor-settled')
+        return False
@@ -135,8 +135,10 @@ class LanguageController(BaseController):
         if not self.lang_identifier:
             from translate.lang.identify import LanguageIdentifier
             self.lang_identifier = LanguageIdentifier()
-        srccode = self.lang_identifier.identify_source_lang(store.get_units())
-        tgtcode = self.lang_identifier.identify_target_lang(store.get_units())
+        # The identifier only looks at the first few units, and wants a list
+        units = store.get_units()[:200]
+        srccode = self.lang_identifier.identify_source_lang(units)
+        tgtcode = self.lang_identifier.identify_target_lang(units)
         srclang = tgtlang = None
         if srccode:
             srclang = LanguageModel(srccode)
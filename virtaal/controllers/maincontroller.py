@@ -174,8 +174,10 @@ class MainController(BaseController):
 
 
     # METHODS #
-    def open_file(self, filename=None, uri='', forget_dir=False):
+    def open_file(self, filename=None, uri='', forget_dir=False, project_file=None):
         """Open the file given by C{filename}.
+            @param project_file: The translation file to open, if C{filename}
+                is a project bundle.
             @returns: The filename opened, or C{None} if an error has occurred."""
         # We might be a bit early for some of the other controllers, so let's
         # make it our problem and ensure the last ones are in the main
@@ -184,10 +186,13 @@ class MainController(BaseController):
             gtk.main_iteration(False)
         if filename is None:
             return self.view.open_file()
+        # A failed save marks the store as modified again
+        self.store_controller.wait_for_save()
         if self.store_controller.is_modified():
             response = self.view.show_save_confirm_dialog()
             if response == 'save':
-                if not self.save_file():
+                # Only continue once the file is really written
+                if not self.save_file(wait=True):
                     return False
             elif response == 'cancel':
                 return False
@@ -205,7 +210,7 @@ class MainController(BaseController):
                 return False
 
         try:
-            self.store_controller.open_file(filename, uri, forget_dir=forget_dir)
+            self.store_controller.open_file(filename, uri, forget_dir=forget_dir, project_file=project_file)
             self.mode_controller.refresh_mode()
             return True
         except Exception, exc:
@@ -229,8 +234,8 @@ class MainController(BaseController):
         shutil.rmtree(os.path.dirname(filename))
 
 
-    def save_file(self, filename=None, force_saveas=False):
-        # we return True on success
+    def save_file(self, filename=None, force_saveas=False, wait=False):
+        # we return True on success; with wait=True only once the file is written
         if not filename and (self.get_force_saveas() or force_saveas):
             filename = self.store_controller.get_bundle_filename()
             if filename is None:
@@ -239,20 +244,20 @@ class MainController(BaseController):
             if not filename:
                 return False
 
-        if self._do_save_file(filename):
+        if self._do_save_file(filename, wait):
             if self.get_force_saveas():
                 self.set_force_saveas(False)
             return True
         else:
             return False
 
-    def _do_save_file(self, filename=None):
+    def _do_save_file(self, filename=None, wait=False):
         """Delegate saving to the store_controller, but do error handling.
 
-        Return True on success, False otherwise."""
+        Return True on success, False otherwise. Errors of a background save
+        are only known here if C{wait} is C{True}."""
         try:
-            self.store_controller.save_file(filename)
-            return True
+            return self.store_controller.save_file(filename, wait=wait)
         except IOError, exc:
             self.show_error(
                 _("Could not save file.\n\n%(error_message)s\n\nTry saving to a different location.") % {'error_message': str(exc)}
@@ -300,10 +305,13 @@ class MainController(BaseController):
         return False
 
     def close_file(self):
+        # A failed save marks the store as modified again
+        self.store_controller.wait_for_save()
         if self.store_controller.is_modified():
             response = self.view.show_save_confirm_dialog()
             if response == 'save':
-                if not self.save_file():
+                # Only continue once the file is really written
+                if not self.save_file(wait=True):
                     return False
             elif response == 'cancel':
                 return False
@@ -328,10 +336,13 @@ class MainController(BaseController):
     def update_file(self, filename, uri=''):
         """Update the current file using the file given by C{filename} as template.
             @returns: The filename opened, or C{None} if an error has occurred."""
+        # A failed save marks the store as modified again
+        self.store_controller.wait_for_save()
         if self.store_controller.is_modified():
             response = self.view.show_save_confirm_dialog()
             if response == 'save':
-                if not self.save_file():
+                # Only continue once the file is really written
+                if not self.save_file(wait=True):
                     return False
             elif response == 'cancel':
                 return False
@@ -342,9 +353,14 @@ class MainController(BaseController):
             if not self.show_prompt(msg=promptmsg):
                 return False
 
+        fuzzymatching = self.show_prompt(
+            _("Fuzzy Matching"),
+            _("Do you want to look for similar translations for the new strings in the template? This can take a while for large files.")
+        )
+
         try:
-            self.store_controller.update_file(filename, uri)
-            self.mode_controller.refresh_mode()
+            # The mode is refreshed when the update is done
+            self.store_controller.update_file(filename, uri, fuzzymatching=fuzzymatching)
             return True
         except Exception, exc:
             import logging
@@ -358,6 +374,10 @@ class MainController(BaseController):
         """Select the specified unit in the store view."""
         self.store_controller.select_unit(unit, force)
 
+    def select_index(self, index, force=False):
+        """Select the unit at the specified model index in the store view."""
+        self.store_controller.select_index(index, force)
+
     def show_error(self, msg):
         """Shortcut for C{self.view.show_error_dialog()}"""
         return self.view.show_error_dialog(message=msg)
@@ -375,15 +395,19 @@ class MainController(BaseController):
         return self.view.show_info_dialog(title=title, message=msg)
 
     def quit(self, force=False):
+        self.store_controller.wait_for_save()
         if self.store_controller.is_modified() and not force:
             response = self.view.show_save_confirm_dialog()
             if response == 'save':
-                if not self.save_file():
-                    return False
+                # Don't quit before the file is written, or if it couldn't be
+                if not self.save_file(wait=True):
+                    return True
             elif response != 'discard':
                 return True
 
         self.view.hide()
+        # Nobody sees us wait for this any more
+        self.store_controller.save_snapshot()
         if self.plugin_controller:
             self.plugin_controller.shutdown()
         self.emit('quit')
@@ -37,6 +37,13 @@ class StoreController(BaseController):
         'store-closed': (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, ()),
     }
 
+    SETTLE_DELAY = 150
+    """The time (in milliseconds) that the cursor has to stay on a unit
+        before its "cursor-settled" signal is emitted."""
+    PROGRESSIVE_LOAD_SIZE = 4 * 1024 * 1024
+    """Translation files of at least this size (in bytes) are parsed in the
+        background and shown as their units become available."""
+
     # INITIALIZERS #
     def __init__(self, main_controller):
         GObjectWrapper.__init__(self)
@@ -48,6 +55,11 @@ class StoreController(BaseController):
         self._archivetemp = None
         self.cursor = None
         self.handler_ids = {}
+        self._load_handler_ids = []
+        self._save_handler_ids = []
+        self._update_handler_ids = []
+        self._update_dialog = None
+        self._snapshot_job = None
         self._modified = False
         self.project = None
         self.store = None
@@ -136,6 +148,8 @@ class StoreController(BaseController):
     def get_unit_celleditor(self, unit):
         """Load the given unit in via the C{UnitController} and return
             the C{gtk.CellEditable} it creates."""
+        # The unit is about to be edited
+        self.store.prepare_unit_edit(unit)
         return self.unit_controller.load_unit(unit)
 
     def is_modified(self):
@@ -148,8 +162,10 @@ class StoreController(BaseController):
         """@type unitcont: UnitController"""
         if self.unit_controller and 'unitview.unit-modified' in self.handler_ids:
             self.unit_controller.disconnect(self.handler_ids['unitview.unit-modified'])
+            self.unit_controller.disconnect(self.handler_ids['unitview.unit-done'])
         self._unit_controller = unitcont
         self.handler_ids['unitview.unit-modified'] = self.unit_controller.connect('unit-modified', self._unit_modified)
+        self.handler_ids['unitview.unit-done'] = self.unit_controller.connect('unit-done', self._unit_done)
     unit_controller = property(_get_unitcontroller, _set_unitcontroller)
 
 
@@ -162,23 +178,26 @@ class StoreController(BaseController):
             # Unit is already selected; no need to do more work
             return
 
-        i = 0
-        try:
-            # XXX: list.index() is O(n) - pretty bad in a long file if we're
-            # looking for something towards the end. Keep in mind that it
-            # calls unit.__eq__ which does a *lot* of things.
-            i = self.store.get_units().index(unit)
-            #TODO: consider replacing with API that uses index instead of unit
-        except Exception, exc:
+        i = self.store.get_unit_index(unit)
+        if i is None:
             import logging
-            logging.debug('Unit not found:\n%s' % (exc))
+            logging.debug('Unit not found:\n%s' % (unit))
+            i = 0
+        self.select_index(i, force)
 
+    def select_index(self, index, force=False):
+        """Select the unit at the given model index and scroll to it.
+            See L{select_unit()} about C{force}."""
         if force:
-            self.cursor.force_index(i)
+            self.cursor.force_index(index)
         else:
-            self.cursor.index = i
+            self.cursor.index = index
 
-    def open_file(self, filename, uri='', forget_dir=False):
+    def open_file(self, filename, uri='', forget_dir=False, project_file=None):
+        """Open the given file.
+            @param project_file: The translation file to open, if C{filename}
+                is a project bundle (by default the first one)."""
+        self.wait_for_save()
         from virtaal.models.storemodel import StoreModel
         from translate.convert import factory as convert_factory
         force_saveas = False
@@ -199,11 +218,13 @@ class StoreController(BaseController):
                 self.project.convert_forward(self.project.store.sourcefiles[0])
 
             # FIXME: Ask the user which translatable file to open?
-            transfile = self.project.get_file(self.project.store.transfiles[0])
+            if project_file is None:
+                project_file = self.project.store.transfiles[0]
+            transfile = self.project.get_file(project_file)
             self.real_filename = transfile.name
             logging.info(
                 'Editing translation file %s:%s' %
-                (filename, self.project.store.transfiles[0])
+                (filename, project_file)
             )
             self.store = StoreModel(transfile, self)
         elif extension in convert_factory.converters:
@@ -222,9 +243,14 @@ class StoreController(BaseController):
             self.store = StoreModel(transfile, self)
             force_saveas = True
         else:
-            self.store = StoreModel(filename, self)
-
-        if len(self.store.get_units()) < 1:
+            progressive = self._should_load_progressively(filename)
+            self.store = StoreModel(filename, self, progressive=progressive)
+        self._save_handler_ids = [
+            self.store.connect('saved', self._on_store_saved),
+            self.store.connect('save-failed', self._on_store_save_failed),
+        ]
+
+        if not self.store.is_loading() and len(self.store.get_units()) < 1:
             # clean up, otherwise self.store still contains the store
             self.close_file()
             raise ValueError(_('The file contains nothing to translate.'))
@@ -247,18 +273,49 @@ class StoreController(BaseController):
         self.main_controller.set_force_saveas(force_saveas)
         self.main_controller.set_saveable(self._modified)
 
-        from cursor import Cursor
-        self.cursor = Cursor(self.store, self.store.stats['total'])
+        self._create_cursor()
 
         self.view.load_store(self.store)
         self.view.show()
 
+        if self.store.is_loading():
+            # The rest happens in _on_store_finished_loading()
+            self._load_handler_ids = [
+                self.store.connect('units-added', self._on_store_units_added),
+                self.store.connect('loaded', self._on_store_finished_loading),
+                self.store.connect('load-failed', self._on_store_load_failed),
+            ]
+            return
+
+        self.store.build_search_index()
         self.emit('store-loaded')
 
-    def save_file(self, filename=None):
+    def save_file(self, filename=None, wait=False):
+        """Save the current store.
+
+            Plain translation files are written in the background: the
+            "store-saved" signal is emitted once the file was written, and
+            editing can continue in the meantime. Bundles are saved
+            immediately.
+
+            @param wait: Wait until the file was written, like before closing
+                the file or quitting.
+            @returns: C{False} if we waited and the file could not be
+                written, otherwise C{True}."""
+        self.wait_for_save()
         self.unit_controller.prepare_for_save()
+        if filename is None and not self._modified and not self.store.has_dirty_units():
+            # Nothing changed since the last save
+            return True
         if self.project is None:
-            self.store.save_file(filename) # store.save_file() will raise an appropriate exception if necessary
+            self.store.save_file(filename, background=True) # store.save_file() will raise an appropriate exception if necessary
+            # The unit in the editor can still change while the file is written
+            self.store.prepare_unit_edit(self.unit_controller.current_unit)
+            self._modified = False
+            self.main_controller.set_saveable(False)
+            if wait:
+                return self.wait_for_save()
+            return True
         else:
             # XXX: filename is the name that the bundle archive should be saved
             #      as, seeing as self.store is opened from a temporary file
@@ -296,6 +353,32 @@ class StoreController(BaseController):
         self._modified = False
         self.main_controller.set_saveable(False)
         self.emit('store-saved')
+        return True
+
+    def wait_for_save(self):
+        """Block until a background save of the current store is done.
+
+            @returns: C{False} if the save failed (after "save-failed" was
+                handled), otherwise C{True}."""
+        if self.store is None or not self.store.is_saving():
+            return True
+        failures = []
+        handler_id = self.store.connect('save-failed', lambda store, exc: failures.append(exc))
+        try:
+            self.store.wait_for_save()
+        finally:
+            self.store.disconnect(handler_id)
+        return not failures
+
+    def save_snapshot(self):
+        """Write the snapshot of the current store (if it has no unsaved
+            changes), and wait for the snapshot of a store that was closed
+            before. This is meant for when Virtaal quits."""
+        if self._snapshot_job is not None:
+            self._snapshot_job.join()
+            self._snapshot_job = None
+        if self.store is not None and not self._modified:
+            self.store.save_snapshot()
 
     def binary_export(self, filename):
         #TODO: confirm file extension is correct
@@ -307,6 +390,21 @@ class StoreController(BaseController):
         binary_output.close()
 
     def close_file(self):
+        self.wait_for_save()
+        self._disconnect_loading_store()
+        if self.store:
+            self.store.cancel_loading()
+            self.store.cancel_update()
+            self.store.cancel_checks()
+            self.store.discard_search_index()
+            self._finish_update()
+            for handler_id in self._save_handler_ids:
+                self.store.disconnect(handler_id)
+            if not self._modified:
+                # The store isn't used any more, so it can be pickled while
+                # the user goes on
+                self._snapshot_job = self.store.save_snapshot(background=True)
+        self._save_handler_ids = []
         del self.project
         self.project = None
         self.store = None
@@ -314,6 +412,8 @@ class StoreController(BaseController):
         self.main_controller.set_saveable(False)
         self.view.hide() # This MUST be called BEFORE `self.cursor = None`
         self.emit('store-closed') # This should be emitted BEFORE `self.cursor = None` to allow any other modules to disconnect from the cursor
+        if self.cursor is not None:
+            self.cursor.cancel_settle()
         self.cursor = None
         import gc
         gc.collect()
@@ -368,10 +468,17 @@ class StoreController(BaseController):
     def revert_file(self):
         self.open_file(self.store.filename)
 
-    def update_file(self, filename, uri=''):
+    def update_file(self, filename, uri='', fuzzymatching=False):
+        """Update the current store to the template in C{filename}.
+
+            The merge happens in the background while a progress dialog is
+            shown. The "store-loaded" signal is emitted when it is done."""
+        self.wait_for_save()
         if not self.store:
             #FIXME: we should never allow updates if no file is already open
             self.open_file(filename, uri=uri)
+            # Nothing else refreshes the mode on this path
+            self.main_controller.mode_controller.refresh_mode()
             return
 
         post_update_action = None
@@ -408,23 +515,80 @@ class StoreController(BaseController):
         # Let's entirely clear things in the view to ensure that no signals
         # are still attached to old models before we start chaning things. See 
         # bug 1854.
+        self._update_cursor_pos = self.cursor.pos
         self.view.load_store(None)
-        self.store.update_file(filename)
 
+        from virtaal.views.widgets.progressdialog import ProgressDialog
+        self._update_dialog = ProgressDialog(
+            title=_('Updating File'),
+            message=_('Updating the file to the new template...'),
+            parent=self.main_controller.view.main_window
+        )
+        self._update_dialog.connect('cancelled', self._on_update_cancelled)
+        self._update_handler_ids = [
+            self.store.connect('update-progress', self._on_store_update_progress),
+            self.store.connect('updated', self._on_store_updated),
+            self.store.connect('update-failed', self._on_store_update_failed),
+        ]
+        self.store.update_file(filename, background=True, fuzzymatching=fuzzymatching)
+        self._update_dialog.show()
+
+    def _finish_update(self):
+        for handler_id in self._update_handler_ids:
+            self.store.disconnect(handler_id)
+        self._update_handler_ids = []
+        if self._update_dialog is not None:
+            self._update_dialog.destroy()
+            self._update_dialog = None
+
+    def _restore_view_after_update(self):
+        """Show the store as it was before the update was attempted."""
+        self.view.load_store(self.store)
+        self.view.show()
+        self.cursor.pos = self._update_cursor_pos
+
+    def _show_updated_store(self):
         self._modified = True
         self.main_controller.set_saveable(self._modified)
         self.main_controller.set_force_saveas(self._modified)
 
-        from cursor import Cursor
-        self.cursor = Cursor(self.store, self.store.stats['total'])
+        self._create_cursor()
 
         self.view.load_store(self.store)
         self.view.show()
 
+        self.store.build_search_index()
         self.emit('store-loaded')
 
+    def replace_matches(self, matches, replace_str):
+        """Replace the given search matches in the targets of their units,
+            without loading the units in the unit view.
+
+            The whole replacement is a single step on the undo stack. The
+            current unit should not be among the units with matches.
+            @returns: The number of units that changed."""
+        store = self.store
+        indices, old_targets = store.replace_matches(matches, replace_str)
+        if not indices:
+            return 0
+
+        def undo_replace():
+            store.set_targets(indices, old_targets)
+            self._recheck_units(store)
+        self.main_controller.undo_controller.push_store_edit(undo_replace)
+        self._modified = True
+        self.main_controller.set_saveable(self._modified)
+        self._recheck_units(store)
+        return len(indices)
+
+    def _recheck_units(self, store):
+        """Check the units that were changed directly in C{store} again, if
+            its units were checked before."""
+        if store.checks is not None:
+            store.update_checks(background=True)
+
     def update_store_checks(self, **kwargs):
-        """Shortcut to C{StoreModel.update_stats()}"""
+        """Shortcut to C{StoreModel.update_checks()}"""
         store = self.get_store()
         if not store:
             raise ValueError('No store to get checker from')
@@ -458,6 +622,29 @@ class StoreController(BaseController):
         #l10n: this refers to updating a file to a new template (POT file)
         self.main_controller.show_info(_("File Updated"), output)
 
+    def _create_cursor(self):
+        from cursor import Cursor
+        if self.cursor is not None:
+            self.cursor.cancel_settle()
+        self.cursor = Cursor(self.store, self.store.stats['total'], settle_delay=self.SETTLE_DELAY)
+
+    def _should_load_progressively(self, filename):
+        """Decide whether the given file is big enough to be worth loading in
+            the background."""
+        import re
+        if re.search("\.pot(\.gz|\.bz2)?$", filename):
+            # Templates need their file name changed before anything else
+            return False
+        try:
+            return os.path.getsize(filename) >= self.PROGRESSIVE_LOAD_SIZE
+        except OSError:
+            return False
+
+    def _disconnect_loading_store(self):
+        for handler_id in self._load_handler_ids:
+            self.store.disconnect(handler_id)
+        self._load_handler_ids = []
+
     def _get_new_bundle_filename(self, infilename, force_temp=False):
         """Creates a file name that can be used for a bundle, based on the given
             file name.
@@ -544,9 +731,10 @@ class StoreController(BaseController):
     # EVENT HANDLERS #
     def _on_controller_registered(self, main_controller, controller):
         if controller is main_controller.lang_controller:
-            main_controller.disconnect(self._controller_register_id)
             main_controller.lang_controller.connect('source-lang-changed', self._on_source_lang_changed)
             main_controller.lang_controller.connect('target-lang-changed', self._on_target_lang_changed)
+        elif controller is main_controller.checks_controller:
+            main_controller.checks_controller.connect('unit-checked', self._on_unit_checked)
 
     def _on_source_lang_changed(self, _sender, langcode):
         self.store.set_source_language(langcode)
@@ -554,6 +742,75 @@ class StoreController(BaseController):
     def _on_target_lang_changed(self, _sender, langcode):
         self.store.set_target_language(langcode)
 
+    def _on_unit_checked(self, checks_controller, unit, checker, failures):
+        if self.store:
+            self.store.update_unit_checks(unit, checker, failures)
+
+    def _on_store_units_added(self, store, start, count):
+        self.view.add_units(start, count)
+        # The first chunk makes the cursor valid and selects the first unit.
+        # The new units come after all others, so this only appends.
+        for index in xrange(start, start + count):
+            self.cursor.add_index(index)
+
+    def _on_store_finished_loading(self, store):
+        self._disconnect_loading_store()
+        if len(store.get_units()) < 1:
+            self.close_file()
+            self.main_controller.show_error(_('The file contains nothing to translate.'))
+            return
+        self.cursor.indices = store.stats['total']
+        store.build_search_index()
+        self.emit('store-loaded')
+        if self.main_controller.mode_controller:
+            # Modes could only see partial statistics while we were loading
+            self.main_controller.mode_controller.refresh_mode()
+
+    def _on_store_load_failed(self, store, exc):
+        filename = store.filename
+        self.close_file()
+        self.main_controller.show_error(
+            filename + ":\n" + _("Could not open file.\n\n%(error_message)s\n\nTry opening a different file.") % {'error_message': str(exc)}
+        )
+
+    def _on_store_saved(self, store):
+        self.emit('store-saved')
+
+    def _on_store_save_failed(self, store, exc):
+        self._modified = True
+        self.main_controller.set_saveable(True)
+        self.main_controller.show_error(
+            _("Could not save file.\n\n%(error_message)s\n\nTry saving to a different location.") % {'error_message': str(exc)}
+        )
+
+    def _on_store_update_progress(self, store, fraction, text):
+        if self._update_dialog is not None:
+            self._update_dialog.set_progress(fraction, text)
+
+    def _on_store_updated(self, store, oldstats):
+        self._finish_update()
+        self._show_updated_store()
+        self.compare_stats(oldstats, store.stats)
+        if self.main_controller.mode_controller:
+            self.main_controller.mode_controller.refresh_mode()
+
+    def _on_store_update_failed(self, store, exc):
+        self._finish_update()
+        self._restore_view_after_update()
+        self.main_controller.show_error(
+            _("Could not update file.\n\n%(error_message)s") % {'error_message': str(exc)}
+        )
+
+    def _on_update_cancelled(self, dialog):
+        self.store.cancel_update()
+        self._finish_update()
+        self._restore_view_after_update()
+
     def _unit_modified(self, emitter, unit):
+        self.store.mark_unit_text_changed(unit)
         self._modified = True
         self.main_controller.set_saveable(self._modified)
+
+    def _unit_done(self, emitter, unit, modified):
+        if modified and self.store:
+            self.store.update_unit_stats(unit)
@@ -115,6 +115,25 @@ class UndoController(BaseController):
             data['desc'] = 'Set target %d text to %s' % (targetn, repr(current_text)),
         self.model.push(data)
 
+    def push_store_edit(self, undo_action):
+        """Save a change that was made directly in the store (not in the unit
+            view) on the undo stack.
+            @param undo_action: Callable (without arguments) that reverts the
+                change."""
+        def undo_store_edit(unit):
+            undo_action()
+
+        # The current unit is selected again and refreshed after the undo
+        data = {
+            'action': undo_store_edit,
+            'cursorpos': -1,
+            'targetn': 0,
+            'unit': self.unit_controller.view.unit
+        }
+        if pan_app.DEBUG:
+            data['desc'] = 'Change units in the store'
+        self.model.push(data)
+
     def record_stop(self):
         self.model.record_stop()
 
@@ -69,6 +69,15 @@ class UnitController(BaseController):
 
 
     # ACCESSORS #
+    def get_current_workflow(self):
+        """Return the workflow of the unit being edited, if it has one."""
+        if self.current_unit is None:
+            return None
+        states, index = self._get_edit_state(self.current_unit)
+        if index is None:
+            return None
+        return states.get_workflow(index)
+
     def get_unit_target(self, target_index):
         return self.view.get_target_n(target_index)
 
@@ -92,10 +101,13 @@ class UnitController(BaseController):
     def set_current_state(self, newstate, from_user=False):
         if isinstance(newstate, workflow.UnitState):
             newstate = newstate.state_value
-        self.current_unit._current_state = newstate
+        states, index = self._get_edit_state(self.current_unit)
+        if index is None:
+            return
+        states.set_current_state(index, newstate)
         if from_user:
             # No need to update the GUI, and we should make the choice sticky
-            self.current_unit._state_sticky = True
+            states.set_state_sticky(index)
         else:
             self.view.update_state(self._unit_state_names[newstate])
 
@@ -105,17 +117,19 @@ class UnitController(BaseController):
         self.current_unit = unit
         self.nplurals = self.main_controller.lang_controller.target_lang.nplurals
 
-        unit._modified = False
-        if not unit.STATE:
-            # If the unit doesn't support states, just skip the state code
+        states, index = self._get_edit_state(unit)
+        if index is not None:
+            states.reset(index)
+        if index is None or not unit.STATE:
+            # If the unit isn't in the store or doesn't support states, just
+            # skip the state code
             self.view.load_unit(unit)
             return self.view
 
         # This unit does support states
         state_n, state_id = unit.get_state_n(), unit.get_state_id()
         state_names = self.get_unit_state_names()
-        unit._state_sticky = False
-        unit._current_state = state_n
+        states.set_current_state(index, state_n)
         if self._recreate_workflow or True:
             # This will only happen when a document is loaded.
             self._unit_state_names = {}
@@ -123,11 +137,11 @@ class UnitController(BaseController):
             #        because the names could have changed in the new document :/
             state_names = self.get_unit_state_names()
             if state_names:
-                unit._workflow = workflow.create_unit_workflow(unit, state_names)
+                states.set_workflow(index, workflow.create_unit_workflow(unit, state_names))
             self._recreate_workflow = False
 
         if state_names:
-            unit._workflow.reset(unit, init_state=state_names[state_id])
+            states.get_workflow(index).reset(unit, init_state=state_names[state_id])
             #XXX: we should make 100% sure that .reset() doesn't actually call
             # a set method in the unit, since it might cause a diff or loss of
             # meta-data.
@@ -145,13 +159,22 @@ class UnitController(BaseController):
 
     def _unit_modified(self, *args):
         self.emit('unit-modified', self.current_unit)
-        self.current_unit._modified = True
-        if self.current_unit.STATE and not self.current_unit._state_sticky:
+        states, index = self._get_edit_state(self.current_unit)
+        if index is None:
+            return
+        states.set_modified(index)
+        if self.current_unit.STATE and not states.is_state_sticky(index):
             self._start_state_timer()
 
     def _unit_done(self, widget, unit):
-        if unit._modified and unit.STATE:
-            if len(unit.target) != 0 and unit._current_state == workflow.StateEnum.EMPTY and not unit._state_sticky:
+        states, index = self._get_edit_state(unit)
+        if index is None:
+            self.emit('unit-done', unit, False)
+            return
+        modified = states.is_modified(index)
+        if modified and unit.STATE:
+            current_state = states.get_current_state(index)
+            if len(unit.target) != 0 and current_state == workflow.StateEnum.EMPTY and not states.is_state_sticky(index):
                 # Oops! The user entered a translation, but the timer didn't
                 # expire yet, so let's mark it fuzzy to be safe. We don't know
                 # exactly what kind of fuzzy the format supports, so let's use
@@ -161,14 +184,13 @@ class UnitController(BaseController):
                 unit.set_state_n(workflow.StateEnum.NEEDS_REVIEW)
             else:
                 # Now really advance the workflow that we ended at
-                unit._workflow.set_current_state(self._unit_state_names[unit._current_state])
+                states.get_workflow(index).set_current_state(self._unit_state_names[current_state])
 
-        self.emit('unit-done', unit, unit._modified)
+        if modified:
+            self.store_controller.get_store().mark_unit_dirty(unit)
+        self.emit('unit-done', unit, modified)
         # let's just clean up a bit:
-        del unit._modified
-        if unit.STATE:
-            del unit._state_sticky
-            del unit._current_state
+        states.clear(index)
 
     def _state_timer_expired(self, unit):
         self._state_timer_active = False
@@ -178,7 +200,10 @@ class UnitController(BaseController):
             target_len = min([len(s) for s in unit.target.strings])
         else:
             target_len = len(unit.target)
-        empty_state = unit._current_state == workflow.StateEnum.EMPTY
+        states, index = self._get_edit_state(unit)
+        if index is None:
+            return
+        empty_state = states.get_current_state(index) == workflow.StateEnum.EMPTY
         if target_len and empty_state:
             self.set_current_state(workflow.StateEnum.UNREVIEWED)
         elif not target_len and not empty_state:
@@ -193,8 +218,20 @@ class UnitController(BaseController):
     def prepare_for_save(self):
         """Finalise outstanding changes to the toolkit store for saving."""
         unit = self.current_unit
-        if unit._modified and unit.STATE:
-            unit._workflow.set_current_state(self._unit_state_names[unit._current_state])
+        if unit is None:
+            return
+        states, index = self._get_edit_state(unit)
+        if index is None or not states.is_modified(index):
+            return
+        self.store_controller.get_store().mark_unit_dirty(unit)
+        if unit.STATE:
+            states.get_workflow(index).set_current_state(self._unit_state_names[states.get_current_state(index)])
+
+    def _get_edit_state(self, unit):
+        """Return the L{EditStateTable} of the current store and the index of
+            C{unit} in it, which is C{None} if the unit is not in the store."""
+        store = self.store_controller.get_store()
+        return store.get_edit_states(), store.get_unit_index(unit)
 
     # EVENT HANDLERS #
     def _on_controller_registered(self, main_controller, controller):
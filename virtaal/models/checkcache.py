@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""A disk cache of quality check results.
+
+Most units are checked again with the same checker every time a file is
+opened, although their text did not change. The failures of every unit that
+was checked are kept in an sqlite database, keyed by the checker, the target
+language and a hash of the content of the unit (source, target, locations
+and notes), so that only new and changed units need to be checked.
+
+The whole cache is emptied when the version of the cache or the Translate
+Toolkit changes, since the checks might give other results. The least
+recently used results are removed when the cache grows beyond its size
+limit."""
+
+import logging
+import os
+import threading
+import time
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import sha as sha1
+try:
+    import simplejson as json
+except ImportError:
+    import json
+try:
+    from sqlite3 import dbapi2
+except ImportError:
+    from pysqlite2 import dbapi2
+
+from translate.__version__ import sver as toolkit_version
+
+from checkresults import get_checker_key
+
+
+CHECK_CACHE_VERSION = 1
+"""Increase this whenever the way that results are stored changes."""
+
+BATCH_SIZE = 500
+"""The number of units looked up in one query (below the limit of 999
+parameters of sqlite)."""
+
+
+def get_unit_hash(unit):
+    """Return a hash of all the content of C{unit} that checks look at."""
+    plural = unit.hasplural()
+    parts = []
+    for text in (unit.source, unit.target):
+        if plural:
+            strings = text.strings
+        else:
+            strings = [text]
+        parts.append(u'\0'.join([unicode(string or u'') for string in strings]))
+    parts.append(u'\0'.join(unit.getlocations()))
+    parts.append(unicode(unit.getnotes() or u''))
+    parts.append(plural and u'p' or u's')
+    return sha1(u'\1'.join(parts).encode('utf-8')).hexdigest()
+
+
+class CheckCache(object):
+    """Stores and retrieves the failures of units by checker and content.
+
+        A cache can be used from several threads: every thread gets its own
+        connection to the database."""
+
+    DEFAULT_MAX_ENTRIES = 200000
+    """The default maximum number of results kept."""
+
+    # INITIALIZERS #
+    def __init__(self, filename, max_entries=DEFAULT_MAX_ENTRIES):
+        self.filename = filename
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+        dirname = os.path.dirname(filename)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        self._init_database()
+
+    def _init_database(self):
+        connection = self._get_connection()
+        cursor = connection.cursor()
+        cursor.execute("""CREATE TABLE IF NOT EXISTS info (
+            name TEXT PRIMARY KEY,
+            value TEXT)""")
+        cursor.execute("""CREATE TABLE IF NOT EXISTS results (
+            checker TEXT,
+            language TEXT,
+            hash TEXT,
+            failures TEXT,
+            used INTEGER,
+            PRIMARY KEY (checker, language, hash))""")
+        cursor.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+
+        version = u'%d-%s' % (CHECK_CACHE_VERSION, toolkit_version)
+        cursor.execute("SELECT value FROM info WHERE name = 'version'")
+        row = cursor.fetchone()
+        if row is None or row[0] != version:
+            if row is not None:
+                logging.debug('Discarding check results of version %s' % (row[0]))
+            cursor.execute("DELETE FROM results")
+            cursor.execute("INSERT OR REPLACE INTO info (name, value) VALUES ('version', ?)", (version,))
+        connection.commit()
+
+
+    # ACCESSORS #
+    def _get_connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = dbapi2.connect(self.filename, timeout=5)
+            self._local.connection = connection
+        return connection
+
+    def _get_key_params(self, checker_key):
+        checker_name, language = checker_key
+        return (checker_name, language or u'')
+
+
+    # METHODS #
+    def lookup(self, checker_key, hashes):
+        """Return the cached failures of the units with the given hashes.
+
+            @param checker_key: Identifies the checker, as returned by
+                L{checkresults.get_checker_key()}.
+            @param hashes: Unit hashes as returned by L{get_unit_hash()}.
+            @returns: A dictionary mapping the hashes that were found to the
+                failures of the unit, like C{checker.run_filters()}
+                returns them."""
+        params = self._get_key_params(checker_key)
+        hashes = list(set(hashes))
+        found = {}
+        try:
+            connection = self._get_connection()
+            cursor = connection.cursor()
+            now = int(time.time())
+            for i in xrange(0, len(hashes), BATCH_SIZE):
+                batch = hashes[i:i+BATCH_SIZE]
+                where = "checker = ? AND language = ? AND hash IN (%s)" % (u','.join(['?'] * len(batch)))
+                cursor.execute("SELECT hash, failures FROM results WHERE " + where, params + tuple(batch))
+                batch_found = cursor.fetchall()
+                if batch_found:
+                    # Mark the results as recently used
+                    cursor.execute("UPDATE results SET used = ? WHERE " + where, (now,) + params + tuple(batch))
+                for unit_hash, failures in batch_found:
+                    found[unit_hash] = json.loads(failures)
+            connection.commit()
+        except dbapi2.Error, e:
+            logging.debug('Unable to read cached check results: %s' % (e))
+        return found
+
+    def store(self, checker_key, results):
+        """Store the failures of units.
+
+            @param results: A list of C{(hash, failures)} tuples, with the
+                failures as returned by C{checker.run_filters()}."""
+        if not results:
+            return
+        checker_name, language = self._get_key_params(checker_key)
+        now = int(time.time())
+        rows = [
+            (checker_name, language, unit_hash, json.dumps(dict(failures)), now)
+            for unit_hash, failures in results
+        ]
+        try:
+            connection = self._get_connection()
+            connection.executemany(
+                "INSERT OR REPLACE INTO results (checker, language, hash, failures, used) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            connection.commit()
+        except dbapi2.Error, e:
+            logging.debug('Unable to cache check results: %s' % (e))
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used results until the cache holds at
+            most its maximum number of results."""
+        try:
+            connection = self._get_connection()
+            cursor = connection.cursor()
+            cursor.execute("SELECT COUNT(*) FROM results")
+            excess = cursor.fetchone()[0] - self.max_entries
+            if excess > 0:
+                cursor.execute(
+                    "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY used LIMIT ?)",
+                    (excess,)
+                )
+                connection.commit()
+        except dbapi2.Error, e:
+            logging.debug('Unable to remove old check results: %s' % (e))
+
+    def clear(self):
+        """Remove all results."""
+        try:
+            connection = self._get_connection()
+            connection.execute("DELETE FROM results")
+            connection.commit()
+        except dbapi2.Error, e:
+            logging.debug('Unable to clear check results: %s' % (e))
+
+
+def run_filters(checker, units, cache=None):
+    """Return the result of C{checker.run_filters()} for every unit in
+        C{units}, taking the results of units that were checked before from
+        C{cache} (if given), and storing the new results in it."""
+    if cache is None:
+        return [checker.run_filters(unit) for unit in units]
+
+    checker_key = get_checker_key(checker)
+    hashes = [get_unit_hash(unit) for unit in units]
+    cached = cache.lookup(checker_key, hashes)
+    results = []
+    new_results = []
+    for unit, unit_hash in zip(units, hashes):
+        failures = cached.get(unit_hash, None)
+        if failures is None:
+            failures = checker.run_filters(unit)
+            cached[unit_hash] = failures
+            new_results.append((unit_hash, failures))
+        # Callers may change the dictionary (like ChecksUnitView does)
+        results.append(dict(failures))
+    cache.store(checker_key, new_results)
+    return results
+
+
+_cache = None
+
+def get_cache():
+    """Return the check result cache in Virtaal's configuration directory,
+        or C{None} if it was disabled or can not be used."""
+    global _cache
+    from virtaal.common import pan_app
+    if not pan_app.CHECK_CACHE:
+        return None
+    if _cache is None:
+        try:
+            max_entries = int(pan_app.settings.general['checkcachesize'])
+        except (KeyError, ValueError, AttributeError):
+            max_entries = CheckCache.DEFAULT_MAX_ENTRIES
+        try:
+            _cache = CheckCache(os.path.join(pan_app.get_config_dir(), u'checkcache.db'), max_entries)
+        except (OSError, dbapi2.Error), e:
+            logging.warning('Check result cache disabled: %s' % (e))
+            pan_app.CHECK_CACHE = False
+            return None
+    return _cache
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from bisect import bisect_left, insort
+
+
+class CheckResultTable(object):
+    """The quality checks that every unit of a store fails with one checker,
+        by model index.
+
+        The results of a unit are replaced when it is checked again, so that
+        the table stays current without checking all units again. Units of
+        which the text changed since they were checked are remembered as
+        stale, so that only they need to be checked to bring the table up to
+        date.
+
+        Check names are given like the keys of C{StoreModel.checks}
+        ("check-" and the name of the check)."""
+
+    # INITIALIZERS #
+    def __init__(self, checker_key):
+        """Constructor.
+            @param checker_key: Identifies the checker (and configuration)
+                that the results are from. See L{get_checker_key()}."""
+        self.checker_key = checker_key
+        self._failures = {}
+        self._checks = {}
+        self._stale = set()
+
+    @classmethod
+    def from_checks(cls, checker_key, checks):
+        """Build a table from a dictionary of check names to the sorted
+            model indexes of the units that fail them."""
+        table = cls(checker_key)
+        for name, indices in checks.iteritems():
+            table._checks[name] = list(indices)
+            for index in indices:
+                table._failures.setdefault(index, set()).add(name)
+        return table
+
+
+    # ACCESSORS #
+    def get_checks(self):
+        """Return the dictionary of check names to the sorted model indexes
+            of the units that fail them. It is changed in place as results
+            change."""
+        return self._checks
+
+    def get_failures(self, index):
+        """Return the names of the checks that the unit at C{index} fails."""
+        return frozenset(self._failures.get(index, ()))
+
+    def get_stale(self):
+        """Return the sorted model indexes of the units that changed since
+            they were checked."""
+        return sorted(self._stale)
+
+    def is_stale(self, index):
+        return index in self._stale
+
+
+    # METHODS #
+    def mark_stale(self, index):
+        self._stale.add(index)
+
+    def set_failures(self, index, names):
+        """Replace the checks that the unit at C{index} fails with C{names},
+            and mark it as current.
+
+            @returns: The sets of check names that were added and removed."""
+        self._stale.discard(index)
+        old = self._failures.get(index, set())
+        new = set(names)
+        if old == new:
+            return set(), set()
+        added, removed = new - old, old - new
+        for name in removed:
+            indices = self._checks[name]
+            del indices[bisect_left(indices, index)]
+        for name in added:
+            indices = self._checks.setdefault(name, [])
+            if not indices or indices[-1] < index:
+                indices.append(index)
+            else:
+                insort(indices, index)
+        if new:
+            self._failures[index] = new
+        else:
+            del self._failures[index]
+        return added, removed
+
+
+def get_checker_key(checker):
+    """Return what identifies the results of C{checker}: its class and target
+        language."""
+    return (checker.__class__.__name__, checker.config.targetlanguage)
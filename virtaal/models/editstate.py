@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Editing state of the units of a store, kept outside of the units.
+
+The flags and workflow states of all units are stored in compact arrays indexed
+by model index, so that the table costs a few bytes per unit and nothing has
+to be added to the toolkit units. Workflow objects are expensive, so they are
+only kept for units that are being edited."""
+
+from array import array
+
+
+class EditStateTable(object):
+    """Per-unit editing state, keyed by model index.
+
+        The arrays grow as needed, so units that are still being loaded can
+        be edited."""
+
+    __slots__ = ('_flags', '_states', '_workflows')
+
+    MODIFIED = 1
+    """The unit was changed since it was loaded into the editor."""
+    STATE_STICKY = 2
+    """The user chose the state, so it shouldn't change automatically."""
+    NO_STATE = -0x8000
+    """Marks units without a current state; outside the range of state
+        values used by the toolkit."""
+
+    def __init__(self, size=0):
+        self._flags = array('B', [0]) * size
+        self._states = array('h', [self.NO_STATE]) * size
+        self._workflows = {}
+
+    def __len__(self):
+        return len(self._flags)
+
+    # ACCESSORS #
+    def is_modified(self, index):
+        return self._get_flag(index, self.MODIFIED)
+
+    def set_modified(self, index, modified=True):
+        self._set_flag(index, self.MODIFIED, modified)
+
+    def is_state_sticky(self, index):
+        return self._get_flag(index, self.STATE_STICKY)
+
+    def set_state_sticky(self, index, sticky=True):
+        self._set_flag(index, self.STATE_STICKY, sticky)
+
+    def get_current_state(self, index):
+        """Return the workflow state chosen for the unit, or C{None}."""
+        if index >= len(self._states) or self._states[index] == self.NO_STATE:
+            return None
+        return self._states[index]
+
+    def set_current_state(self, index, state):
+        self._ensure_size(index)
+        if state is None:
+            state = self.NO_STATE
+        self._states[index] = state
+
+    def get_workflow(self, index):
+        return self._workflows.get(index, None)
+
+    def set_workflow(self, index, workflow):
+        if workflow is None:
+            self._workflows.pop(index, None)
+        else:
+            self._workflows[index] = workflow
+
+    def _get_flag(self, index, flag):
+        if index >= len(self._flags):
+            return False
+        return bool(self._flags[index] & flag)
+
+    def _set_flag(self, index, flag, value):
+        self._ensure_size(index)
+        if value:
+            self._flags[index] |= flag
+        else:
+            self._flags[index] &= ~flag
+
+
+    # METHODS #
+    def reset(self, index, current_state=None):
+        """Start editing the unit at C{index} afresh."""
+        self._ensure_size(index)
+        self._flags[index] = 0
+        self.set_current_state(index, current_state)
+
+    def clear(self, index):
+        """Forget the editing state of the unit at C{index}."""
+        if index < len(self._flags):
+            self._flags[index] = 0
+            self._states[index] = self.NO_STATE
+        self._workflows.pop(index, None)
+
+    def _ensure_size(self, index):
+        missing = index + 1 - len(self._flags)
+        if missing > 0:
+            self._flags.extend(array('B', [0]) * missing)
+            self._states.extend(array('h', [self.NO_STATE]) * missing)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from virtaal.support.bitset import Bitset
+
+
+class FilterIndex(object):
+    """The sets of units that modes filter on, as L{Bitset}s of model
+        indexes.
+
+        Sets are named like the keys of C{StoreModel.stats} ("translated",
+        "fuzzy", ...), C{StoreModel.checks} ("check-...") and the extended
+        (workflow) states, which are named by their integer state ID."""
+
+    # INITIALIZERS #
+    def __init__(self, size):
+        self.size = size
+        self._sets = {}
+
+    @classmethod
+    def from_stats(cls, stats, checks=None):
+        """Build the index from the statistics and checks of a store."""
+        index = cls(len(stats['total']))
+        for name, indices in stats.iteritems():
+            if name == 'extended':
+                continue
+            index.set_indices(name, indices)
+        for state, indices in stats['extended'].iteritems():
+            index.set_indices(state, indices)
+        if checks:
+            for name, indices in checks.iteritems():
+                index.set_indices(name, indices)
+        return index
+
+
+    # ACCESSORS #
+    def get(self, name):
+        """Return the set with the given name (which is empty if we don't
+            know the name)."""
+        if name not in self._sets:
+            return Bitset()
+        return self._sets[name]
+
+    def get_all(self):
+        """Return the set of all units."""
+        return Bitset.from_range(self.size)
+
+    def set_indices(self, name, indices):
+        self._sets[name] = Bitset(indices)
+
+
+    # METHODS #
+    def add(self, name, index):
+        """Add the unit at C{index} to the named set."""
+        if name not in self._sets:
+            self._sets[name] = Bitset()
+        self._sets[name].add(index)
+
+    def discard(self, name, index):
+        """Remove the unit at C{index} from the named set."""
+        if name in self._sets:
+            self._sets[name].discard(index)
+
+    def union(self, names):
+        """Return the set of units in any of the named sets."""
+        return Bitset().union(*[self.get(name) for name in names])
+
+    def intersection(self, names):
+        """Return the set of units in all of the named sets."""
+        if not names:
+            return self.get_all()
+        sets = [self.get(name) for name in names]
+        return sets[0].intersection(*sets[1:])
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from virtaal.support.bitset import Bitset
+
+
+class MatchIndex(object):
+    """The matches of a search, in the order they were found, and indexed by
+        unit and by the text (part and part number) of the unit they are in.
+
+        Every match keeps the position it was added at, also when other
+        matches are removed. The positions of the remaining matches are given
+        by L{get_positions()}, so that this can be used as the model of a
+        L{virtaal.controllers.cursor.Cursor}."""
+
+    # INITIALIZERS #
+    def __init__(self, matches=()):
+        self._matches = []
+        self._live = Bitset()
+        self._positions = {}
+        self._units = {}
+        self._parts = {}
+        self.extend(matches)
+
+
+    # SPECIAL METHODS #
+    def __len__(self):
+        return len(self._live)
+
+    def __iter__(self):
+        for pos in self._live:
+            yield self._matches[pos]
+
+    def __getitem__(self, pos):
+        """Return the match at position C{pos} (which might have been
+            removed, in which case C{None} is returned)."""
+        return self._matches[pos]
+
+
+    # ACCESSORS #
+    def get_positions(self):
+        """Return the positions of the matches that were not removed."""
+        return self._live.copy()
+
+    def get_unit_matches(self, unit):
+        """Return the matches in C{unit}, in order."""
+        return list(self._units.get(id(unit), ()))
+
+    def get_part_matches(self, unit, part, part_n):
+        """Return the matches in the given part ('source' or 'target') and
+            string number of C{unit}, in order."""
+        return list(self._parts.get((id(unit), part, part_n), ()))
+
+    def index(self, match):
+        """Return the position of C{match}."""
+        try:
+            return self._positions[id(match)]
+        except KeyError:
+            raise ValueError('Match not found: %s' % (match))
+
+
+    # METHODS #
+    def extend(self, matches):
+        """Add C{matches} after the existing matches."""
+        for match in matches:
+            pos = len(self._matches)
+            self._matches.append(match)
+            self._live.add(pos)
+            self._positions[id(match)] = pos
+            self._units.setdefault(id(match.unit), []).append(match)
+            self._parts.setdefault((id(match.unit), match.part, match.part_n), []).append(match)
+
+    def remove(self, match):
+        pos = self.index(match)
+        self._matches[pos] = None
+        self._live.discard(pos)
+        del self._positions[id(match)]
+        for key, table in ((id(match.unit), self._units), ((id(match.unit), match.part, match.part_n), self._parts)):
+            matches = table[key]
+            matches.remove(match)
+            if not matches:
+                del table[key]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""A cache for the results of recent searches in a store.
+
+While a search text is typed, every new query usually extends the previous
+one. A unit can only contain "translat" if it also contains "transl", so the
+units that matched an earlier plain text query are enough to search for a
+longer one."""
+
+from collections import OrderedDict
+
+
+class SearchResultCache(object):
+    """The matches of recent searches, evicted in least recently used order.
+
+        Results are keyed on the search string (as normalized by the search
+        filter), whether case is ignored and whether the search string is a
+        regular expression."""
+
+    # INITIALIZERS #
+    def __init__(self, size=16):
+        self.size = size
+        self._results = OrderedDict()
+
+
+    # SPECIAL METHODS #
+    def __len__(self):
+        return len(self._results)
+
+
+    # ACCESSORS #
+    def get(self, searchstring, ignorecase, useregexp):
+        """Return the cached C{(matches, indexes)} of the given search, or
+            C{None}. The returned lists may be changed by the caller."""
+        key = (searchstring, ignorecase, useregexp)
+        if key not in self._results:
+            return None
+        matches, indexes = self._results.pop(key)
+        self._results[key] = (matches, indexes)
+        return list(matches), list(indexes)
+
+    def get_refinable(self, searchstring, ignorecase, useregexp):
+        """Return the model indexes of the units that matched the longest
+            cached search contained in C{searchstring}, or C{None}.
+
+            Only plain text searches can be refined: every unit that matches
+            C{searchstring} is among the returned units."""
+        if useregexp:
+            return None
+        best = None
+        for (cached, cached_case, cached_regexp) in self._results:
+            if cached_regexp or cached_case != ignorecase or cached not in searchstring:
+                continue
+            if best is None or len(cached) > len(best):
+                best = cached
+        if best is None:
+            return None
+        key = (best, ignorecase, False)
+        matches, indexes = self._results.pop(key)
+        self._results[key] = (matches, indexes)
+        return indexes
+
+    def put(self, searchstring, ignorecase, useregexp, matches, indexes):
+        """Remember the C{matches} of the given search, found in the units at
+            the (sorted) model indexes C{indexes}."""
+        key = (searchstring, ignorecase, useregexp)
+        self._results.pop(key, None)
+        self._results[key] = (tuple(matches), tuple(indexes))
+        while len(self._results) > self.size:
+            self._results.popitem(last=False)
+
+
+    # METHODS #
+    def clear(self):
+        """Forget all results, for example because the text of a unit
+            changed."""
+        self._results.clear()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""A trigram index over the source and target text of the units of a store.
+
+The index only narrows down the units that need to be searched: every unit
+that contains the search text is among the candidates, but the candidates
+still have to be searched with the real (exact or regular expression)
+filter. Units that changed since the index was built are always candidates,
+so the index never has to be rebuilt while a file is edited."""
+
+import re
+from array import array
+
+from translate.lang import data
+
+
+GRAM_LENGTH = 3
+
+# Characters with a special meaning in regular expressions. A pattern without
+# any of them is searched for literally, and can use the index.
+_regex_special = re.compile(r'[\\.^$*+?{}\[\]|()]')
+
+
+def get_unit_strings(unit):
+    """Return the source and target strings of C{unit} that are searched."""
+    if unit.hasplural():
+        return unit.source.strings + unit.target.strings
+    return [unit.source, unit.target]
+
+def _normalize(text):
+    return data.normalize(text).lower()
+
+def _grams(text):
+    text = _normalize(text)
+    return set([text[i:i+GRAM_LENGTH] for i in xrange(len(text) - GRAM_LENGTH + 1)])
+
+
+class SearchIndex(object):
+    """Maps every trigram in the (lower case) text of the units to the model
+        indexes of the units containing it."""
+
+    # INITIALIZERS #
+    def __init__(self):
+        self.size = 0
+        self._postings = {}
+        self._changed = set()
+
+    @classmethod
+    def build(cls, units, cancelled=None):
+        """Build the index for the given units.
+
+            @param cancelled: Returns C{True} if building should stop.
+            @returns: The index, or C{None} if building was cancelled."""
+        index = cls()
+        for unit_index, unit in enumerate(units):
+            if cancelled and not unit_index % 1000 and cancelled():
+                return None
+            index.add_unit(unit_index, get_unit_strings(unit))
+        return index
+
+
+    # METHODS #
+    def add_unit(self, unit_index, strings):
+        """Add the unit at C{unit_index} with the given strings. Units have to
+            be added in order."""
+        grams = set()
+        for text in strings:
+            if text:
+                grams.update(_grams(text))
+        postings = self._postings
+        for gram in grams:
+            if gram not in postings:
+                postings[gram] = array('i')
+            postings[gram].append(unit_index)
+        self.size = max(self.size, unit_index + 1)
+
+    def mark_changed(self, unit_index):
+        """Remember that the text of the unit at C{unit_index} changed, so
+            that it is always returned as a candidate."""
+        self._changed.add(unit_index)
+
+    def get_candidates(self, searchstring, useregexp=False):
+        """Return the sorted model indexes of the units that might contain
+            C{searchstring}, or C{None} if the index can't narrow down the
+            search (for example for short search strings or most regular
+            expressions)."""
+        if useregexp:
+            if _regex_special.search(searchstring):
+                return None
+        grams = _grams(searchstring)
+        if not grams:
+            return None
+
+        postings = []
+        for gram in grams:
+            if gram not in self._postings:
+                postings = None
+                break
+            postings.append(self._postings[gram])
+
+        if postings is None:
+            candidates = set()
+        else:
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    break
+        candidates.update(self._changed)
+        return sorted(candidates)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Search queries that look at specific fields of units, like
+C{note:foo loc:*.c state:fuzzy target:/colou?r/}.
+
+A query consists of terms separated by spaces. A term C{field:value} searches
+for C{value} in one field of the units:
+
+    - C{source:} and C{target:} search in the source and target text,
+    - C{note:} searches in all the notes (comments) of a unit,
+    - C{loc:} searches in the locations, where C{*} and C{?} can be used as
+      wildcards (C{loc:*.c} matches C{src/main.c:42}),
+    - C{ctx:} searches in the context,
+    - C{state:} selects units with the given state (C{untranslated},
+      C{fuzzy}, C{translated} or an extended state like C{needs-review}).
+
+A value can be put between double quotes to include spaces, and a value
+between slashes is a regular expression. All the other text of the query is
+searched for as one phrase in the source and target text, like a normal
+search. A unit has to match all the terms.
+
+The query is compiled once into a list of predicates that are applied one
+after the other, the cheapest first, to the text of a L{UnitFieldTable}, so
+that the units themselves are only asked for their text once."""
+
+import fnmatch
+import re
+
+from translate.storage.statsdb import extended_state_strings
+from translate.tools.pogrep import find_matches
+from translate.lang import data
+
+
+FIELDS = ('source', 'target', 'note', 'loc', 'ctx', 'state')
+"""The fields that can be used in a query."""
+
+_term_re = re.compile(r'''
+    (?:(?P<field>[a-z]+):)?
+    (?:
+        "(?P<quoted>[^"]*)"
+        | /(?P<regexp>(?:[^/\\]|\\.)+)/(?=\s|$)
+        | (?P<word>\S+)
+    )''', re.VERBOSE | re.UNICODE)
+_line_number_re = re.compile(r':\d+$')
+_extended_states = dict([(name, state) for state, name in extended_state_strings.iteritems()])
+
+
+def _strings(text, plural):
+    if plural:
+        strings = text.strings
+    else:
+        strings = [text]
+    return tuple([data.normalize(unicode(string or u'')) for string in strings])
+
+
+class UnitFieldTable(object):
+    """The searchable text of every unit, by model index.
+
+        Reading notes and locations is slow for some formats, so these are
+        gathered once, and kept up to date with L{update()} when a unit
+        changes."""
+
+    # INITIALIZERS #
+    def __init__(self, units=()):
+        self._fields = {'source': [], 'target': [], 'note': [], 'loc': [], 'ctx': []}
+        for unit in units:
+            self.append(unit)
+
+
+    # SPECIAL METHODS #
+    def __len__(self):
+        return len(self._fields['source'])
+
+
+    # ACCESSORS #
+    def get(self, field):
+        """Return the values of C{field} for all units: tuples of strings
+            for 'source', 'target' and 'loc', and strings for 'note' and
+            'ctx'."""
+        return self._fields[field]
+
+
+    # METHODS #
+    def append(self, unit):
+        for field, value in self._get_unit_fields(unit):
+            self._fields[field].append(value)
+
+    def update(self, index, unit):
+        """Read the text of C{unit} at model index C{index} again."""
+        for field, value in self._get_unit_fields(unit):
+            self._fields[field][index] = value
+
+    def _get_unit_fields(self, unit):
+        plural = unit.hasplural()
+        return (
+            ('source', _strings(unit.source, plural)),
+            ('target', _strings(unit.target, plural)),
+            ('note', data.normalize(unicode(unit.getnotes() or u''))),
+            ('loc', tuple(unit.getlocations())),
+            ('ctx', data.normalize(unicode(unit.getcontext() or u''))),
+        )
+
+
+class SearchQuery(object):
+    """A parsed and compiled query (see the module documentation)."""
+
+    # INITIALIZERS #
+    def __init__(self, text, ignorecase=True, useregexp=False):
+        """Constructor.
+            @param ignorecase: Whether text is matched case insensitively.
+            @param useregexp: Whether values that are not between slashes are
+                regular expressions too.
+            @raises re.error: If a regular expression is not valid."""
+        self.text = text
+        self.ignorecase = ignorecase
+        self.useregexp = useregexp
+        self._flags = re.MULTILINE | re.UNICODE
+        if ignorecase:
+            self._flags |= re.IGNORECASE
+
+        self.terms = []
+        self.states = []
+        phrase = []
+        for field, value, is_regexp in self.parse(text):
+            if field is None:
+                phrase.append(value)
+            elif field == 'state':
+                self.states.append(value)
+            else:
+                self.terms.append((field, value, is_regexp))
+        self.phrase = u' '.join(phrase)
+        self._compile()
+
+    @classmethod
+    def parse(cls, text):
+        """Split C{text} into C{(field, value, is_regexp)} terms. The field
+            of text that isn't part of a term is C{None}."""
+        terms = []
+        for match in _term_re.finditer(text):
+            field = match.group('field')
+            if field not in FIELDS:
+                terms.append((None, match.group(0), False))
+            elif match.group('quoted') is not None:
+                terms.append((field, match.group('quoted'), False))
+            elif match.group('regexp') is not None:
+                terms.append((field, match.group('regexp'), True))
+            else:
+                terms.append((field, match.group('word'), False))
+        return terms
+
+    def _compile(self):
+        patterns = {'source': [], 'target': []}
+        # (cost, field, predicate), so that the cheap fields can go first
+        self._predicates = []
+        for field, value, is_regexp in self.terms:
+            if field == 'loc' and not (is_regexp or self.useregexp) and ('*' in value or '?' in value):
+                self._predicates.append((1, field, self._make_glob_predicate(value)))
+                continue
+            regexp = self._compile_value(value, is_regexp)
+            if field in patterns:
+                patterns[field].append(regexp.pattern)
+                self._predicates.append((2, field, self._make_strings_predicate(regexp)))
+            elif field == 'loc':
+                self._predicates.append((1, field, self._make_strings_predicate(regexp)))
+            else:
+                self._predicates.append((0, field, regexp.search))
+        if self.phrase:
+            regexp = self._compile_value(self.phrase, False)
+            patterns['source'].append(regexp.pattern)
+            patterns['target'].append(regexp.pattern)
+            self._predicates.append((3, None, self._make_strings_predicate(regexp)))
+        self._predicates.sort(key=lambda predicate: predicate[0])
+
+        # One expression per part, so that matches come out in order
+        self._part_regexps = {}
+        for part, part_patterns in patterns.iteritems():
+            if part_patterns:
+                self._part_regexps[part] = self._join_patterns(part_patterns)
+
+    def _compile_value(self, value, is_regexp):
+        if not (is_regexp or self.useregexp):
+            value = re.escape(data.normalize(value))
+        return re.compile(value, self._flags)
+
+    def _join_patterns(self, patterns):
+        if len(patterns) == 1:
+            return re.compile(patterns[0], self._flags)
+        return re.compile(u'|'.join([u'(?:%s)' % (pattern) for pattern in patterns]), self._flags)
+
+    def _make_glob_predicate(self, pattern):
+        match = re.compile(fnmatch.translate(pattern), self._flags).match
+        def predicate(locations):
+            for location in locations:
+                if match(location):
+                    return True
+                # Also match without the line number and directory
+                location = _line_number_re.sub(u'', location)
+                if match(location) or match(location.rsplit(u'/', 1)[-1]):
+                    return True
+            return False
+        return predicate
+
+    def _make_strings_predicate(self, regexp):
+        search = regexp.search
+        def predicate(strings):
+            for string in strings:
+                if search(string):
+                    return True
+            return False
+        return predicate
+
+
+    # ACCESSORS #
+    @classmethod
+    def is_query(cls, text):
+        """Return C{True} if C{text} contains any C{field:value} terms."""
+        for field, value, is_regexp in cls.parse(text):
+            if field is not None:
+                return True
+        return False
+
+    def get_highlight_regexp(self):
+        """Return a regular expression matching everything that should be
+            highlighted in the source and target text, or C{None}."""
+        patterns = []
+        for part in ('target', 'source'):
+            if part in self._part_regexps and self._part_regexps[part].pattern not in patterns:
+                patterns.append(self._part_regexps[part].pattern)
+        if not patterns:
+            return None
+        return self._join_patterns(patterns)
+
+
+    # METHODS #
+    def filter(self, fields, candidates=None, get_state_set=None):
+        """Return the model indexes of the units matching the query, in order.
+
+            @type  fields: L{UnitFieldTable}
+            @param candidates: The model indexes to look at (all by default).
+            @param get_state_set: Returns the L{Bitset} of the units with the
+                given state name or extended state ID (like
+                L{FilterIndex.get()}). Required for queries with states."""
+        if candidates is None:
+            candidates = xrange(len(fields))
+        if self.states:
+            state_set = get_state_set(self._state_key(self.states[0]))
+            for state in self.states[1:]:
+                state_set = state_set.intersection(get_state_set(self._state_key(state)))
+            indexes = [index for index in candidates if index in state_set]
+        else:
+            indexes = list(candidates)
+
+        for cost, field, predicate in self._predicates:
+            if not indexes:
+                break
+            if field is None:
+                sources, targets = fields.get('source'), fields.get('target')
+                indexes = [i for i in indexes if predicate(targets[i]) or predicate(sources[i])]
+            else:
+                values = fields.get(field)
+                indexes = [i for i in indexes if predicate(values[i])]
+        return indexes
+
+    def find_matches(self, unit):
+        """Return the matches in the source and target text of C{unit} as
+            C{GrepMatch}es, in the order that C{GrepFilter} finds them."""
+        matches = []
+        for part in ('target', 'source'):
+            if part not in self._part_regexps:
+                continue
+            strings = getattr(unit, part)
+            if unit.hasplural():
+                strings = strings.strings
+            else:
+                strings = [strings]
+            matches.extend(find_matches(unit, part, strings, self._part_regexps[part]))
+        return matches
+
+    def _state_key(self, state):
+        return _extended_states.get(state, state)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""A disk cache of parsed translation stores.
+
+Opening a large file means parsing it and classifying all of its units. When
+the file did not change since the last time it was opened or saved, the
+parsed store and its statistics are loaded from a pickled snapshot instead.
+
+Each file has at most one snapshot, named after a hash of its path. The
+snapshot starts with a small header describing the file it was made from
+(modification time, size and a hash of the content), so that a stale
+snapshot is never used. The least recently used snapshots are removed when
+the cache grows beyond its size limit."""
+
+import logging
+import os
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import sha as sha1
+
+from translate.__version__ import sver as toolkit_version
+
+
+SNAPSHOT_VERSION = 1
+"""Increase this whenever the contents of snapshots change."""
+
+SNAPSHOT_SUFFIX = '.snapshot'
+
+
+class SnapshotCache(object):
+    """Stores and retrieves pickled snapshots of parsed stores."""
+
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+    """The default maximum total size of all snapshots, in bytes."""
+
+    # INITIALIZERS #
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+
+    # ACCESSORS #
+    def _get_snapshot_filename(self, filename):
+        path = os.path.abspath(filename)
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+        return os.path.join(self.cache_dir, sha1(path).hexdigest() + SNAPSHOT_SUFFIX)
+
+    def _get_file_key(self, filename):
+        """Describe the current version of the given file so that a snapshot
+            can be matched to it."""
+        st = os.stat(filename)
+        digest = sha1()
+        f = open(filename, 'rb')
+        try:
+            while True:
+                data = f.read(1024 * 1024)
+                if not data:
+                    break
+                digest.update(data)
+        finally:
+            f.close()
+        return (
+            SNAPSHOT_VERSION, toolkit_version, os.path.abspath(filename),
+            st.st_mtime, st.st_size, digest.hexdigest()
+        )
+
+
+    # METHODS #
+    def load(self, filename):
+        """Return the data stored for the given file, or C{None} if there is
+            no snapshot of the current version of the file."""
+        snapshot_filename = self._get_snapshot_filename(filename)
+        if not os.path.isfile(snapshot_filename):
+            return None
+        try:
+            key = self._get_file_key(filename)
+            f = open(snapshot_filename, 'rb')
+            try:
+                if pickle.load(f) != key:
+                    return None
+                data = pickle.load(f)
+            finally:
+                f.close()
+        except Exception, e:
+            logging.debug('Discarding unusable snapshot of %s: %s' % (filename, e))
+            self.remove(filename)
+            return None
+        # Mark the snapshot as recently used
+        try:
+            os.utime(snapshot_filename, None)
+        except OSError:
+            pass
+        logging.debug('Loaded snapshot of %s' % (filename))
+        return data
+
+    def save(self, filename, data):
+        """Store a snapshot of C{data} for the current version of the given
+            file.
+
+            @returns: C{True} if the snapshot was stored, or C{False} if the
+                data could not be serialised (for example because the store is
+                implemented with C objects)."""
+        snapshot_filename = self._get_snapshot_filename(filename)
+        try:
+            key = self._get_file_key(filename)
+            dump = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        except Exception, e:
+            logging.debug('Not creating a snapshot of %s: %s' % (filename, e))
+            self.remove(filename)
+            return False
+
+        tempname = snapshot_filename + '.tmp'
+        try:
+            f = open(tempname, 'wb')
+            try:
+                pickle.dump(key, f, pickle.HIGHEST_PROTOCOL)
+                f.write(dump)
+            finally:
+                f.close()
+            if os.name == 'nt' and os.path.exists(snapshot_filename):
+                os.remove(snapshot_filename)
+            os.rename(tempname, snapshot_filename)
+        except (IOError, OSError), e:
+            logging.warning('Could not write snapshot of %s: %s' % (filename, e))
+            try:
+                os.remove(tempname)
+            except OSError:
+                pass
+            return False
+
+        self.evict()
+        return True
+
+    def remove(self, filename):
+        """Remove the snapshot of the given file, if there is one."""
+        try:
+            os.remove(self._get_snapshot_filename(filename))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Remove the least recently used snapshots until the cache fits in
+            its maximum size."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(SNAPSHOT_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+_cache = None
+
+def get_cache():
+    """Return the snapshot cache in Virtaal's configuration directory, or
+        C{None} if snapshots were disabled."""
+    global _cache
+    from virtaal.common import pan_app
+    if not pan_app.SNAPSHOT_CACHE:
+        return None
+    if _cache is None:
+        try:
+            max_size = int(pan_app.settings.general['snapshotcachesize']) * 1024 * 1024
+        except (KeyError, ValueError, AttributeError):
+            max_size = SnapshotCache.DEFAULT_MAX_SIZE
+        try:
+            _cache = SnapshotCache(os.path.join(pan_app.get_config_dir(), u'snapshots'), max_size)
+        except OSError, e:
+            logging.warning('Snapshot cache disabled: %s' % (e))
+            pan_app.SNAPSHOT_CACHE = False
+            return None
+    return _cache
@@ -18,30 +18,49 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
+import gobject
 import os
 
 from virtaal.common import pan_app
 
 from basemodel import BaseModel
+from editstate import EditStateTable
 
 
-def fix_indexes(stats, valid_units=None):
-    """convert statsdb array to use model index instead of storage class index"""
-    if valid_units is None:
-        valid_units = stats['total']
-
-    new_stats = {}
-    if valid_units:
-        valid_unit_indexes = dict([(uindex, index) for (index, uindex) in enumerate(valid_units)])
-        # Adjust stats
-        for key in stats:
-            if key == 'extended':
-                new_stats['extended'] = {}
-                for estate in stats['extended']:
-                    new_stats['extended'][estate] = [valid_unit_indexes[i] for i in stats['extended'][estate]]
-                continue
-            new_stats[key] = [valid_unit_indexes[i] for i in stats[key]]
-    return new_stats
+class UnitSequence(object):
+    """A read-only view of the translatable units of a store.
+
+        This does not copy any units: it indexes into the store's unit list
+        through the list of valid unit indexes."""
+
+    def __init__(self, storemodel):
+        self._storemodel = storemodel
+        self._units = storemodel._trans_store.units
+        self._valid_units = storemodel._valid_units
+
+    def __len__(self):
+        return len(self._valid_units)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            units = self._units
+            return [units[i] for i in self._valid_units[index]]
+        return self._units[self._valid_units[index]]
+
+    def __iter__(self):
+        units = self._units
+        for uindex in self._valid_units:
+            yield units[uindex]
+
+    def __contains__(self, unit):
+        return self._storemodel.get_unit_index(unit) is not None
+
+    def index(self, unit):
+        """Return the model index of the given unit (by identity)."""
+        index = self._storemodel.get_unit_index(unit)
+        if index is None:
+            raise ValueError('Unit not in store')
+        return index
 
 
 class StoreModel(BaseModel):
@@ -52,12 +71,50 @@ class StoreModel(BaseModel):
     """
 
     __gtype_name__ = "StoreModel"
+    __gsignals__ = {
+        "units-added": (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, (gobject.TYPE_INT, gobject.TYPE_INT)),
+        "load-failed": (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, (gobject.TYPE_PYOBJECT,)),
+        "save-failed": (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, (gobject.TYPE_PYOBJECT,)),
+        "update-progress": (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, (gobject.TYPE_FLOAT, gobject.TYPE_STRING)),
+        "updated": (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, (gobject.TYPE_PYOBJECT,)),
+        "update-failed": (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, (gobject.TYPE_PYOBJECT,)),
+        "unit-stats-changed": (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, (gobject.TYPE_INT,)),
+        "unit-checks-changed": (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, (gobject.TYPE_INT,)),
+        "checks-progress": (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, (gobject.TYPE_FLOAT,)),
+        "checks-updated": (gobject.SIGNAL_RUN_FIRST, gobject.TYPE_NONE, ()),
+    }
+
+    LOAD_CHUNK_SIZE = 2000
+    """The number of units handed to the GUI at a time while a PO file is
+        loaded progressively."""
 
     # INITIALIZERS #
-    def __init__(self, fileobj, controller):
+    def __init__(self, fileobj, controller, progressive=False):
         super(StoreModel, self).__init__()
         self.controller = controller
-        self.load_file(fileobj)
+        self._load_job = None
+        self._save_job = None
+        self._snapshot_current = False
+        self._save_units = None
+        self._update_job = None
+        self._checks_job = None
+        self._checks_outdated = set()
+        self._checks_progress = 1.0
+        self._check_results = None
+        self.checks = None
+        self._stats_engine = None
+        self._units_view = None
+        self._filter_index = None
+        self._search_index = None
+        self._search_index_job = None
+        self._search_index_changes = set()
+        self._search_cache = None
+        self._unit_fields = None
+        self._dirty_indices = set()
+        self._saving_indices = set()
+        self._saved_indices = set()
+        self._edit_states = EditStateTable()
+        self.load_file(fileobj, progressive=progressive)
 
 
     # SPECIAL METHODS #
@@ -67,17 +124,42 @@ class StoreModel(BaseModel):
 
     def __len__(self):
         if not self._trans_store:
+            if self.is_loading():
+                return 0
             return -1
         return len(self._valid_units)
 
 
     # ACCESSORS #
     def get_filename(self):
+        if self._trans_store is None and self.is_loading():
+            return self.filename
         return self._trans_store and self._trans_store.filename or None
 
+    def is_loading(self):
+        """Whether a progressive load is still busy parsing the file."""
+        return self._load_job is not None
+
+    def is_updating(self):
+        """Whether a background template update is still busy."""
+        return self._update_job is not None
+
+    def is_saving(self):
+        """Whether a background save is still busy writing the file."""
+        return self._save_job is not None
+
     def get_checker(self):
         return self._checker
 
+    def is_checking(self):
+        """Return C{True} while the checks run in the background."""
+        return self._checks_job is not None
+
+    def get_checks_progress(self):
+        """Return the fraction of the units checked by the background
+            checks."""
+        return self._checks_progress
+
     def get_source_language(self):
         """Return the current store's source language."""
         candidate = self._trans_store.units[0].getsourcelanguage()
@@ -109,23 +191,95 @@ class StoreModel(BaseModel):
         """Get a specific unit by index."""
         return self._trans_store.units[self._valid_units[index]]
 
+    def get_unit_index(self, unit):
+        """Return the model index of the given unit, or C{None} if it is not
+            one of this store's (translatable) units.
+
+            Units are looked up by identity, so this takes constant time."""
+        if self._stats_engine is not None:
+            return self._stats_engine.get_index(unit)
+        # Still loading progressively
+        for index, uindex in enumerate(self._valid_units):
+            if self._trans_store.units[uindex] is unit:
+                return index
+        return None
+
     def get_units(self):
-        # TODO: Add caching
-        """Return the current store's (filtered) units."""
-        return [self._trans_store.units[i] for i in self._valid_units]
+        """Return the current store's (filtered) units.
+
+            The result is a read-only sequence that is shared between callers
+            until the structure of the store changes."""
+        if self._units_view is None:
+            self._units_view = UnitSequence(self)
+        return self._units_view
+
+    def has_dirty_units(self):
+        """Whether any units changed since the file was last saved."""
+        return bool(self._dirty_indices)
+
+    def get_dirty_units(self):
+        """Return the units that changed since the file was last saved, in
+            the order of the store."""
+        return [self.get_unit(index) for index in sorted(self._dirty_indices)]
+
+    def get_saved_units(self):
+        """Return the changed units that were written by the last save, in
+            the order of the store."""
+        return [self.get_unit(index) for index in sorted(self._saved_indices)]
+
+    def get_filter_index(self):
+        """Return the L{FilterIndex} of the current statistics and checks."""
+        if self._filter_index is None:
+            if not self.stats:
+                return None
+            from filterindex import FilterIndex
+            self._filter_index = FilterIndex.from_stats(self.stats, self.checks)
+        return self._filter_index
+
+    def get_search_index(self):
+        """Return the L{SearchIndex} of this store, or C{None} if it is not
+            (yet) available."""
+        return self._search_index
+
+    def get_search_cache(self):
+        """Return the L{SearchResultCache} for searches in this store. It is
+            cleared whenever the text of a unit changes."""
+        if self._search_cache is None:
+            from searchcache import SearchResultCache
+            self._search_cache = SearchResultCache()
+        return self._search_cache
+
+    def get_unit_fields(self, build=True):
+        """Return the L{UnitFieldTable} with the text of all units, for
+            fielded search queries. It is built with the search index, or
+            here if it is needed before that (unless C{build} is C{False},
+            in which case C{None} is returned)."""
+        if self._unit_fields is None and build:
+            from searchquery import UnitFieldTable
+            self._unit_fields = UnitFieldTable(self.get_units())
+        return self._unit_fields
+
+    def get_edit_states(self):
+        """Return the L{EditStateTable} for the units of this store."""
+        return self._edit_states
 
     def get_stats_totals(self):
         """Return totals for word and string counts."""
-        if not self.filename:
+        if not self._stats_engine:
             return {}
-        from translate.storage import statsdb
-        totals = statsdb.StatsCache().file_extended_totals(self.filename,  self._trans_store)
-        return totals
+        return self._stats_engine.get_totals()
 
 
     # METHODS #
-    def load_file(self, fileobj):
+    def load_file(self, fileobj, progressive=False):
+        """Load the given file into this model.
+
+            If C{progressive} is C{True}, the file is parsed in a worker thread
+            and this method returns immediately. The "units-added" signal is
+            emitted as translatable units become available, and "loaded" is
+            emitted once all units and statistics are ready."""
         # Adapted from Document.__init__()
+        self.cancel_loading()
         filename = fileobj
         if isinstance(filename, basestring):
             if not os.path.exists(filename):
@@ -141,87 +295,855 @@ class StoreModel(BaseModel):
                 filename = '<projectfile>'
         import logging
         logging.info('Loading file %s' % (filename))
+        self.filename = filename
+        self._clear_dirty_units()
+        self._discard_checks()
+        self._edit_states = EditStateTable()
+        self.discard_search_index()
+        self._snapshot_current = self._load_snapshot(fileobj)
+        if self._snapshot_current:
+            return
+        if progressive:
+            self._start_progressive_load(fileobj)
+            return
         from translate.storage import factory
         self._trans_store = factory.getobject(fileobj)
-        self.filename = filename
         self.update_stats(filename=filename)
         #self._correct_header(self._trans_store)
         self.nplurals = self._compute_nplurals(self._trans_store)
 
-    def save_file(self, filename=None):
+    def _load_snapshot(self, fileobj):
+        """Load the store from the snapshot cache, if the cache has a snapshot
+            of the current version of the file.
+
+            @returns: C{True} if the store was loaded from a snapshot."""
+        if not isinstance(fileobj, basestring):
+            return False
+        from snapshotcache import get_cache
+        cache = get_cache()
+        if cache is None:
+            return False
+        snapshot = cache.load(fileobj)
+        if not snapshot:
+            return False
+        self._trans_store = snapshot['store']
+        self._stats_engine = snapshot['stats']
+        self._valid_units = self._stats_engine.valid_units
+        self._units_view = None
+        self._filter_index = None
+        self.stats = self._stats_engine.stats
+        self.nplurals = snapshot['nplurals']
+        return True
+
+    def save_snapshot(self, background=False):
+        """Store a snapshot of the store as it is on disk, so that reopening
+            the file can skip parsing it. The caller has to make sure that the
+            store has no unsaved changes.
+
+            Pickling a large store takes long, so this is meant to be done
+            when the file is closed. If C{background} is C{True}, the
+            snapshot is written by a worker thread, and the store must not be
+            changed any more.
+
+            @returns: The L{BackgroundJob} writing the snapshot, or C{None}."""
+        if self.is_loading() or self.is_updating() or self.is_saving() or self.has_dirty_units():
+            return None
+        if self._snapshot_current:
+            # Loaded from a snapshot and not saved since
+            return None
+        filename = self._trans_store and self._trans_store.filename
+        if not isinstance(filename, basestring) or not os.path.isfile(filename):
+            return None
+        from snapshotcache import get_cache
+        cache = get_cache()
+        if cache is None:
+            return None
+        data = {
+            'store': self._trans_store,
+            'stats': self._stats_engine,
+            'nplurals': self.nplurals,
+        }
+        if not background:
+            cache.save(filename, data)
+            return None
+        from virtaal.support.thread import BackgroundJob
+        return BackgroundJob(self._write_snapshot, (cache, filename, data)).start()
+
+    def _write_snapshot(self, job, cache, filename, data):
+        cache.save(filename, data)
+
+    def cancel_loading(self):
+        """Stop a progressive load that is still in progress."""
+        if self._load_job is not None:
+            self._load_job.cancel()
+            self._load_job = None
+
+    def _start_progressive_load(self, fileobj):
+        self._trans_store = None
+        self._valid_units = []
+        self._stats_engine = None
+        self._units_view = None
+        self.nplurals = None
+        self._filter_index = None
+        self.stats = {
+            'total': [], 'translated': [], 'fuzzy': [], 'untranslated': [],
+            'extended': {},
+        }
+        from virtaal.support.thread import BackgroundJob
+        self._load_job = BackgroundJob(
+            self._parse_in_background, (fileobj,),
+            on_done=self._on_progressive_load_done,
+            on_error=self._on_progressive_load_error,
+        )
+        self._load_job.start()
+
+    def _parse_in_background(self, job, fileobj):
+        """Runs in the worker thread: parse the file and hand over the
+            translatable units.
+
+            Gettext PO files are handed over in chunks while they are being
+            parsed. The other formats can only be parsed as a whole, so for
+            them the load only keeps the GUI responsive, and all units are
+            handed over at once when the file is parsed."""
+        from translate.storage import factory, pypo
+        if isinstance(fileobj, basestring) and factory.getclass(fileobj) is pypo.pofile:
+            return self._parse_po_in_background(job, fileobj)
+        store = factory.getobject(fileobj)
+        if job.cancelled:
+            return None
+        unit_indexes = [index for index, unit in enumerate(store.units) if unit.istranslatable()]
+        if unit_indexes:
+            job.post(self._on_units_parsed, store, unit_indexes)
+        return store
+
+    def _parse_po_in_background(self, job, filename):
+        """Parse the PO file unit by unit (like C{pypo.pofile.parse()}), and
+            hand over every C{LOAD_CHUNK_SIZE} translatable units as soon as
+            they are parsed."""
+        from cStringIO import StringIO
+        from translate.storage import factory, poparser, pypo
+        ext = os.path.splitext(filename)[1][len(os.path.extsep):].lower()
+        if ext in factory.decompressclass:
+            _module, _class = factory.decompressclass[ext]
+            module = __import__(_module, globals(), {}, [])
+            storefile = getattr(module, _class)(filename)
+        else:
+            storefile = open(filename, 'rb')
+        try:
+            parse_state = poparser.ParseState(StringIO(storefile.read()), pypo.pounit)
+        finally:
+            storefile.close()
+
+        store = pypo.pofile()
+        store.filename = filename
+        store.units = []
+        chunk = []
+        unit = poparser.parse_header(parse_state, store)
+        while unit:
+            if job.cancelled:
+                return None
+            unit.infer_state()
+            store.addunit(unit)
+            if unit.istranslatable():
+                chunk.append(len(store.units) - 1)
+                if len(chunk) >= self.LOAD_CHUNK_SIZE:
+                    job.post(self._on_units_parsed, store, chunk)
+                    chunk = []
+            unit = poparser.parse_unit(parse_state)
+        if chunk:
+            job.post(self._on_units_parsed, store, chunk)
+        return store
+
+    def _on_units_parsed(self, store, unit_indexes):
+        if self._trans_store is not store:
+            self._trans_store = store
+            self._units_view = None
+        start = len(self._valid_units)
+        self._valid_units.extend(unit_indexes)
+        self.stats['total'].extend(range(start, len(self._valid_units)))
+        self._filter_index = None
+        if self._unit_fields is not None:
+            for index in xrange(start, len(self._valid_units)):
+                self._unit_fields.append(self.get_unit(index))
+        self.emit('units-added', start, len(unit_indexes))
+
+    def _on_progressive_load_done(self, store):
+        self._load_job = None
+        self._trans_store = store
+        self.update_stats()
+        self.nplurals = self._compute_nplurals(self._trans_store)
+        self.loaded()
+
+    def _on_progressive_load_error(self, exc):
+        self._load_job = None
+        self.emit('load-failed', exc)
+
+    def save_file(self, filename=None, background=False):
+        """Save the store to C{filename}, or to the file it was loaded from.
+
+            If C{background} is C{True}, a snapshot of the store is written
+            by a worker thread and this method returns immediately. Units can
+            be edited while the file is written, as long as
+            L{prepare_unit_edit()} is called before a unit is changed. The
+            "saved" or "save-failed" signal is emitted when the save is done."""
+        self.wait_for_save()
+        self._snapshot_current = False
         self._update_header()
         if filename is None:
             filename = self.filename
-        if filename == self.filename:
-            self._trans_store.save()
+        self._saving_indices = self._dirty_indices
+        self._dirty_indices = set()
+        if background:
+            self._start_background_save(filename)
+            # The header might have been added above
+            self._update_valid_units()
+            return
+        try:
+            if filename == self.filename:
+                self._trans_store.save()
+            else:
+                self._trans_store.savefile(filename)
+        except:
+            self._restore_dirty_units()
+            raise
+        self.filename = filename
+        self._saved_indices = self._saving_indices
+        self._saving_indices = set()
+        # Saving can add a header unit, which shifts the store indexes
+        self._update_valid_units()
+
+    def wait_for_save(self):
+        """Block until a background save in progress is done."""
+        if self._save_job is not None:
+            self._save_job.wait()
+
+    def prepare_unit_edit(self, unit):
+        """Call this before changing C{unit}, so that a background save in
+            progress still writes the unit as it was when the save started."""
+        if self._save_units is None or unit is None:
+            return
+        index = self.get_unit_index(unit)
+        if index is None:
+            return
+        uindex = self._valid_units[index]
+        if self._save_units[uindex] is unit:
+            self._save_units[uindex] = self._freeze_unit(unit)
+
+    def mark_unit_dirty(self, unit):
+        """Remember that C{unit} changed since the file was last saved."""
+        index = self.get_unit_index(unit)
+        if index is not None:
+            self._dirty_indices.add(index)
+
+    def replace_matches(self, matches, replace_str):
+        """Replace the text of the given search matches in the targets of
+            their units, directly in the store.
+
+            Only matches in targets are replaced. This doesn't involve the
+            unit view at all, so the unit that is being edited should not be
+            changed this way.
+
+            @type  matches: list of C{translate.tools.pogrep.GrepMatch}
+            @returns: The model indexes of the changed units, and their
+                targets before the change (see L{set_targets()})."""
+        edits = {}
+        for match in matches:
+            if match.part != 'target':
+                continue
+            index = self.get_unit_index(match.unit)
+            if index is None:
+                continue
+            edits.setdefault(index, {}).setdefault(match.part_n, []).append(match)
+
+        from array import array
+        indices = array('i', sorted(edits))
+        targets = []
+        old_targets = []
+        for index in indices:
+            unit = self.get_unit(index)
+            if unit.hasplural():
+                old_targets.append(list(unit.target.strings))
+                strings = list(old_targets[-1])
+            else:
+                old_targets.append(unit.target)
+                strings = [old_targets[-1]]
+            for part_n, part_matches in edits[index].iteritems():
+                text = strings[part_n]
+                # Replace from the end, so that the offsets of earlier matches stay valid
+                for match in sorted(part_matches, key=lambda m: m.start, reverse=True):
+                    text = text[:match.start] + replace_str + text[match.end:]
+                strings[part_n] = text
+            if isinstance(old_targets[-1], list):
+                targets.append(strings)
+            else:
+                targets.append(strings[0])
+        self._set_targets(indices, old_targets, targets)
+        return indices, old_targets
+
+    def set_targets(self, indices, targets):
+        """Set the targets of the units at the given model indexes directly in
+            the store, and update everything that depends on them.
+
+            @returns: The targets of the units before they were set, so that
+                the change can be undone by calling this again."""
+        old_targets = []
+        for index in indices:
+            unit = self.get_unit(index)
+            if unit.hasplural():
+                old_targets.append(list(unit.target.strings))
+            else:
+                old_targets.append(unit.target)
+        self._set_targets(indices, old_targets, targets)
+        return old_targets
+
+    def _set_targets(self, indices, old_targets, targets):
+        def is_empty(target):
+            if isinstance(target, list):
+                return not [s for s in target if s]
+            return not target
+
+        if self._search_cache is not None:
+            self._search_cache.clear()
+        for index, old_target, target in zip(indices, old_targets, targets):
+            unit = self.get_unit(index)
+            self.prepare_unit_edit(unit)
+            unit.target = target
+            self._dirty_indices.add(index)
+            self._mark_index_text_changed(index)
+            # Only a change between empty and non-empty text can change the
+            # state of a unit
+            if is_empty(old_target) != is_empty(target):
+                self.update_unit_stats(unit)
+
+    def _clear_dirty_units(self):
+        self._dirty_indices = set()
+        self._saving_indices = set()
+        self._saved_indices = set()
+
+    def _restore_dirty_units(self):
+        """The changes that we tried to save are still unsaved."""
+        self._dirty_indices |= self._saving_indices
+        self._saving_indices = set()
+
+    def _freeze_unit(self, unit):
+        """Return a copy of C{unit} that doesn't share any mutable state
+            with it, without copying the store it belongs to."""
+        import copy
+        frozen = copy.copy(unit)
+        for name, value in frozen.__dict__.items():
+            if isinstance(value, list):
+                setattr(frozen, name, list(value))
+            elif isinstance(value, dict):
+                setattr(frozen, name, value.copy())
+        return frozen
+
+    def _start_background_save(self, filename):
+        """Take a cheap snapshot of the store and write it in a worker."""
+        import copy
+        try:
+            from translate.storage.lisa import LISAfile
+        except ImportError:
+            # Without lxml there are no LISA based stores
+            LISAfile = ()
+        snapshot = copy.copy(self._trans_store)
+        if isinstance(self._trans_store, LISAfile):
+            # Units are views into the XML document, so copy the document
+            # itself (which lxml does quickly) instead.
+            snapshot.document = copy.deepcopy(self._trans_store.document)
+            self._save_units = None
         else:
-            self._trans_store.savefile(filename)
+            # Units are only copied when they are about to change (see
+            # prepare_unit_edit()).
+            snapshot.units = list(self._trans_store.units)
+            self._save_units = snapshot.units
+
+        from virtaal.support.thread import BackgroundJob
+        self._save_job = BackgroundJob(
+            self._write_in_background, (snapshot, filename),
+            on_done=self._on_background_save_done,
+            on_error=self._on_background_save_error,
+        )
+        self._save_job.start()
+
+    def _write_in_background(self, job, snapshot, filename):
+        """Runs in the worker thread: serialise C{snapshot} to a temporary
+            file and move it over C{filename}."""
+        import stat
+        import tempfile
+        data = str(snapshot)
+        dirname, basename = os.path.split(os.path.abspath(filename))
+        fd, tempname = tempfile.mkstemp(prefix='.%s.' % (basename), dir=dirname)
+        try:
+            f = os.fdopen(fd, 'wb')
+            try:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                f.close()
+            if os.path.exists(filename):
+                os.chmod(tempname, stat.S_IMODE(os.stat(filename).st_mode))
+                if os.name == 'nt':
+                    # Renaming over an existing file fails on Windows
+                    os.remove(filename)
+            os.rename(tempname, filename)
+        except:
+            if os.path.exists(tempname):
+                os.remove(tempname)
+            raise
+        return filename
+
+    def _on_background_save_done(self, filename):
+        self._save_job = None
+        self._save_units = None
+        if filename != self.filename:
+            self._trans_store.filename = filename
+            self._trans_store.fileobj = None
         self.filename = filename
-        self.update_stats(filename=filename)
+        self._saved_indices = self._saving_indices
+        self._saving_indices = set()
+        self.saved()
+
+    def _on_background_save_error(self, exc):
+        self._save_job = None
+        self._save_units = None
+        self._restore_dirty_units()
+        self.emit('save-failed', exc)
+
+    def build_search_index(self):
+        """Start building the search index in the background."""
+        self.discard_search_index()
+        if self._trans_store is None:
+            return
+        from virtaal.support.thread import BackgroundJob
+        self._search_index_job = BackgroundJob(
+            self._build_search_index, (list(self.get_units()),),
+            on_done=self._on_search_index_built,
+        )
+        self._search_index_job.start()
+
+    def mark_unit_text_changed(self, unit):
+        """Tell the search index and cache that the text of C{unit} changed."""
+        if self._search_cache is not None:
+            self._search_cache.clear()
+        index = self.get_unit_index(unit)
+        if index is not None:
+            self._mark_index_text_changed(index)
+
+    def _mark_index_text_changed(self, index):
+        if self._check_results is not None:
+            self._check_results.mark_stale(index)
+            if self._checks_job is not None:
+                # The background checks might have seen the old text
+                self._checks_outdated.add(index)
+        if self._unit_fields is not None:
+            self._unit_fields.update(index, self.get_unit(index))
+        if self._search_index is not None:
+            self._search_index.mark_changed(index)
+        elif self._search_index_job is not None:
+            # The unit might already be indexed with its old text
+            self._search_index_changes.add(index)
+
+    def discard_search_index(self):
+        """Drop the search index, cached search results and unit fields, and
+            stop building the index."""
+        if self._search_index_job is not None:
+            self._search_index_job.cancel()
+            self._search_index_job = None
+        self._search_index = None
+        self._search_index_changes = set()
+        self._search_cache = None
+        self._unit_fields = None
+
+    def _build_search_index(self, job, units):
+        from searchindex import SearchIndex
+        from searchquery import UnitFieldTable
+        search_index = SearchIndex.build(units, cancelled=lambda: job.cancelled)
+        if search_index is None:
+            return None
+        return search_index, UnitFieldTable(units)
+
+    def _on_search_index_built(self, result):
+        self._search_index_job = None
+        if result is None:
+            return
+        search_index, unit_fields = result
+        for index in self._search_index_changes:
+            search_index.mark_changed(index)
+        if self._unit_fields is None:
+            for index in self._search_index_changes:
+                unit_fields.update(index, self.get_unit(index))
+            self._unit_fields = unit_fields
+        self._search_index_changes = set()
+        self._search_index = search_index
 
     def update_stats(self, filename=None):
+        """Recalculate the statistics of all units in the store.
+
+            The C{filename} parameter is ignored and is only accepted for
+            compatibility, since the statistics are calculated in memory."""
         self.stats = None
+        self._filter_index = None
         if self._trans_store is None:
             return
 
-        if filename is None:
-            filename = self.filename
-
-        from translate.storage import statsdb
-        stats = statsdb.StatsCache().filestatestats(filename,  self._trans_store, extended=True)
-        self._valid_units = stats['total']
-        self.stats = fix_indexes(stats)
+        from storestats import StoreStats
+        self._stats_engine = StoreStats(self._trans_store.units)
+        self._valid_units = self._stats_engine.valid_units
+        self._units_view = None
+        self.stats = self._stats_engine.stats
         return self.stats
 
-    def update_checks(self, checker=None, filename=None):
-        self.checks = None
+    def update_unit_stats(self, unit):
+        """Update the statistics after the given unit changed, without
+            looking at any other unit.
+
+            The "unit-stats-changed" signal is emitted with the model index
+            of the unit if its state changed.
+
+            @returns: C{True} if the state of the unit changed."""
+        if self._stats_engine is None:
+            return False
+        index = self._stats_engine.get_index(unit)
+        if index is None:
+            return False
+        old_state = self._stats_engine.get_state(index)
+        old_e_state = self._stats_engine.get_extended_state(index)
+        if not self._stats_engine.update_unit(unit):
+            return False
+
+        if self._filter_index is not None:
+            from translate.storage.statsdb import state_strings
+            new_state = self._stats_engine.get_state(index)
+            new_e_state = self._stats_engine.get_extended_state(index)
+            self._filter_index.discard(state_strings[old_state], index)
+            self._filter_index.add(state_strings[new_state], index)
+            self._filter_index.discard(old_e_state, index)
+            self._filter_index.add(new_e_state, index)
+        self.emit('unit-stats-changed', index)
+        return True
+
+    def get_check_results(self):
+        """Return the L{CheckResultTable} of the last L{update_checks()}, or
+            C{None}."""
+        return self._check_results
+
+    def update_unit_checks(self, unit, checker, failures):
+        """Update the check results after the given unit was checked again.
+
+            Results from another checker than the one used for the last
+            L{update_checks()} are ignored. The "unit-checks-changed" signal
+            is emitted with the model index of the unit if the checks that
+            it fails changed.
+
+            @param failures: The result of C{checker.run_filters(unit)}.
+            @returns: C{True} if the checks that the unit fails changed."""
+        from checkresults import get_checker_key
+        if self._check_results is None or get_checker_key(checker) != self._check_results.checker_key:
+            return False
+        index = self.get_unit_index(unit)
+        if index is None:
+            return False
+        if self._checks_job is not None:
+            # This result is newer than what the background checks will report
+            self._checks_outdated.add(index)
+
+        if self._set_unit_failures(index, ['check-' + name for name in failures]):
+            self.emit('unit-checks-changed', index)
+            return True
+        return False
+
+    def _set_unit_failures(self, index, names):
+        added, removed = self._check_results.set_failures(index, names)
+        if self._filter_index is not None:
+            for name in removed:
+                self._filter_index.discard(name, index)
+            for name in added:
+                self._filter_index.add(name, index)
+        return bool(added or removed)
+
+    def update_checks(self, checker=None, filename=None, background=False):
+        """Bring the check results of all units up to date.
+
+            If the last results are from the same checker, only the units
+            that changed since they were checked are checked again.
+            Otherwise all units are checked.
+
+            If C{background} is C{True}, the units are checked by several
+            processes (see L{virtaal.support.parallelchecks}) while this
+            returns right away. C{self.checks} is updated as the results come
+            in, and "checks-progress" is emitted with the fraction of units
+            checked, followed by "checks-updated" when all units are
+            checked."""
         if self._trans_store is None:
+            self.cancel_checks()
+            self.checks = None
+            self._check_results = None
+            self._filter_index = None
             return
 
-        if filename is None:
-            filename = self.filename
-
         if checker is None:
             checker = self._checker
         else:
             self._checker = checker
 
-        from translate.storage import statsdb
-        errors = statsdb.StatsCache().filechecks(filename, checker, self._trans_store)
-        self.checks = fix_indexes(errors, self._valid_units)
+        from checkcache import get_cache, run_filters
+        from checkresults import CheckResultTable, get_checker_key
+        cache = get_cache()
+        key = get_checker_key(checker)
+        if self._check_results is not None and self._check_results.checker_key == key:
+            if self._checks_job is not None:
+                # Already busy with this checker
+                return self.checks
+            indices = self._check_results.get_stale()
+            if not indices:
+                return self.checks
+        else:
+            self.cancel_checks()
+            self._filter_index = None
+            indices = None
+            if background:
+                self._check_results = CheckResultTable(key)
+            else:
+                self._check_results = CheckResultTable.from_checks(key, self._stats_engine.compute_checks(checker, cache))
+            self.checks = self._check_results.get_checks()
+            if not background:
+                return self.checks
+
+        if background:
+            from virtaal.support.thread import BackgroundJob
+            if indices is None:
+                indices = range(len(self._valid_units))
+            self._checks_outdated = set()
+            self._checks_progress = 0.0
+            self._checks_job = BackgroundJob(
+                self._run_checks, (checker, cache, indices, [self.get_unit(index) for index in indices]),
+                on_done=self._on_checks_done, on_error=self._on_checks_error,
+            )
+            self._checks_job.start()
+            return self.checks
+
+        units = [self.get_unit(index) for index in indices]
+        for index, failures in zip(indices, run_filters(checker, units, cache)):
+            self._set_unit_failures(index, ['check-' + name for name in failures])
         return self.checks
 
-    def update_file(self, filename):
-        # Adapted from Document.__init__()
-        from translate.storage import factory, statsdb
+    def cancel_checks(self):
+        """Stop checking units in the background. The checks found so far
+            are kept."""
+        if self._checks_job is not None:
+            self._checks_job.cancel()
+            self._checks_job = None
+            self._checks_progress = 1.0
+
+    def _discard_checks(self):
+        self.cancel_checks()
+        self.checks = None
+        self._check_results = None
+
+    def _run_checks(self, job, checker, cache, indices, units):
+        from virtaal.support import parallelchecks
+        from checkcache import get_unit_hash
+        from checkresults import get_checker_key
+        key = get_checker_key(checker)
+        total = len(indices)
+
+        if cache is not None:
+            # Report the results of unchanged units first, and only check
+            # the rest
+            hashes = [get_unit_hash(unit) for unit in units]
+            cached = cache.lookup(key, hashes)
+            failures = {}
+            positions = []
+            for pos, unit_hash in enumerate(hashes):
+                if unit_hash in cached:
+                    failures[indices[pos]] = ['check-' + name for name in cached[unit_hash]]
+                else:
+                    positions.append(pos)
+            if job.cancelled:
+                return
+            if failures:
+                job.post(self._on_checks_chunk, failures, float(len(failures)) / total)
+            if not positions:
+                return
+            indices = [indices[pos] for pos in positions]
+            units = [units[pos] for pos in positions]
+            hashes = [hashes[pos] for pos in positions]
+        done_before = total - len(indices)
+
+        check_units = parallelchecks.make_check_units(units)
+        def on_chunk(chunk_failures, done, chunks):
+            # Every unit of the chunk gets its results, also when it passes
+            start = (done - 1) * parallelchecks.CHUNK_SIZE
+            end = min(start + parallelchecks.CHUNK_SIZE, len(indices))
+            failures = {}
+            for pos in xrange(start, end):
+                failures[indices[pos]] = ['check-' + name for name in chunk_failures.get(pos, ())]
+            if cache is not None:
+                cache.store(key, [(hashes[pos], chunk_failures.get(pos, {})) for pos in xrange(start, end)])
+            job.post(self._on_checks_chunk, failures, float(done_before + end) / total)
+        parallelchecks.run_checks(
+            checker.__class__, checker.config.targetlanguage, check_units,
+            on_chunk=on_chunk, cancelled=lambda: job.cancelled
+        )
+
+    def _on_checks_chunk(self, failures, fraction):
+        for index in sorted(failures):
+            if index in self._checks_outdated:
+                continue
+            self._set_unit_failures(index, failures[index])
+        self._checks_progress = fraction
+        self.emit('checks-progress', fraction)
+
+    def _on_checks_done(self, result):
+        self._checks_job = None
+        outdated = self._checks_outdated
+        self._checks_outdated = set()
+        if outdated and self._check_results is not None:
+            # Units changed while they were being checked
+            self.update_checks(background=True)
+            return
+        self._checks_progress = 1.0
+        self.emit('checks-updated')
+
+    def _on_checks_error(self, exc):
+        import logging
+        logging.debug('Unable to check all units: %s' % (exc))
+        self._on_checks_done(None)
+
+    def update_file(self, filename, background=False, fuzzymatching=False):
+        """Update the store to the template in C{filename}, keeping the
+            existing translations.
+
+            If C{fuzzymatching} is C{True}, units that end up without a
+            translation get the best fuzzy match from the old translations.
+            This uses several processes, since it is slow.
+
+            If C{background} is C{True}, the merge happens in a worker thread
+            and this method returns immediately. "update-progress" is emitted
+            while it runs, followed by "updated" (with the statistics from
+            before the update) or "update-failed". The store only changes
+            once the merge is complete, so L{cancel_update()} leaves it as it
+            was."""
+        self.wait_for_save()
+        self.cancel_update()
+        if background:
+            from virtaal.support.thread import BackgroundJob
+            self._update_job = BackgroundJob(
+                self._merge_template, (filename, fuzzymatching),
+                on_done=self._on_background_update_done,
+                on_error=self._on_background_update_error,
+            )
+            self._update_job.start()
+            return
+
+        # The old statistics stay intact, since a new engine is created below
+        oldstats = self.stats
+        self._apply_update(self._merge_template(None, filename, fuzzymatching))
+        self.controller.compare_stats(oldstats, self.stats)
+
+    def cancel_update(self):
+        """Stop a background template update. The store is left unchanged."""
+        if self._update_job is not None:
+            self._update_job.cancel()
+            self._update_job = None
+
+    def _merge_template(self, job, filename, fuzzymatching):
+        """Merge the current translations into the template in C{filename}
+            and return the resulting store. If C{job} is given, this is
+            running in the worker thread of that job."""
+        def progress(fraction, text):
+            if job is not None:
+                job.post(self.emit, 'update-progress', fraction, text)
+        def cancelled():
+            return job is not None and job.cancelled
+
+        from translate.storage import factory
+        progress(0.0, _('Reading template'))
         newstore = factory.getobject(filename)
-        oldfilename = self._trans_store.filename
-        oldfileobj = self._trans_store.fileobj
+        if job is None:
+            oldstore = self._trans_store
+        else:
+            # The merge changes the old store, so work on a copy to be able to
+            # cancel
+            oldstore = self._trans_store.__class__.parsestring(str(self._trans_store))
+        if cancelled():
+            return None
 
-        #get a copy of old stats before we convert
-        from translate.filters import checks
-        oldstats = statsdb.StatsCache().filestats(oldfilename, checks.UnitChecker(), self._trans_store)
+        if fuzzymatching:
+            # This has to happen before the old units are marked obsolete
+            from virtaal.support import fuzzymatch
+            candidates = fuzzymatch.make_candidates(oldstore.units)
 
+        progress(0.2, _('Merging translations'))
         from translate.convert import pot2po
-        self._trans_store = pot2po.convert_stores(newstore, self._trans_store, fuzzymatching=False)
-        self._trans_store.fileobj = oldfileobj #Let's attempt to keep the old file and name if possible
+        newstore = pot2po.convert_stores(newstore, oldstore, fuzzymatching=False)
+        if cancelled():
+            return None
 
-        #FIXME: ugly tempfile hack, can we please have a pure store implementation of statsdb
-        import tempfile
-        import os
-        tempfd, tempfilename = tempfile.mkstemp()
-        os.write(tempfd, str(self._trans_store))
-        self.update_stats(filename=tempfilename)
-        os.close(tempfd)
-        os.remove(tempfilename)
+        if fuzzymatching:
+            progress(0.5, _('Looking for similar translations'))
+            if not self._apply_fuzzy_matches(newstore, candidates, progress, cancelled):
+                return None
+        progress(1.0, '')
+        return newstore
 
-        self.controller.compare_stats(oldstats, self.stats)
+    def _apply_fuzzy_matches(self, newstore, candidates, progress, cancelled):
+        """Fill untranslated units in C{newstore} with fuzzy matches from
+            C{candidates} (see L{fuzzymatch.make_candidates()}).
+
+            @returns: C{False} if cancelled."""
+        from virtaal.support import fuzzymatch
+        queries = []
+        for index, unit in enumerate(newstore.units):
+            if unit.istranslatable() and unit.source and not unit.target and not unit.hasplural():
+                queries.append((index, unicode(unit.source)))
+
+        def chunk_done(done, total):
+            progress(0.5 + 0.5 * done / total, _('Looking for similar translations'))
+        matches = fuzzymatch.find_matches(candidates, queries, progress=chunk_done, cancelled=cancelled)
+        if matches is None:
+            return False
+
+        for index, (target, notes) in matches.iteritems():
+            unit = newstore.units[index]
+            unit.target = target
+            if notes:
+                unit.addnote(notes, origin="translator")
+            unit.markfuzzy(True)
+        return True
+
+    def _apply_update(self, newstore):
+        self._snapshot_current = False
+        oldfilename = self._trans_store.filename
+        oldfileobj = self._trans_store.fileobj
+        self._trans_store = newstore
+        self._trans_store.fileobj = oldfileobj #Let's attempt to keep the old file and name if possible
+
+        self.update_stats()
+        # Model indexes changed, and the whole store needs saving anyway
+        self._clear_dirty_units()
+        self._discard_checks()
+        self._edit_states = EditStateTable()
+        self.discard_search_index()
 
         # store filename or else save is confused
         self._trans_store.filename = oldfilename
         self._correct_header(self._trans_store)
         self.nplurals = self._compute_nplurals(self._trans_store)
 
+    def _on_background_update_done(self, newstore):
+        self._update_job = None
+        if newstore is None:
+            return
+        oldstats = self.stats
+        self._apply_update(newstore)
+        self.emit('updated', oldstats)
+
+    def _on_background_update_error(self, exc):
+        self._update_job = None
+        self.emit('update-failed', exc)
+
     def _compute_nplurals(self, store):
         # Copied as-is from Document._compute_nplurals()
         # FIXME this needs to be pushed back into the stores, we don't want to import each format
@@ -238,15 +1160,21 @@ class StoreModel(BaseModel):
 
     def _correct_header(self, store):
         """This ensures that the file has a header if it is a poheader type of
-        file, and fixes the statistics if we had to add a header."""
+        file, and fixes the unit indexes if we had to add a header."""
         # Copied as-is from Document._correct_header()
         from translate.storage.poheader import poheader
         if isinstance(store, poheader) and not store.header():
             store.updateheader(add=True)
-            new_stats = {}
-            for key, values in self.stats.iteritems():
-                new_stats[key] = [value+1 for value in values]
-            self.stats = new_stats
+            self._update_valid_units()
+
+    def _update_valid_units(self):
+        """Make sure that we map to the right store indexes after untranslatable
+            units were added to or removed from the store."""
+        if self._stats_engine is None:
+            return
+        self._stats_engine.reindex(self._trans_store.units)
+        self._valid_units = self._stats_engine.valid_units
+        self._units_view = None
 
     def _update_header(self):
         """Make sure that headers are complete and update with current time (if applicable)."""
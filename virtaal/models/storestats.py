@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""In-memory statistics for an open translation store.
+
+This provides the same results as the parts of C{translate.storage.statsdb}
+that Virtaal uses, but works directly on the units of the store, so that
+nothing has to be written to or read from disk. Statistics of single units
+can be updated as they change."""
+
+from array import array
+from bisect import bisect_left, insort
+
+from translate.storage.statsdb import extended_state_strings, state_strings, \
+        statefordb, wordsinunit
+
+
+class StoreStats(object):
+    """Per-unit states and word counts of a store, with the derived index
+        lists in the format of C{StatsCache.filestatestats()}.
+
+        All indexes in C{self.stats} are model indexes (indexes into
+        C{self.valid_units}), while C{self.valid_units} contains the indexes
+        of the translatable units in the store's C{units} list."""
+
+    def __init__(self, units):
+        self.refresh(units)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Object identities don't survive pickling, so the lookup table is
+        # rebuilt from the (pickled along) units list instead.
+        del state['_index_of']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        units = self._units
+        self._index_of = dict([(id(units[uindex]), index) for (index, uindex) in enumerate(self.valid_units)])
+
+    # ACCESSORS #
+    def get_index(self, unit):
+        """Return the model index of the given unit, or C{None} if the unit
+            is not a (translatable) unit of this store."""
+        return self._index_of.get(id(unit), None)
+
+    def get_state(self, index):
+        """Return the statsdb state of the unit at the given model index."""
+        return self._states[index]
+
+    def get_extended_state(self, index):
+        return self._extended_states[index]
+
+    def get_totals(self):
+        """Return totals per workflow state, in the format of
+            C{StatsCache.file_extended_totals()}."""
+        self._ensure_wordcounts()
+        totals = {}
+        for index, e_state in enumerate(self._extended_states):
+            key = extended_state_strings[e_state]
+            if key not in totals:
+                totals[key] = {"units": 0, "sourcewords": 0, "targetwords": 0}
+            totals[key]["units"] += 1
+            totals[key]["sourcewords"] += self._sourcewords[index]
+            totals[key]["targetwords"] += self._targetwords[index]
+        return totals
+
+
+    # METHODS #
+    def refresh(self, units):
+        """Recalculate everything from the given list of units."""
+        self._units = units
+        self.valid_units = []
+        self._index_of = {}
+        self._states = array('b')
+        self._extended_states = array('b')
+        # Word counts are expensive and only needed for totals, so they are
+        # only calculated when first asked for.
+        self._sourcewords = None
+        self._targetwords = None
+
+        stats = {"total": [], "translated": [], "fuzzy": [], "untranslated": [], "extended": {}}
+        for uindex, unit in enumerate(units):
+            if not unit.istranslatable():
+                continue
+            index = len(self.valid_units)
+            self.valid_units.append(uindex)
+            self._index_of[id(unit)] = index
+
+            state = statefordb(unit)
+            e_state = unit.get_state_id()
+            self._states.append(state)
+            self._extended_states.append(e_state)
+
+            stats["total"].append(index)
+            stats[state_strings[state]].append(index)
+            stats["extended"].setdefault(e_state, []).append(index)
+        self.stats = stats
+        self._units_len = len(units)
+
+    def reindex(self, units):
+        """Update the store indexes after units without translatable content
+            (like a PO header) were added or removed.
+
+            The states of the units are kept as they are."""
+        if len(units) == self._units_len and units is self._units:
+            return
+        self._units = units
+        self.valid_units = [uindex for (uindex, unit) in enumerate(units) if id(unit) in self._index_of]
+        self._units_len = len(units)
+
+    def update_unit(self, unit):
+        """Update the statistics for the given unit after it changed.
+
+            @returns: C{True} if the state of the unit changed."""
+        index = self.get_index(unit)
+        if index is None:
+            return False
+
+        if self._sourcewords is not None:
+            self._sourcewords[index], self._targetwords[index] = wordsinunit(unit)
+
+        old_state, old_e_state = self._states[index], self._extended_states[index]
+        new_state, new_e_state = statefordb(unit), unit.get_state_id()
+        if (old_state, old_e_state) == (new_state, new_e_state):
+            return False
+
+        self._states[index] = new_state
+        self._extended_states[index] = new_e_state
+        if old_state != new_state:
+            self._move_index(index, self.stats[state_strings[old_state]], self.stats[state_strings[new_state]])
+        if old_e_state != new_e_state:
+            extended = self.stats["extended"]
+            self._move_index(index, extended[old_e_state], extended.setdefault(new_e_state, []))
+        return True
+
+    def _move_index(self, index, from_list, to_list):
+        pos = bisect_left(from_list, index)
+        if pos < len(from_list) and from_list[pos] == index:
+            del from_list[pos]
+        insort(to_list, index)
+
+    def _ensure_wordcounts(self):
+        if self._sourcewords is not None:
+            return
+        self._sourcewords = array('i')
+        self._targetwords = array('i')
+        for uindex in self.valid_units:
+            sourcewords, targetwords = wordsinunit(self._units[uindex])
+            self._sourcewords.append(sourcewords)
+            self._targetwords.append(targetwords)
+
+    def compute_checks(self, checker, cache=None):
+        """Run the given checker over all units and return the failures in
+            the format of C{StatsCache.filechecks()}, using model indexes.
+
+            @param cache: A L{CheckCache} with the results of units that
+                were checked before."""
+        from checkcache import run_filters
+        units = [self._units[uindex] for uindex in self.valid_units]
+        checks = {}
+        for index, failures in enumerate(run_filters(checker, units, cache)):
+            for checkname in failures:
+                checks.setdefault('check-' + checkname, []).append(index)
+        checker.setsuggestionstore(None)
+        return checks
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+
+from translate.filters import checks
+from translate.storage import po
+
+import checkcache
+from checkcache import CheckCache, get_unit_hash, run_filters
+
+
+po_contents = """msgid "Save %s"
+msgstr "Stoor"
+
+msgid "Quit."
+msgstr "Maak toe."
+"""
+
+
+class TestCheckCache(object):
+    def setup_method(self, method):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'checkcache.db')
+        self.checker = checks.StandardChecker()
+        self.checker.config.updatetargetlanguage('af')
+        self.key = ('StandardChecker', 'af')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.tempdir)
+
+    def test_store_and_lookup(self):
+        cache = CheckCache(self.filename)
+        cache.store(self.key, [('a', {'printf': u'Missing printf variable: %s'}), ('b', {})])
+        assert cache.lookup(self.key, ['a', 'b', 'c']) == {'a': {'printf': u'Missing printf variable: %s'}, 'b': {}}
+        assert cache.lookup(('StandardChecker', 'de'), ['a']) == {}
+        # The results survive closing the cache
+        assert CheckCache(self.filename).lookup(self.key, ['b']) == {'b': {}}
+
+    def test_version(self):
+        cache = CheckCache(self.filename)
+        cache.store(self.key, [('a', {})])
+        checkcache.CHECK_CACHE_VERSION += 1
+        try:
+            assert CheckCache(self.filename).lookup(self.key, ['a']) == {}
+        finally:
+            checkcache.CHECK_CACHE_VERSION -= 1
+
+    def test_evict(self):
+        cache = CheckCache(self.filename, max_entries=2)
+        cache.store(self.key, [('a', {}), ('b', {}), ('c', {})])
+        assert len(cache.lookup(self.key, ['a', 'b', 'c'])) == 2
+
+    def test_run_filters(self):
+        cache = CheckCache(self.filename)
+        units = po.pofile.parsestring(po_contents).units
+        expected = [self.checker.run_filters(unit) for unit in units]
+        assert run_filters(self.checker, units, cache) == expected
+        hashes = [get_unit_hash(unit) for unit in units]
+        assert cache.lookup(self.key, hashes) == dict(zip(hashes, expected))
+        # Cached results are used, and changed units are checked again
+        units[1].target = u'Maak toe'
+        assert run_filters(self.checker, units, cache) == [self.checker.run_filters(unit) for unit in units]
+        assert get_unit_hash(units[1]) != hashes[1]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from checkresults import CheckResultTable
+
+
+def _make_table():
+    return CheckResultTable.from_checks('key', {
+        'check-printf': [1, 4],
+        'check-endpunc': [4],
+    })
+
+def test_from_checks():
+    table = _make_table()
+    assert table.get_failures(4) == frozenset(['check-printf', 'check-endpunc'])
+    assert table.get_failures(2) == frozenset()
+
+def test_set_failures():
+    table = _make_table()
+    added, removed = table.set_failures(2, ['check-printf', 'check-urls'])
+    assert added == set(['check-printf', 'check-urls']) and not removed
+    assert table.get_checks()['check-printf'] == [1, 2, 4]
+    assert table.get_checks()['check-urls'] == [2]
+
+    added, removed = table.set_failures(4, [])
+    assert removed == set(['check-printf', 'check-endpunc']) and not added
+    assert table.get_checks()['check-printf'] == [1, 2]
+    assert table.get_checks()['check-endpunc'] == []
+    assert table.set_failures(1, ['check-printf']) == (set(), set())
+
+def test_stale():
+    table = _make_table()
+    table.mark_stale(4)
+    table.mark_stale(0)
+    assert table.get_stale() == [0, 4]
+    table.set_failures(4, ['check-printf'])
+    assert table.get_stale() == [0]
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from editstate import EditStateTable
+
+
+def test_flags():
+    states = EditStateTable(3)
+    assert not states.is_modified(1)
+    states.set_modified(1)
+    states.set_state_sticky(2)
+    assert states.is_modified(1) and not states.is_state_sticky(1)
+    assert states.is_state_sticky(2) and not states.is_modified(2)
+    states.set_modified(1, False)
+    assert not states.is_modified(1)
+
+def test_grows_as_needed():
+    states = EditStateTable()
+    assert states.get_current_state(10) is None
+    assert not states.is_modified(10)
+    states.set_current_state(10, -100)
+    assert len(states) == 11
+    assert states.get_current_state(10) == -100
+    assert states.get_current_state(9) is None
+
+def test_reset_and_clear():
+    states = EditStateTable(2)
+    workflow = object()
+    states.reset(0, 100)
+    states.set_modified(0)
+    states.set_workflow(0, workflow)
+    assert states.get_workflow(0) is workflow
+    states.reset(0, 30)
+    assert not states.is_modified(0)
+    assert states.get_current_state(0) == 30
+    states.clear(0)
+    assert states.get_current_state(0) is None
+    assert states.get_workflow(0) is None
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from translate.storage import po
+from translate.tools.pogrep import GrepFilter
+
+from matchindex import MatchIndex
+
+
+po_contents = """msgid "Open the file"
+msgstr "Maak die lêer oop"
+
+msgid "File"
+msgstr "Lêer"
+
+msgid "Close"
+msgstr "Maak toe"
+"""
+
+def _get_matches():
+    store = po.pofile.parsestring(po_contents)
+    grepfilter = GrepFilter(u'e', ('source', 'target'), ignorecase=True)
+    matches, indexes = grepfilter.getmatches(store.units)
+    return store.units, matches
+
+def test_lookup():
+    units, matches = _get_matches()
+    index = MatchIndex(matches)
+    assert len(index) == len(matches)
+    assert list(index) == matches
+    assert index.get_unit_matches(units[1]) == [m for m in matches if m.unit is units[1]]
+    assert index.get_part_matches(units[0], 'target', 0) == \
+            [m for m in matches if m.unit is units[0] and m.part == 'target']
+    assert index.get_part_matches(units[0], 'target', 1) == []
+    for pos, match in enumerate(matches):
+        assert index.index(match) == pos
+        assert index[pos] is match
+
+def test_remove():
+    units, matches = _get_matches()
+    index = MatchIndex(matches[:3])
+    index.extend(matches[3:])
+    removed = index.get_unit_matches(units[0])
+    for match in removed:
+        index.remove(match)
+    assert len(index) == len(matches) - len(removed)
+    assert index.get_unit_matches(units[0]) == []
+    assert list(index) == [m for m in matches if m.unit is not units[0]]
+    # The remaining matches keep their positions
+    last = matches[-1]
+    assert index.index(last) == len(matches) - 1
+    assert list(index.get_positions()) == [matches.index(m) for m in index]
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from searchcache import SearchResultCache
+
+
+def test_get():
+    cache = SearchResultCache()
+    cache.put(u'transl', True, False, ['m1', 'm2'], [3, 7])
+    assert cache.get(u'transl', True, False) == (['m1', 'm2'], [3, 7])
+    assert cache.get(u'transl', False, False) is None
+    assert cache.get(u'transl', True, True) is None
+    # Changing the returned lists doesn't change the cache
+    matches, indexes = cache.get(u'transl', True, False)
+    matches.remove('m1')
+    assert cache.get(u'transl', True, False) == (['m1', 'm2'], [3, 7])
+
+def test_refinable():
+    cache = SearchResultCache()
+    cache.put(u'tra', True, False, ['m1', 'm2', 'm3'], [1, 3, 7])
+    cache.put(u'transl', True, False, ['m2'], [3])
+    cache.put(u'trans', True, True, [], [])
+    assert cache.get_refinable(u'translat', True, False) == (3,)
+    assert cache.get_refinable(u'trap', True, False) == (1, 3, 7)
+    assert cache.get_refinable(u'translat', False, False) is None
+    assert cache.get_refinable(u'translat', True, True) is None
+    assert cache.get_refinable(u'file', True, False) is None
+
+def test_eviction():
+    cache = SearchResultCache(size=2)
+    cache.put(u'a', True, False, [], [])
+    cache.put(u'b', True, False, [], [])
+    cache.get(u'a', True, False)
+    cache.put(u'c', True, False, [], [])
+    assert len(cache) == 2
+    assert cache.get(u'b', True, False) is None
+    assert cache.get(u'a', True, False) is not None
+    cache.clear()
+    assert cache.get(u'a', True, False) is None
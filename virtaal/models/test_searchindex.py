@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from translate.storage import po
+
+from searchindex import SearchIndex
+
+
+po_contents = """msgid "Open the file"
+msgstr "Maak die lêer oop"
+
+msgid "Close"
+msgstr "Maak toe"
+
+msgid "File"
+msgstr ""
+"""
+
+def _make_index():
+    store = po.pofile.parsestring(po_contents)
+    return SearchIndex.build(store.units)
+
+def test_candidates():
+    index = _make_index()
+    assert index.get_candidates(u"file") == [0, 2]
+    assert index.get_candidates(u"MAAK") == [0, 1]
+    assert index.get_candidates(u"lêer") == [0]
+    assert index.get_candidates(u"nothing") == []
+
+def test_cannot_narrow():
+    index = _make_index()
+    assert index.get_candidates(u"fi") is None
+    assert index.get_candidates(u"fi.e", useregexp=True) is None
+    assert index.get_candidates(u"file", useregexp=True) == [0, 2]
+
+def test_changed_units():
+    index = _make_index()
+    index.mark_changed(1)
+    assert index.get_candidates(u"file") == [0, 1, 2]
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from translate.storage import po
+
+from virtaal.support.bitset import Bitset
+
+from searchquery import SearchQuery, UnitFieldTable
+
+
+po_contents = """#. Menu item
+#: src/menu.c:12
+msgctxt "menu"
+msgid "Open the file"
+msgstr "Maak die lêer oop"
+
+#: src/dialog.py:40
+msgid "Close"
+msgstr "Maak toe"
+
+#, fuzzy
+#: src/menu.c:30
+msgid "File"
+msgstr "Lêer"
+"""
+
+states = {'fuzzy': Bitset([2]), 'translated': Bitset([0, 1])}
+
+def _search(text, **kwargs):
+    store = po.pofile.parsestring(po_contents)
+    fields = UnitFieldTable(store.units)
+    return SearchQuery(text, **kwargs).filter(fields, get_state_set=lambda name: states.get(name, Bitset()))
+
+def test_parse():
+    assert SearchQuery.parse(u'note:"a b" target:/c d/ loc:*.c http://x') == [
+        ('note', u'a b', False), ('target', u'c d', True),
+        ('loc', u'*.c', False), (None, u'http://x', False),
+    ]
+    assert SearchQuery.is_query(u'open state:fuzzy')
+    assert not SearchQuery.is_query(u'Note: open')
+
+def test_fields():
+    assert _search(u'note:menu') == [0]
+    assert _search(u'loc:*.c') == [0, 2]
+    assert _search(u'loc:menu.?') == [0, 2]
+    assert _search(u'loc:dialog') == [1]
+    assert _search(u'ctx:menu') == [0]
+    assert _search(u'source:/^(open|close)/') == [0, 1]
+    assert _search(u'target:LÊER') == [0, 2]
+    assert _search(u'target:LÊER', ignorecase=False) == []
+
+def test_combined():
+    assert _search(u'loc:*.c state:fuzzy') == [2]
+    assert _search(u'loc:*.c file') == [0, 2]
+    assert _search(u'loc:*.c the file') == [0]
+    assert _search(u'state:rejected') == []
+
+def test_matches():
+    store = po.pofile.parsestring(po_contents)
+    query = SearchQuery(u'target:lêer file')
+    matches = query.find_matches(store.units[0])
+    assert [(match.part, match.start, match.end) for match in matches] == [
+        ('target', 9, 13), ('source', 9, 13),
+    ]
+    assert query.get_highlight_regexp().search(u'The FILE')
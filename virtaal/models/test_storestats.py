@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from translate.storage import po
+
+from storestats import StoreStats
+
+
+po_contents = """msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+msgid "One"
+msgstr "Een"
+
+#, fuzzy
+msgid "Two words"
+msgstr "Twee woorde"
+
+msgid "Three"
+msgstr ""
+"""
+
+def _make_store():
+    return po.pofile.parsestring(po_contents)
+
+def test_initial_stats():
+    store = _make_store()
+    stats = StoreStats(store.units)
+    assert stats.valid_units == [1, 2, 3]
+    assert stats.stats['total'] == [0, 1, 2]
+    assert stats.stats['translated'] == [0]
+    assert stats.stats['fuzzy'] == [1]
+    assert stats.stats['untranslated'] == [2]
+    assert stats.get_index(store.units[3]) == 2
+    assert stats.get_index(store.units[0]) is None
+
+def test_update_unit():
+    store = _make_store()
+    stats = StoreStats(store.units)
+    unit = store.units[3]
+    unit.target = u"Drie"
+    assert stats.update_unit(unit)
+    assert stats.stats['translated'] == [0, 2]
+    assert stats.stats['untranslated'] == []
+    assert not stats.update_unit(unit)
+    totals = stats.get_totals()
+    assert totals['unreviewed']['units'] == 2
+    assert totals['unreviewed']['sourcewords'] == 2
+
+def test_reindex():
+    store = _make_store()
+    stats = StoreStats(store.units)
+    store.units.insert(0, po.pounit(u""))
+    stats.reindex(store.units)
+    assert stats.valid_units == [2, 3, 4]
@@ -18,6 +18,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
+import gobject
 import locale
 import gtk
 
@@ -33,6 +34,10 @@ class QualityCheckMode(BaseMode):
     display_name = _("Quality Checks")
     widgets = []
 
+    PROGRESS_DELAY = 500
+    """The minimum time (in milliseconds) between updates of the menu while
+        the units are checked in the background."""
+
     # INITIALIZERS #
     def __init__(self, controller):
         """Constructor.
@@ -45,16 +50,30 @@ class QualityCheckMode(BaseMode):
         self.filter_checks = []
         # a way to map menuitems to their check names, and signal ids:
         self._menuitem_checks = {}
+        self._progress_menuitem = None
         self.store_filename = None
+        self._store_handlers = []
+        self._progress_id = None
 
 
     # METHODS #
     def _prepare_stats(self):
-        self.store_controller.update_store_checks(checker=self.main_controller.checks_controller.get_checker())
+        # Only units that changed since they were last checked are checked
+        # again (all units the first time or with another checker). This
+        # happens in the background, and the menu is updated as results come
+        # in.
+        self.store_controller.update_store_checks(
+            checker=self.main_controller.checks_controller.get_checker(),
+            background=True
+        )
         self.stats = self.store_controller.get_store_checks()
-        # A currently selected check might disappear if the style changes:
-        self.filter_checks = [check for check in self.filter_checks if check in self.stats]
         self.storecursor = self.store_controller.cursor
+        self._update_checks_names()
+
+    def _update_checks_names(self):
+        if not self.store_controller.get_store().is_checking():
+            # A currently selected check might disappear if the style changes:
+            self.filter_checks = [check for check in self.filter_checks if check in self.stats]
         self.checks_names = {}
         for check, indices in self.stats.iteritems():
             if indices and check not in ('total', 'translated', 'untranslated', 'extended'):
@@ -63,8 +82,17 @@ class QualityCheckMode(BaseMode):
     def selected(self):
         self._prepare_stats()
         self._checker_set_id = self.main_controller.checks_controller.connect('checker-set', self._on_checker_set)
-        # redo stats on save to refresh navigation controls
-        self._store_saved_id = self.store_controller.connect('store-saved', self._on_checker_set)
+        # check the units that changed since they were checked when saving
+        self._store_handlers = [
+            (self.store_controller, self.store_controller.connect('store-saved', self._on_store_saved)),
+        ]
+        if self.storecursor and self.storecursor.model:
+            model = self.storecursor.model
+            self._store_handlers += [
+                (model, model.connect('unit-checks-changed', self._on_unit_checks_changed)),
+                (model, model.connect('checks-progress', self._on_checks_progress)),
+                (model, model.connect('checks-updated', self._on_checks_updated)),
+            ]
 
         self._add_widgets()
         self._update_button_label()
@@ -74,20 +102,19 @@ class QualityCheckMode(BaseMode):
         if self._checker_set_id:
             self.main_controller.checks_controller.disconnect(self._checker_set_id)
             self._checker_set_id = None
-            self.store_controller.disconnect(self._store_saved_id)
-            self.store_saved_id = None
+        for store, handler_id in self._store_handlers:
+            store.disconnect(handler_id)
+        self._store_handlers = []
+        self._cancel_progress_update()
 
     def update_indices(self):
         if not self.storecursor or not self.storecursor.model:
             return
 
-        indices = []
-        for check in self.filter_checks:
-            indices.extend(self.stats[check])
-
+        filter_index = self.storecursor.model.get_filter_index()
+        indices = filter_index.union(self.filter_checks)
         if not indices:
-            indices = range(len(self.storecursor.model))
-        indices.sort()
+            indices = filter_index.get_all()
 
         self.storecursor.indices = indices
 
@@ -113,8 +140,18 @@ class QualityCheckMode(BaseMode):
         for mi, (name, signal_id) in self._menuitem_checks.iteritems():
             mi.disconnect(signal_id)
             menu.remove(mi)
+        if self._progress_menuitem is not None:
+            menu.remove(self._progress_menuitem)
+            self._progress_menuitem = None
         assert not menu.get_children()
         self._menuitem_checks = {}
+        store = self.store_controller.get_store()
+        if store and store.is_checking():
+            #l10n: Shown in the menu of quality checks while the file is being checked
+            self._progress_menuitem = gtk.MenuItem(label=_("Checking... %d%%") % (store.get_checks_progress() * 100))
+            self._progress_menuitem.set_sensitive(False)
+            self._progress_menuitem.show()
+            menu.append(self._progress_menuitem)
         for check_name, display_name in sorted(self.checks_names.iteritems(), key=lambda x: x[1], cmp=locale.strcoll):
             #l10n: %s is the name of the check and must be first. %d is the number of failures
             menuitem = gtk.CheckMenuItem(label="%s (%d)" % (display_name, len(self.stats[check_name])))
@@ -123,8 +160,20 @@ class QualityCheckMode(BaseMode):
             self._menuitem_checks[menuitem] = (check_name, menuitem.connect('toggled', self._on_check_menuitem_toggled))
             menu.append(menuitem)
 
+    def _update_checks(self):
+        self._update_checks_names()
+        self._create_menu_entries(self.btn_popup.menu)
+        self._update_button_label()
+        if self.filter_checks:
+            self.update_indices()
+
+    def _cancel_progress_update(self):
+        if self._progress_id is not None:
+            gobject.source_remove(self._progress_id)
+            self._progress_id = None
+
     def _update_button_label(self):
-        check_labels = [mi.child.get_label() for mi in self.btn_popup.menu if mi.get_active()]
+        check_labels = [mi.child.get_label() for mi in self.btn_popup.menu if mi in self._menuitem_checks and mi.get_active()]
         btn_label = u''
         if not check_labels:
             #l10n: This is the button where the user can select units by failing quality checks
@@ -146,6 +195,41 @@ class QualityCheckMode(BaseMode):
         self._update_button_label()
         self.update_indices()
 
+    def _on_checks_progress(self, store, fraction):
+        # Results come in small chunks, so we only update the menu and the
+        # units shown every now and then
+        if self._progress_id is not None:
+            return
+        def update():
+            self._progress_id = None
+            self._update_checks()
+            return False
+        self._progress_id = gobject.timeout_add(self.PROGRESS_DELAY, update)
+
+    def _on_store_saved(self, store_controller):
+        store_controller.update_store_checks(
+            checker=self.main_controller.checks_controller.get_checker(),
+            background=True
+        )
+
+    def _on_checks_updated(self, store):
+        self._cancel_progress_update()
+        self._update_checks()
+
+    def _on_unit_checks_changed(self, store, index):
+        # Keep the counts in the menu current
+        self._update_checks_names()
+        self._create_menu_entries(self.btn_popup.menu)
+        self._update_button_label()
+        if not self.filter_checks:
+            # All units are shown
+            return
+        filter_index = store.get_filter_index()
+        if any([index in filter_index.get(check) for check in self.filter_checks]):
+            self.storecursor.add_index(index)
+        else:
+            self.storecursor.remove_index(index)
+
     def _on_check_menuitem_toggled(self, checkmenuitem):
         self.filter_checks = []
         for menuitem in self.btn_popup.menu:
@@ -18,9 +18,6 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
-from virtaal.support.set_enumerator import UnionSetEnumerator
-from virtaal.support.sorted_set import SortedSet
-
 from basemode import BaseMode
 
 
@@ -31,12 +28,15 @@ class QuickTranslateMode(BaseMode):
     display_name = _("Incomplete")
     widgets = []
 
+    FILTER_STATES = ['untranslated', 'fuzzy']
+
     # INITIALIZERS #
     def __init__(self, controller):
         """Constructor.
             @type  controller: virtaal.controllers.ModeController
             @param controller: The ModeController that managing program modes."""
         self.controller = controller
+        self._store_handler = None
 
 
     # METHODS #
@@ -45,16 +45,27 @@ class QuickTranslateMode(BaseMode):
         if not cursor or not cursor.model:
             return
 
-        indices = list(UnionSetEnumerator(
-            SortedSet(cursor.model.stats['untranslated']),
-            SortedSet(cursor.model.stats['fuzzy'])
-        ).set)
+        indices = cursor.model.get_filter_index().union(self.FILTER_STATES)
 
         if not indices:
             self.controller.select_default_mode()
             return
 
         cursor.indices = indices
+        self.storecursor = cursor
+        self._store_handler = (cursor.model, cursor.model.connect('unit-stats-changed', self._on_unit_stats_changed))
 
     def unselected(self):
-        pass
+        if self._store_handler:
+            store, handler_id = self._store_handler
+            store.disconnect(handler_id)
+            self._store_handler = None
+
+
+    # EVENT HANDLERS #
+    def _on_unit_stats_changed(self, store, index):
+        filter_index = store.get_filter_index()
+        if any([index in filter_index.get(state) for state in self.FILTER_STATES]):
+            self.storecursor.add_index(index)
+        else:
+            self.storecursor.remove_index(index)
@@ -23,8 +23,11 @@ import gobject
 import gtk
 import gtk.gdk
 import logging
+import re
 
 from virtaal.controllers.cursor import Cursor
+from virtaal.models.matchindex import MatchIndex
+from virtaal.support.bitset import Bitset
 
 from basemode import BaseMode
 from virtaal.views.theme import current_theme
@@ -39,6 +42,9 @@ class SearchMode(BaseMode):
 
     MAX_RESULTS = 200000
     SEARCH_DELAY = 500
+    SEARCH_BATCH_SIZE = 1000
+    """The number of units searched before matches are shown, when
+        searching in the background."""
 
     # INITIALIZERS #
     def __init__(self, controller):
@@ -55,9 +61,11 @@ class SearchMode(BaseMode):
         self.ent_replace.connect('style-set', self._on_style_set)
 
         self.filter = None
-        self.matches = []
+        self.matches = MatchIndex()
         self.select_first_match = True
+        self._search_indexes = []
         self._search_timeout = 0
+        self._search_job = None
         self._unit_modified_id = 0
 
     def _create_widgets(self):
@@ -65,6 +73,8 @@ class SearchMode(BaseMode):
         self.ent_search = gtk.Entry()
         self.ent_search.connect('changed', self._on_search_text_changed)
         self.ent_search.connect('activate', self._on_entry_activate)
+        #l10n: Tooltip of the search box. Don't translate the field names before the colons.
+        self.ent_search.set_tooltip_text(_('Search in specific fields with source:, target:, note:, loc:, ctx: and state:, for example: note:menu state:fuzzy'))
         self.btn_search = gtk.Button(_('Search'))
         self.btn_search.connect('clicked', self._on_search_clicked)
         self.chk_casesensitive = gtk.CheckButton(_('_Case sensitive'))
@@ -73,6 +83,7 @@ class SearchMode(BaseMode):
         # http://en.wikipedia.org/wiki/Regular_expression
         self.chk_regex = gtk.CheckButton(_("_Regular expression"))
         self.chk_regex.connect('toggled', self._refresh_proxy)
+        self.lbl_match_count = gtk.Label()
 
         # Widgets for replace (second row)
         # l10n: This text label shows in front of the text box where the replacement
@@ -88,7 +99,7 @@ class SearchMode(BaseMode):
         self.chk_replace_all = gtk.CheckButton(_('Replace _All'))
 
         self.widgets = [
-            self.ent_search, self.btn_search, self.chk_casesensitive, self.chk_regex,
+            self.ent_search, self.btn_search, self.chk_casesensitive, self.chk_regex, self.lbl_match_count,
             self.lbl_replace, self.ent_replace, self.btn_replace, self.chk_replace_all
         ]
 
@@ -192,8 +203,19 @@ class SearchMode(BaseMode):
             rstring = unit_controller.get_unit_target(match.part_n)
             unit_controller.set_unit_target(match.part_n, rstring[:match.start] + replace_str + rstring[match.end:])
 
-    def update_search(self):
+    def update_search(self, background=False):
+        """Search the store for the text in the search entry.
+
+            If C{background} is C{True}, the units are searched in a worker
+            thread and matches are shown as they are found. The search is
+            cancelled if another search starts."""
         self._search_timeout = 0
+        self._cancel_search()
+        from virtaal.models.searchquery import SearchQuery
+        if SearchQuery.is_query(unicode(self.ent_search.get_text())):
+            self._update_query_search(background)
+            return
+
         from translate.tools.pogrep import GrepFilter
         self.filter = GrepFilter(
             searchstring=unicode(self.ent_search.get_text()),
@@ -202,25 +224,178 @@ class SearchMode(BaseMode):
             useregexp=self.chk_regex.get_active(),
             max_matches=self.MAX_RESULTS
         )
-        store_units = self.storecursor.model.get_units()
-        self.matches, indexes = self.filter.getmatches(store_units)
-        self.matchcursor = Cursor(self.matches, range(len(self.matches)))
+        store = self.storecursor.model
+        search_key = (self.filter.searchstring, self.filter.ignorecase, self.filter.useregexp)
+        search_cache = store.get_search_cache()
+        cached = self.filter.searchstring and search_cache.get(*search_key)
+        if cached:
+            # Compile the filter's regular expression for highlighting
+            self.filter.getmatches([])
+            matches, indexes = cached
+            self.matches = MatchIndex(matches)
+            self.matchcursor = Cursor(self.matches, self.matches.get_positions())
+            logging.debug('Search text: %s (%d cached matches)' % (self.ent_search.get_text(), len(indexes)))
+            self._show_search_results(indexes)
+            return
+
+        store_units = store.get_units()
+        # Only the units that matched a shorter search could match this one
+        candidates = search_cache.get_refinable(*search_key)
+        search_index = store.get_search_index()
+        if candidates is None and search_index is not None:
+            candidates = search_index.get_candidates(self.filter.searchstring, self.filter.useregexp)
+        if candidates is None:
+            candidates = range(len(store_units))
+            units = store_units
+        else:
+            # Only search the units that could match
+            units = [store_units[i] for i in candidates]
+
+        if background and self.filter.searchstring:
+            from virtaal.support.thread import BackgroundJob
+            self.matches = MatchIndex()
+            self._search_indexes = []
+            self.matchcursor = Cursor(self.matches, Bitset())
+            self._search_job = BackgroundJob(
+                self._search_in_background, (self.filter, candidates, units),
+                on_done=self._on_search_done, on_error=self._on_search_error
+            )
+            self._search_job.start()
+            return
+
+        matches, indexes = self.filter.getmatches(units)
+        self.matches = MatchIndex(matches)
+        indexes = [candidates[i] for i in indexes]
+        # GrepFilter stops after MAX_RESULTS matches, and an incomplete result
+        # would make refined searches miss units
+        if self.filter.searchstring and len(matches) <= self.MAX_RESULTS:
+            search_cache.put(self.filter.searchstring, self.filter.ignorecase, self.filter.useregexp, self.matches, indexes)
+        self.matchcursor = Cursor(self.matches, self.matches.get_positions())
 
         logging.debug('Search text: %s (%d matches)' % (self.ent_search.get_text(), len(indexes)))
+        self._show_search_results(indexes)
+
+    def _update_query_search(self, background=False):
+        """Search with a query that looks at specific fields of units (see
+            L{virtaal.models.searchquery}).
+
+            If C{background} is C{True}, the units are searched in batches in
+            a worker thread, like other searches. The fields of the units are
+            read there if the store doesn't have them yet."""
+        from translate.tools.pogrep import GrepFilter
+        from virtaal.models.searchquery import SearchQuery
+        text = unicode(self.ent_search.get_text())
+        ignorecase = not self.chk_casesensitive.get_active()
+        # Only used for highlighting and replacing matches
+        self.filter = GrepFilter(text, ('source', 'target'), ignorecase=ignorecase)
+        store = self.storecursor.model
+
+        try:
+            query = SearchQuery(text, ignorecase=ignorecase, useregexp=self.chk_regex.get_active())
+        except re.error, exc:
+            logging.debug('Invalid search query "%s": %s' % (text, exc))
+            self.matches = MatchIndex()
+            self.matchcursor = Cursor(self.matches, Bitset())
+            self._show_search_results([])
+            return
+        self.filter.re_search = query.get_highlight_regexp()
+
+        filter_index = store.get_filter_index()
+        if filter_index is not None:
+            get_state_set = filter_index.get
+        else:
+            get_state_set = lambda name: Bitset()
+        store_units = store.get_units()
+
+        if background:
+            from virtaal.support.thread import BackgroundJob
+            self.matches = MatchIndex()
+            self._search_indexes = []
+            self.matchcursor = Cursor(self.matches, Bitset())
+            self._search_job = BackgroundJob(
+                self._query_in_background, (query, store.get_unit_fields(build=False), get_state_set, store_units),
+                on_done=self._on_query_done, on_error=self._on_search_error
+            )
+            self._search_job.start()
+            return
 
+        matches = []
+        indexes = query.filter(store.get_unit_fields(), get_state_set=get_state_set)
+        for index in indexes:
+            matches.extend(query.find_matches(store_units[index]))
+            if len(matches) > self.MAX_RESULTS:
+                logging.debug('Too many matches found')
+                break
+        self.matches = MatchIndex(matches)
+        self.matchcursor = Cursor(self.matches, self.matches.get_positions())
+        logging.debug('Search query: %s (%d units)' % (text, len(indexes)))
+        self._show_search_results(indexes)
+
+    def _cancel_search(self):
+        if self._search_job is not None:
+            self._search_job.cancel()
+            self._search_job = None
+
+    def _search_in_background(self, job, grepfilter, candidates, units):
+        """Runs in the worker thread: search the units in batches, and send
+            the matches of every batch to the main loop."""
+        count = 0
+        for start in xrange(0, len(units), self.SEARCH_BATCH_SIZE):
+            if job.cancelled:
+                return None
+            matches, indexes = grepfilter.getmatches(units[start:start+self.SEARCH_BATCH_SIZE])
+            if not matches:
+                continue
+            job.post(self._on_search_batch, matches, [candidates[start+i] for i in indexes])
+            count += len(matches)
+            if count > self.MAX_RESULTS:
+                logging.debug('Too many matches found')
+                break
+        return count
+
+    def _query_in_background(self, job, query, fields, get_state_set, units):
+        """Runs in the worker thread: filter the units with C{query} in
+            batches, and send the matches of every batch to the main loop."""
+        build_fields = fields is None
+        if build_fields:
+            from virtaal.models.searchquery import UnitFieldTable
+            fields = UnitFieldTable()
+        count = 0
+        for start in xrange(0, len(units), self.SEARCH_BATCH_SIZE):
+            if job.cancelled:
+                return None
+            end = min(start + self.SEARCH_BATCH_SIZE, len(units))
+            if build_fields:
+                for index in xrange(start, end):
+                    fields.append(units[index])
+            indexes = query.filter(fields, xrange(start, end), get_state_set)
+            if not indexes:
+                continue
+            matches = []
+            for index in indexes:
+                matches.extend(query.find_matches(units[index]))
+            job.post(self._on_search_batch, matches, indexes)
+            count += len(matches)
+            if count > self.MAX_RESULTS:
+                logging.debug('Too many matches found')
+                break
+        return count
+
+    def _show_search_results(self, indexes):
+        """Show the result of a new search in the GUI."""
+        self._update_match_count()
         if indexes:
             self.ent_search.modify_base(gtk.STATE_NORMAL, self.default_base)
             self.ent_search.modify_text(gtk.STATE_NORMAL, self.default_text)
 
             self.storecursor.indices = indexes
             # Select initial match for in the current unit.
-            match_index = 0
             selected_unit = self.storecursor.model[self.storecursor.index]
-            for match in self.matches:
-                if match.unit is selected_unit:
-                    break
-                match_index += 1
-            self.matchcursor.index = match_index
+            unit_matches = self.matches.get_unit_matches(selected_unit)
+            if unit_matches:
+                self.matchcursor.index = self.matches.index(unit_matches[0])
+            else:
+                self.matchcursor.pos = len(self.matches) - 1
         else:
             if self.ent_search.get_text():
                 self.ent_search.modify_base(gtk.STATE_NORMAL, gtk.gdk.color_parse(current_theme['warning_bg']))
@@ -242,6 +417,13 @@ class SearchMode(BaseMode):
             return False
         gobject.idle_add(grabfocus)
 
+    def _update_match_count(self):
+        if not self.ent_search.get_text():
+            self.lbl_match_count.set_text(u'')
+            return
+        #l10n: The number of search results found so far
+        self.lbl_match_count.set_text(_('Matches: %d') % (len(self.matches)))
+
     def unselected(self):
         # TODO: Unhightlight the previously selected unit
         if hasattr(self, '_signalid_cursor_changed'):
@@ -255,7 +437,8 @@ class SearchMode(BaseMode):
             self.controller.main_controller.unit_controller.disconnect(self._unit_modified_id)
             self._unit_modified_id = 0
 
-        self.matches = []
+        self._cancel_search()
+        self.matches = MatchIndex()
 
     def _add_widgets(self):
         table = self.controller.view.mode_box
@@ -265,6 +448,7 @@ class SearchMode(BaseMode):
         table.attach(self.btn_search, 3, 4, 0, 1, xoptions=xoptions)
         table.attach(self.chk_casesensitive, 4, 5, 0, 1, xoptions=xoptions)
         table.attach(self.chk_regex, 5, 6, 0, 1, xoptions=xoptions)
+        table.attach(self.lbl_match_count, 6, 7, 0, 1, xoptions=xoptions)
 
         table.attach(self.lbl_replace, 1, 2, 1, 2, xoptions=xoptions)
         table.attach(self.ent_replace, 2, 3, 1, 2, xoptions=xoptions)
@@ -284,15 +468,7 @@ class SearchMode(BaseMode):
             )
 
     def _get_matches_for_unit(self, unit):
-        return [match for match in self.matches if match.unit is unit]
-
-    def _get_unit_matches_dict(self):
-        d = {}
-        for match in self.matches:
-            if match.unit not in d:
-                d[match.unit] = []
-            d[match.unit].append(match)
-        return d
+        return self.matches.get_unit_matches(unit)
 
     def _highlight_matches(self):
         if getattr(self.filter, 're_search', None) is None:
@@ -311,12 +487,7 @@ class SearchMode(BaseMode):
             textbox_n = self.unitview.targets.index(textbox)
         else:
             raise ValueError('Could not find text box in sources or targets: %s' % (textbox))
-        return [
-            m for m in self.matches
-            if m.unit is unit and \
-                m.part == role and \
-                m.part_n == textbox_n
-        ]
+        return self.matches.get_part_matches(unit, role, textbox_n)
 
     def _highlight_textbox_matches(self, textbox, select_match=True):
         buff = textbox.buffer
@@ -384,16 +555,19 @@ class SearchMode(BaseMode):
         self.select_match(self.matches[self.matchcursor.index])
 
     def _replace_all(self):
-        self.controller.main_controller.undo_controller.record_start()
+        main_controller = self.controller.main_controller
+        main_controller.undo_controller.record_start()
 
         repl_str = self.ent_replace.get_text()
-        unit_matches = self._get_unit_matches_dict()
-
-        for unit, matches in unit_matches.items():
-            for match in reversed(matches):
-                self.replace_match(match, repl_str)
-
-        self.controller.main_controller.undo_controller.record_stop()
+        # Replacing in the unit view for every unit is very slow, so only the
+        # current unit is changed in the view and the others in the store.
+        current_unit = main_controller.unit_controller.current_unit
+        other_matches = [match for match in self.matches if match.unit is not current_unit]
+        main_controller.store_controller.replace_matches(other_matches, repl_str)
+        for match in reversed(self.matches.get_unit_matches(current_unit)):
+            self.replace_match(match, repl_str)
+
+        main_controller.undo_controller.record_stop()
         self.update_search()
 
 
@@ -417,18 +591,14 @@ class SearchMode(BaseMode):
         else:
             current_unit = self.storecursor.deref()
             # Find matches in the current unit.
-            unit_matches = [match for match in self.matches if match.unit is current_unit and match.part == 'target']
+            unit_matches = [match for match in self.matches.get_unit_matches(current_unit) if match.part == 'target']
             if len(unit_matches) > 0:
-                i = self.matches.index(unit_matches[0])
                 self.controller.main_controller.undo_controller.record_start()
                 self.replace_match(unit_matches[0], self.ent_replace.get_text())
                 self.controller.main_controller.undo_controller.record_stop()
-                # FIXME: The following is necessary to avoid an IndexError in
-                # del in certain circumstances. I'm not sure why it happens,
-                # but I suspect it has something to do with self.matches not
-                # being updated as expected after an undo.
-                if 0 <= i < len(self.matches):
-                    del self.matches[i]
+                # The match might already be removed by _on_unit_modified()
+                if unit_matches[0] in self.matches.get_unit_matches(current_unit):
+                    self.matches.remove(unit_matches[0])
             elif self.filter.re_search:
                 # If there is no current search, we don't want to advance and
                 # give the impression that we replaced something (bug 1636)
@@ -436,6 +606,43 @@ class SearchMode(BaseMode):
 
         self.update_search()
 
+    def _on_search_batch(self, matches, indexes):
+        # Units can match a query without any text to highlight
+        first_batch = not self._search_indexes
+        self.matches.extend(matches)
+        self._search_indexes.extend(indexes)
+        self.matchcursor.indices = self.matches.get_positions()
+        if first_batch:
+            # Show the first hit right away
+            self._show_search_results(Bitset(indexes))
+        else:
+            for index in indexes:
+                self.storecursor.add_index(index)
+            self._update_match_count()
+
+    def _on_search_done(self, count):
+        self._search_job = None
+        if count is not None and count <= self.MAX_RESULTS:
+            self.storecursor.model.get_search_cache().put(
+                self.filter.searchstring, self.filter.ignorecase, self.filter.useregexp,
+                self.matches, self._search_indexes
+            )
+        logging.debug('Search text: %s (%d matches)' % (self.ent_search.get_text(), len(self.matches)))
+        if not self.matches:
+            self._show_search_results([])
+
+    def _on_query_done(self, count):
+        self._search_job = None
+        logging.debug('Search query: %s (%d units)' % (self.ent_search.get_text(), len(self._search_indexes)))
+        if not self._search_indexes:
+            self._show_search_results([])
+
+    def _on_search_error(self, exc):
+        self._search_job = None
+        logging.debug('Search stopped: %s' % (exc))
+        if not self._search_indexes:
+            self._show_search_results([])
+
     def _on_search_clicked(self, btn):
         self._move_match(1)
 
@@ -454,8 +661,13 @@ class SearchMode(BaseMode):
     def _on_search_text_changed(self, entry):
         if self._search_timeout:
             gobject.source_remove(self._search_timeout)
+        # Results for the old text are not interesting anymore
+        self._cancel_search()
 
-        self._search_timeout = gobject.timeout_add(self.SEARCH_DELAY, self.update_search)
+        def search():
+            self.update_search(background=True)
+            return False
+        self._search_timeout = gobject.timeout_add(self.SEARCH_DELAY, search)
 
     def _on_start_search(self, _accel_group, _acceleratable, _keyval, _modifier):
         """This is called via the accelerator."""
@@ -479,6 +691,7 @@ class SearchMode(BaseMode):
 
     def _on_unit_modified(self, unit_controller, current_unit):
         unit_matches = self._get_matches_for_unit(current_unit)
+        removed = False
         for match in unit_matches:
             # Modifications can only affect the target:
             if not match.part == 'target':
@@ -486,7 +699,9 @@ class SearchMode(BaseMode):
             if not self.filter.re_search.match(match.get_getter()()[match.start:match.end]):
                 logging.debug('Match to remove: %s' % (match))
                 self.matches.remove(match)
-                self.matchcursor.indices = range(len(self.matches))
+                removed = True
+        if removed:
+            self.matchcursor.indices = self.matches.get_positions()
 
     def _refresh_proxy(self, *args):
         self.update_search()
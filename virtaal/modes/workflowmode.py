@@ -42,6 +42,7 @@ class WorkflowMode(BaseMode):
         self.controller = controller
         self.filter_states = []
         self._menuitem_states = {}
+        self._store_handler = None
 
 
     # METHODS #
@@ -61,22 +62,24 @@ class WorkflowMode(BaseMode):
         if not self.state_names:
             self._disable()
         self.update_indices()
+        if self.storecursor and self.storecursor.model:
+            model = self.storecursor.model
+            self._store_handler = (model, model.connect('unit-stats-changed', self._on_unit_stats_changed))
 
     def unselected(self):
-        pass
+        if self._store_handler:
+            store, handler_id = self._store_handler
+            store.disconnect(handler_id)
+            self._store_handler = None
 
     def update_indices(self):
         if not self.storecursor or not self.storecursor.model:
             return
 
-        indices = []
-        for state in self.filter_states:
-            indices.extend(self.storecursor.model.stats['extended'][state])
-
+        filter_index = self.storecursor.model.get_filter_index()
+        indices = filter_index.union(self.filter_states)
         if not indices:
-            indices.extend(self.storecursor.model.stats['total'])
-        else:
-            indices.sort()
+            indices = filter_index.get_all()
 
         self.storecursor.indices = indices
 
@@ -124,6 +127,16 @@ class WorkflowMode(BaseMode):
         self.btn_popup.set_sensitive(False)
 
     # EVENT HANDLERS #
+    def _on_unit_stats_changed(self, store, index):
+        if not self.filter_states:
+            # All units are shown
+            return
+        filter_index = store.get_filter_index()
+        if any([index in filter_index.get(state) for state in self.filter_states]):
+            self.storecursor.add_index(index)
+        else:
+            self.storecursor.remove_index(index)
+
     def _on_state_menuitem_toggled(self, checkmenuitem):
         self.filter_states = []
         for menuitem in self.btn_popup.menu:
@@ -249,14 +249,14 @@ class Plugin(BasePlugin):
         self.autocomp.clear_words()
         self.autocomp.clear_widgets()
         self.main_controller.store_controller.disconnect(self._store_loaded_id)
-        if getattr(self, '_cursor_changed_id', None):
-            self.store_cursor.disconnect(self._cursor_changed_id)
+        if getattr(self, '_cursor_settled_id', None):
+            self.store_cursor.disconnect(self._cursor_settled_id)
         if self._unitview_id:
             self.main_controller.unit_controller.view.disconnect(self._unitview_id)
 
 
     # EVENT HANDLERS #
-    def _on_cursor_change(self, cursor):
+    def _on_cursor_settled(self, cursor):
         def add_widgets():
             if hasattr(self, 'lastunit'):
                 if self.lastunit.hasplural():
@@ -274,8 +274,8 @@ class Plugin(BasePlugin):
     def _on_store_loaded(self, storecontroller):
         self.autocomp.add_words_from_units(storecontroller.get_store().get_units())
 
-        if hasattr(self, '_cursor_changed_id'):
-            self.store_cursor.disconnect(self._cursor_changed_id)
+        if hasattr(self, '_cursor_settled_id'):
+            self.store_cursor.disconnect(self._cursor_settled_id)
         self.store_cursor = storecontroller.cursor
-        self._cursor_changed_id = self.store_cursor.connect('cursor-changed', self._on_cursor_change)
-        self._on_cursor_change(self.store_cursor)
+        self._cursor_settled_id = self.store_cursor.connect('cursor-settled', self._on_cursor_settled)
+        self._on_cursor_settled(self.store_cursor)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Search in all the files of a project."""
+
+from virtaal.controllers.baseplugin import BasePlugin
+
+
+class Plugin(BasePlugin):
+    description = _('Search in all translation files of a folder or project bundle')
+    display_name = _('Project Search')
+    version = '0.1'
+    default_config = {
+        'last_path': '',
+        'processes': '0',
+    }
+
+    # INITIALIZERS #
+    def __init__(self, internal_name, main_controller):
+        self.internal_name = internal_name
+        self.main_controller = main_controller
+
+        self.load_config()
+        self.config['processes'] = int(self.config['processes'])
+        self._init_plugin()
+
+    def _init_plugin(self):
+        from searchcontroller import ProjectSearchController
+        self.controller = ProjectSearchController(self.main_controller, self.config)
+
+
+    # METHODS #
+    def destroy(self):
+        self.config = self.controller.config
+        self.save_config()
+        self.controller.destroy()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import os
+from gobject import SIGNAL_RUN_FIRST, TYPE_PYOBJECT
+
+from virtaal.common import GObjectWrapper
+from virtaal.controllers.basecontroller import BaseController
+
+
+class ProjectSearchController(BaseController):
+    """Searches all the translation files of a directory or project bundle,
+        and opens the files of the hits."""
+
+    __gtype_name__ = 'ProjectSearchController'
+    __gsignals__ = {
+        'file-hits':     (SIGNAL_RUN_FIRST, None, (TYPE_PYOBJECT,)),
+        'search-done':   (SIGNAL_RUN_FIRST, None, (int,)),
+    }
+
+    # INITIALIZERS #
+    def __init__(self, main_controller, config):
+        GObjectWrapper.__init__(self)
+
+        self.main_controller = main_controller
+        self.config = config
+        self.search = None
+        self._pending_index = None
+        self._store_loaded_id = main_controller.store_controller.connect('store-loaded', self._on_store_loaded)
+
+        from searchview import ProjectSearchView
+        self.view = ProjectSearchView(self)
+
+
+    # ACCESSORS #
+    def get_default_path(self):
+        """Return the bundle or the directory of the file that is open."""
+        store_controller = self.main_controller.store_controller
+        bundle = store_controller.get_bundle_filename()
+        if bundle:
+            return bundle
+        store = store_controller.get_store()
+        if store:
+            return os.path.dirname(os.path.abspath(store.get_filename()))
+        return self.config['last_path']
+
+    def is_searching(self):
+        return self.search is not None and self.search.is_running()
+
+
+    # METHODS #
+    def destroy(self):
+        self.stop_search()
+        self.main_controller.store_controller.disconnect(self._store_loaded_id)
+        self.view.destroy()
+
+    def start_search(self, path, searchstring, ignorecase, useregexp):
+        """Search all translation files in C{path} (a directory or project
+            bundle). The "file-hits" signal is emitted for every file with hits
+            as it is searched."""
+        self.stop_search()
+        if not searchstring or not os.path.exists(path):
+            return
+        self.config['last_path'] = path
+
+        from searcher import ProjectSearch
+        self.search = ProjectSearch(
+            path, searchstring, ignorecase=ignorecase, useregexp=useregexp,
+            processes=self.config['processes'] or None
+        )
+        self.search.start(self._on_file_hits, on_done=self._on_search_done, on_error=self._on_search_error)
+
+    def stop_search(self):
+        if self.search is not None:
+            self.search.cancel()
+            self.search = None
+
+    def open_hit(self, path, project_file, index):
+        """Open the file with the hit (if it is not open yet) and select the
+            unit at model index C{index}."""
+        if not self._is_open(path, project_file):
+            if not self.main_controller.open_file(path, project_file=project_file):
+                return
+        store = self.main_controller.store_controller.get_store()
+        if store is None:
+            return
+        if store.is_loading():
+            # Select the unit once the file is loaded
+            self._pending_index = index
+            return
+        self._select_index(index)
+
+    def _is_open(self, path, project_file):
+        store_controller = self.main_controller.store_controller
+        store = store_controller.get_store()
+        if store is None:
+            return False
+        if project_file is None:
+            return os.path.abspath(store.get_filename()) == os.path.abspath(path)
+        if store_controller.get_bundle_filename() != path:
+            return False
+        try:
+            return store_controller.project.get_proj_filename(store.get_filename()) == project_file
+        except ValueError:
+            return False
+
+    def _select_index(self, index):
+        store = self.main_controller.store_controller.get_store()
+        if not 0 <= index < len(store.get_units()):
+            logging.debug('Project search hit out of range: %d' % (index))
+            return
+        # The unit might not be visible in the current mode
+        self.main_controller.select_index(index, force=True)
+
+
+    # EVENT HANDLERS #
+    def _on_file_hits(self, result):
+        self.emit('file-hits', result)
+
+    def _on_search_done(self, files_searched):
+        self.search = None
+        self.emit('search-done', files_searched or 0)
+
+    def _on_search_error(self, exc):
+        self.search = None
+        self.main_controller.show_error(_('Unable to search the project:\n%s') % (exc))
+        self.emit('search-done', 0)
+
+    def _on_store_loaded(self, store_controller):
+        if self._pending_index is not None:
+            index = self._pending_index
+            self._pending_index = None
+            self._select_index(index)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Search all the translation files of a directory or project bundle.
+
+Every file is parsed and searched in a worker process, so only the files that
+are being searched at the moment are in memory, and only the hits are sent
+back. A hit refers to its unit by model index (the index among the
+translatable units of the file), the way L{virtaal.models.storemodel} counts
+units, so that the file can be opened at the unit."""
+
+import logging
+import os
+
+
+MAX_HITS_PER_FILE = 1000
+"""Only this many hits are returned for a file (with the total number of
+    hits)."""
+SNIPPET_CONTEXT = 30
+"""The number of characters shown around a match."""
+
+
+def get_file_extensions():
+    """Return the extensions of the file types that can be searched."""
+    from translate.storage import factory
+    extensions = set()
+    for name, exts, mimetypes in factory.supported_files():
+        extensions.update(exts)
+    return extensions
+
+def is_translation_file(filename, extensions=None):
+    if extensions is None:
+        extensions = get_file_extensions()
+    name, ext = os.path.splitext(filename.lower())
+    if ext in ('.gz', '.bz2'):
+        name, ext = os.path.splitext(name)
+    return ext[1:] in extensions
+
+def is_bundle(path):
+    return os.path.isfile(path) and path.lower().endswith('.zip')
+
+def get_project_files(path):
+    """Yield a C{(path, project_file)} tuple for every translation file in the
+        directory or project bundle C{path}.
+
+        The C{project_file} is the name of the file in the bundle, or C{None}
+        for files in a directory. Directories are walked lazily, so that the
+        first files can be searched before all files are found."""
+    if is_bundle(path):
+        from translate.storage.bundleprojstore import BundleProjectStore
+        bundle = BundleProjectStore(path)
+        transfiles = list(bundle.transfiles)
+        # Don't close() the bundle: that would write it
+        bundle.zip.close()
+        for transfile in transfiles:
+            yield path, transfile
+        return
+
+    extensions = get_file_extensions()
+    for dirpath, dirnames, filenames in os.walk(path):
+        # Skip hidden directories (like .svn and .git)
+        dirnames[:] = sorted([name for name in dirnames if not name.startswith('.')])
+        for filename in sorted(filenames):
+            if is_translation_file(filename, extensions):
+                yield os.path.join(dirpath, filename), None
+
+def load_store(path, project_file=None):
+    """Parse the file at C{path}, or the file C{project_file} in the bundle at
+        C{path}."""
+    from translate.storage import factory
+    if project_file is None:
+        return factory.getobject(path)
+    from zipfile import ZipFile
+    from cStringIO import StringIO
+    bundle = ZipFile(path, 'r')
+    try:
+        fileobj = StringIO(bundle.read(project_file))
+    finally:
+        bundle.close()
+    # The factory looks at the name to determine the file type
+    fileobj.name = project_file
+    return factory.getobject(fileobj)
+
+def _snippet(text, start, end):
+    prefix = text[max(start - SNIPPET_CONTEXT, 0):start]
+    suffix = text[end:end + SNIPPET_CONTEXT]
+    return prefix, text[start:end], suffix
+
+def search_file(task):
+    """Search a single file. This runs in a worker process, so the argument
+        and result are plain (picklable) data.
+
+        @param task: C{(path, project_file, searchstring, ignorecase, useregexp)}
+        @returns: C{(path, project_file, hits, hit_count, error)}, where every
+            hit is a C{(index, part, part_n, start, end, snippet)} tuple and
+            C{snippet} is a C{(before, match, after)} tuple of strings."""
+    path, project_file, searchstring, ignorecase, useregexp = task
+    try:
+        store = load_store(path, project_file)
+        units = [unit for unit in store.units if unit.istranslatable()]
+
+        from translate.tools.pogrep import GrepFilter
+        grepfilter = GrepFilter(
+            searchstring, ('source', 'target'),
+            ignorecase=ignorecase, useregexp=useregexp, max_matches=0
+        )
+        matches, indexes = grepfilter.getmatches(units)
+    except Exception, exc:
+        logging.debug('Unable to search %s: %s' % (project_file or path, exc))
+        return path, project_file, [], 0, str(exc)
+
+    index_of = dict([(id(units[index]), index) for index in indexes])
+    hits = []
+    for match in matches[:MAX_HITS_PER_FILE]:
+        text = match.get_getter()()
+        hits.append((
+            index_of[id(match.unit)], match.part, match.part_n, match.start,
+            match.end, _snippet(unicode(text), match.start, match.end)
+        ))
+    return path, project_file, hits, len(matches), None
+
+
+class ProjectSearch(object):
+    """Searches all translation files of a directory or project bundle in a
+        pool of worker processes.
+
+        The results of every file with hits are handed to C{on_file_hits}
+        on the main loop as they come in, in the order that the files are
+        finished."""
+
+    # INITIALIZERS #
+    def __init__(self, path, searchstring, ignorecase=False, useregexp=False, processes=None):
+        """Constructor.
+            @param processes: The number of worker processes (by default the
+                number of CPUs)."""
+        self.path = path
+        self.searchstring = searchstring
+        self.ignorecase = ignorecase
+        self.useregexp = useregexp
+        self.processes = processes
+        self.files_searched = 0
+        self._job = None
+
+
+    # METHODS #
+    def start(self, on_file_hits, on_done=None, on_error=None):
+        """Start searching in the background.
+
+            @param on_file_hits: Called with the result of L{search_file()}
+                for every file with hits or errors.
+            @param on_done: Called with the number of files searched."""
+        from virtaal.support.thread import BackgroundJob
+        self._job = BackgroundJob(self._search, (on_file_hits,), on_done=on_done, on_error=on_error)
+        self._job.start()
+
+    def cancel(self):
+        """Stop searching. No more results are handed to the main loop."""
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+
+    def is_running(self):
+        return self._job is not None and self._job.is_running()
+
+    def _search(self, job, on_file_hits):
+        from multiprocessing import Pool
+        tasks = (
+            (path, project_file, self.searchstring, self.ignorecase, self.useregexp)
+            for path, project_file in get_project_files(self.path)
+        )
+        # Workers are replaced now and then, so that memory fragmented by
+        # parsing many files is given back
+        pool = Pool(self.processes, maxtasksperchild=50)
+        try:
+            for result in pool.imap_unordered(search_file, tasks):
+                if job.cancelled:
+                    return None
+                self.files_searched += 1
+                path, project_file, hits, hit_count, error = result
+                if hits or error:
+                    job.post(on_file_hits, result)
+        finally:
+            pool.terminate()
+            pool.join()
+        return self.files_searched
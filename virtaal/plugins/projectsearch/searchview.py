@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import gobject
+import gtk
+from gtk import gdk
+from xml.sax.saxutils import escape
+
+from virtaal.views.baseview import BaseView
+
+
+class ProjectSearchView(BaseView):
+    """A window to search all files of a project, with the hits grouped by
+        file."""
+
+    COL_TEXT, COL_HIT = range(2)
+    PROGRESS_INTERVAL = 250
+
+    # INITIALIZERS #
+    def __init__(self, controller):
+        self.controller = controller
+        self.window = None
+        self._progress_timeout = 0
+
+        self.controller.connect('file-hits', self._on_file_hits)
+        self.controller.connect('search-done', self._on_search_done)
+        self._setup_key_bindings()
+        self._setup_menu_item()
+
+    def _setup_key_bindings(self):
+        gtk.accel_map_add_entry("<Virtaal>/Edit/Search in Project", gtk.keysyms.F, gdk.CONTROL_MASK | gdk.SHIFT_MASK)
+
+        self.accel_group = gtk.AccelGroup()
+        self.accel_group.connect_by_path("<Virtaal>/Edit/Search in Project", self._on_menuitem_activated)
+
+        self.controller.main_controller.view.add_accel_group(self.accel_group)
+
+    def _setup_menu_item(self):
+        self.menu = self.controller.main_controller.view.gui.get_object('menu_edit')
+        self.menuitem = gtk.MenuItem(label=_('Search in _Project...'))
+        self.menuitem.show()
+        self.menu.append(self.menuitem)
+        self.menuitem.set_accel_path("<Virtaal>/Edit/Search in Project")
+        self.menuitem.connect('activate', self._on_menuitem_activated)
+
+    def _create_window(self):
+        self.window = gtk.Window()
+        #l10n: Title of the window to search in all files of a project
+        self.window.set_title(_('Search in Project'))
+        self.window.set_transient_for(self.controller.main_controller.view.main_window)
+        self.window.set_default_size(600, 400)
+        self.window.connect('delete-event', self._on_window_delete)
+
+        vbox = gtk.VBox(spacing=6)
+        vbox.set_border_width(6)
+
+        hbox = gtk.HBox(spacing=6)
+        hbox.pack_start(gtk.Label(_('Folder or bundle:')), expand=False)
+        self.ent_path = gtk.Entry()
+        hbox.pack_start(self.ent_path)
+        btn_browse = gtk.Button(_('_Browse...'))
+        btn_browse.connect('clicked', self._on_browse_clicked)
+        hbox.pack_start(btn_browse, expand=False)
+        vbox.pack_start(hbox, expand=False)
+
+        hbox = gtk.HBox(spacing=6)
+        self.ent_search = gtk.Entry()
+        self.ent_search.connect('activate', self._on_search_clicked)
+        hbox.pack_start(self.ent_search)
+        self.chk_casesensitive = gtk.CheckButton(_('_Case sensitive'))
+        hbox.pack_start(self.chk_casesensitive, expand=False)
+        self.chk_regex = gtk.CheckButton(_("_Regular expression"))
+        hbox.pack_start(self.chk_regex, expand=False)
+        self.btn_search = gtk.Button(_('Search'))
+        self.btn_search.connect('clicked', self._on_search_clicked)
+        hbox.pack_start(self.btn_search, expand=False)
+        vbox.pack_start(hbox, expand=False)
+
+        self.treestore = gtk.TreeStore(str, gobject.TYPE_PYOBJECT)
+        self.treeview = gtk.TreeView(self.treestore)
+        self.treeview.set_headers_visible(False)
+        self.treeview.append_column(gtk.TreeViewColumn('', gtk.CellRendererText(), markup=self.COL_TEXT))
+        self.treeview.connect('row-activated', self._on_row_activated)
+        scrolledwindow = gtk.ScrolledWindow()
+        scrolledwindow.set_policy(gtk.POLICY_AUTOMATIC, gtk.POLICY_AUTOMATIC)
+        scrolledwindow.add(self.treeview)
+        vbox.pack_start(scrolledwindow)
+
+        self.lbl_status = gtk.Label()
+        self.lbl_status.set_alignment(0, 0.5)
+        vbox.pack_start(self.lbl_status, expand=False)
+
+        self.window.add(vbox)
+
+
+    # METHODS #
+    def destroy(self):
+        self.menu.remove(self.menuitem)
+        self.controller.main_controller.view.main_window.remove_accel_group(self.accel_group)
+        if self.window:
+            self.window.destroy()
+
+    def show(self):
+        if not self.window:
+            self._create_window()
+        if not self.ent_path.get_text() or not self.controller.is_searching():
+            self.ent_path.set_text(self.controller.get_default_path())
+        self.window.show_all()
+        self.window.present()
+        self.ent_search.grab_focus()
+
+    def _add_file_hits(self, result):
+        path, project_file, hits, hit_count, error = result
+        filename = project_file and '%s:%s' % (path, project_file) or path
+        if error:
+            self.treestore.append(None, [
+                '<i>%s</i>' % (escape(_('%(file)s: %(error)s') % {'file': filename, 'error': error})),
+                None
+            ])
+            return
+        #l10n: A file name with the number of search hits in it
+        text = _('%(file)s (%(count)d hits)') % {'file': filename, 'count': hit_count}
+        parent = self.treestore.append(None, ['<b>%s</b>' % (escape(text)), None])
+        for hit in hits:
+            index, part, part_n, start, end, (before, match, after) = hit
+            text = u'%d: %s<span background="yellow" foreground="black">%s</span>%s' % (
+                index + 1, escape(before), escape(match), escape(after)
+            )
+            # Newlines would make the rows very high
+            text = text.replace(u'\n', u' ')
+            self.treestore.append(parent, [text.encode('utf-8'), (path, project_file, index)])
+
+    def _set_searching(self, searching):
+        if searching:
+            self.btn_search.set_label(_('Stop'))
+            if not self._progress_timeout:
+                self._progress_timeout = gobject.timeout_add(self.PROGRESS_INTERVAL, self._update_progress)
+        else:
+            self.btn_search.set_label(_('Search'))
+            if self._progress_timeout:
+                gobject.source_remove(self._progress_timeout)
+                self._progress_timeout = 0
+
+    def _update_progress(self):
+        search = self.controller.search
+        if search is None:
+            self._progress_timeout = 0
+            return False
+        #l10n: Shown while searching in all files of a project
+        self.lbl_status.set_text(_('Searching... %d files searched') % (search.files_searched))
+        return True
+
+
+    # EVENT HANDLERS #
+    def _on_browse_clicked(self, button):
+        dialog = gtk.FileChooserDialog(
+            _('Choose a Folder'), self.window, gtk.FILE_CHOOSER_ACTION_SELECT_FOLDER,
+            (gtk.STOCK_CANCEL, gtk.RESPONSE_CANCEL, gtk.STOCK_OPEN, gtk.RESPONSE_OK)
+        )
+        dialog.set_filename(self.ent_path.get_text())
+        if dialog.run() == gtk.RESPONSE_OK:
+            self.ent_path.set_text(dialog.get_filename())
+        dialog.destroy()
+
+    def _on_file_hits(self, controller, result):
+        if self.window:
+            self._add_file_hits(result)
+
+    def _on_menuitem_activated(self, *args):
+        self.show()
+
+    def _on_row_activated(self, treeview, path, column):
+        hit = self.treestore[path][self.COL_HIT]
+        if hit is None:
+            if treeview.row_expanded(path):
+                treeview.collapse_row(path)
+            else:
+                treeview.expand_row(path, False)
+            return
+        self.controller.open_hit(*hit)
+
+    def _on_search_clicked(self, widget):
+        if self.controller.is_searching():
+            self.controller.stop_search()
+            self._set_searching(False)
+            self.lbl_status.set_text(_('Search stopped'))
+            return
+        self.treestore.clear()
+        self.lbl_status.set_text(u'')
+        self.controller.start_search(
+            self.ent_path.get_text(),
+            unicode(self.ent_search.get_text(), 'utf-8'),
+            ignorecase=not self.chk_casesensitive.get_active(),
+            useregexp=self.chk_regex.get_active()
+        )
+        self._set_searching(self.controller.search is not None)
+
+    def _on_search_done(self, controller, files_searched):
+        self._set_searching(False)
+        if self.window:
+            #l10n: Shown after searching in all files of a project
+            self.lbl_status.set_text(_('%d files searched') % (files_searched))
+
+    def _on_window_delete(self, window, event):
+        self.controller.stop_search()
+        self._set_searching(False)
+        window.hide()
+        return True
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+
+from searcher import get_project_files, search_file
+
+
+po_contents = """msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+msgid "Open the file"
+msgstr "Maak die lêer oop"
+
+msgid "Close"
+msgstr "Maak toe"
+"""
+
+class TestSearcher(object):
+    def setup_method(self, method):
+        self.tempdir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tempdir, 'af'))
+        os.mkdir(os.path.join(self.tempdir, '.svn'))
+        for name in ('af/one.po', 'two.po', '.svn/three.po', 'readme.txt'):
+            open(os.path.join(self.tempdir, name), 'w').write(po_contents)
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.tempdir)
+
+    def test_get_project_files(self):
+        files = list(get_project_files(self.tempdir))
+        assert files == [
+            (os.path.join(self.tempdir, 'two.po'), None),
+            (os.path.join(self.tempdir, 'af', 'one.po'), None),
+        ]
+
+    def test_search_file(self):
+        path = os.path.join(self.tempdir, 'two.po')
+        result = search_file((path, None, u'maak', True, False))
+        path, project_file, hits, hit_count, error = result
+        assert error is None
+        assert hit_count == 2
+        # The header is not a translatable unit
+        assert [hit[:5] for hit in hits] == [(0, 'target', 0, 0, 4), (1, 'target', 0, 0, 4)]
+        assert hits[0][5] == (u'', u'Maak', u' die lêer oop')
+
+        path, project_file, hits, hit_count, error = search_file((path, None, u'maak', False, False))
+        assert hit_count == 0
@@ -119,7 +119,7 @@ class TerminologyModel(BaseTerminologyModel):
 
     def __setup_cursor_watcher(self):
         unitview = self.main_controller.unit_controller.view
-        def cursor_changed(cursor):
+        def cursor_settled(cursor):
             self.__start_query()
 
         store_ctrlr = self.main_controller.store_controller
@@ -127,8 +127,8 @@ class TerminologyModel(BaseTerminologyModel):
             if hasattr(self, '_cursor_connect_id'):
                 self.cursor.disconnect(self._cursor_connect_id)
             self.cursor = store_ctrlr.cursor
-            self._cursor_connect_id = self.cursor.connect('cursor-changed', cursor_changed)
-            cursor_changed(self.cursor)
+            self._cursor_connect_id = self.cursor.connect('cursor-settled', cursor_settled)
+            cursor_settled(self.cursor)
 
         store_ctrlr.connect('store-loaded', store_loaded)
         if store_ctrlr.store:
@@ -83,6 +83,7 @@ class TMModel(remotetm.TMModel):
             message = "Failed to start TM server: %s" % str(e)
             logging.exception('Failed to start TM server')
             raise
+        self._pushed_files = set()
 
         # Do not use super() here, as remotetm.TMModel does a bit more than we
         # want in this case.
@@ -45,6 +45,7 @@ class TMModel(BaseTMModel):
         from virtaal.support import tmclient
         self.tmclient = tmclient.TMClient(url)
         self.tmclient.set_virtaal_useragent()
+        self._pushed_files = set()
 
 
     # METHODS #
@@ -77,11 +78,24 @@ class TMModel(BaseTMModel):
             self.emit('match-found', query_str, matches)
 
     def push_store(self, store_controller):
-        """Add units in store to TM database on save."""
+        """Add units in store to TM database on save.
+
+            All translated units are sent the first time that a file is saved,
+            and after that only the units that were changed since the previous
+            save."""
+        store = store_controller.store
+        filename = store.get_filename()
+        if filename in self._pushed_files:
+            store_units = store.get_saved_units()
+        else:
+            store_units = store.get_units()
+            self._pushed_files.add(filename)
         units = []
-        for unit in store_controller.store.get_units():
+        for unit in store_units:
             if  unit.istranslated():
                 units.append(unit2dict(unit))
+        if not units:
+            return
         #FIXME: do we get source and target langs from
         #store_controller or from tm state?
         self.tmclient.add_store(store_controller.store.get_filename(), units, self.source_lang, self.target_lang)
@@ -0,0 +1,570 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Pre-translate files from the TM back-ends, without a GUI.
+
+The TM model plug-ins expect to be driven by a L{TMController} inside a
+running Virtaal. The classes here provide just enough of that environment
+(languages, checker, current store and the "start-query" signal) so that
+the same models can be loaded and queried from the command line. Queries
+for the units of all files are kept in flight at the same time, and the
+best match of sufficient quality is stored as a fuzzy translation."""
+
+import logging
+import os
+import sys
+import time
+
+import gobject
+from translate.lang.data import forceunicode
+
+from virtaal.common import pan_app, GObjectWrapper
+
+
+class HeadlessLangController(GObjectWrapper):
+    """Provides the languages that TM models ask the L{LangController} for."""
+
+    __gtype_name__ = 'HeadlessLangController'
+    __gsignals__ = {
+        'source-lang-changed': (gobject.SIGNAL_RUN_FIRST, None, (str,)),
+        'target-lang-changed': (gobject.SIGNAL_RUN_FIRST, None, (str,)),
+    }
+
+    def __init__(self, source_lang, target_lang):
+        GObjectWrapper.__init__(self)
+        from virtaal.models.langmodel import LanguageModel
+        self.source_lang = LanguageModel(source_lang)
+        self.target_lang = LanguageModel(target_lang)
+
+    def set_languages(self, source_lang, target_lang):
+        if source_lang != self.source_lang.code:
+            from virtaal.models.langmodel import LanguageModel
+            self.source_lang = LanguageModel(source_lang)
+            self.emit('source-lang-changed', source_lang)
+        if target_lang != self.target_lang.code:
+            from virtaal.models.langmodel import LanguageModel
+            self.target_lang = LanguageModel(target_lang)
+            self.emit('target-lang-changed', target_lang)
+
+
+class HeadlessChecksController(GObjectWrapper):
+    """Provides the project style that TM models ask the
+        L{ChecksController} for."""
+
+    __gtype_name__ = 'HeadlessChecksController'
+    __gsignals__ = {
+        'checker-set': (gobject.SIGNAL_RUN_FIRST, None, (object,)),
+    }
+
+    def __init__(self, code=None):
+        GObjectWrapper.__init__(self)
+        self.code = code
+
+
+class HeadlessUnitController(GObjectWrapper):
+    __gtype_name__ = 'HeadlessUnitController'
+    __gsignals__ = {
+        'unit-done': (gobject.SIGNAL_RUN_FIRST, None, (object, bool)),
+    }
+
+
+class HeadlessStore(object):
+    """The parts of L{StoreModel} that TM models use, for a toolkit store."""
+
+    def __init__(self, trans_store):
+        self._trans_store = trans_store
+
+    def get_filename(self):
+        return getattr(self._trans_store, 'filename', None)
+
+    def get_units(self):
+        return [unit for unit in self._trans_store.units if unit.istranslatable()]
+
+    def get_saved_units(self):
+        return []
+
+
+class HeadlessStoreController(GObjectWrapper):
+    """Tells TM models about the file being pre-translated."""
+
+    __gtype_name__ = 'HeadlessStoreController'
+    __gsignals__ = {
+        'store-loaded': (gobject.SIGNAL_RUN_FIRST, None, ()),
+        'store-saved':  (gobject.SIGNAL_RUN_FIRST, None, ()),
+        'store-closed': (gobject.SIGNAL_RUN_FIRST, None, ()),
+    }
+
+    def __init__(self):
+        GObjectWrapper.__init__(self)
+        self.store = None
+        self.unit_controller = HeadlessUnitController()
+
+    def get_store(self):
+        return self.store
+
+    def set_store(self, trans_store):
+        if self.store is not None:
+            self.emit('store-closed')
+        self.store = HeadlessStore(trans_store)
+        self.emit('store-loaded')
+
+
+class HeadlessMainController(GObjectWrapper):
+    __gtype_name__ = 'HeadlessMainController'
+    __gsignals__ = {
+        'controller-registered': (gobject.SIGNAL_RUN_FIRST, None, (object,)),
+    }
+
+    def __init__(self, source_lang, target_lang, checker_code=None):
+        GObjectWrapper.__init__(self)
+        self.lang_controller = HeadlessLangController(source_lang, target_lang)
+        self.checks_controller = HeadlessChecksController(checker_code)
+        self.store_controller = HeadlessStoreController()
+        self.mode_controller = None
+        self.plugin_controller = None
+        self.unit_controller = self.store_controller.unit_controller
+
+
+class PretranslateJob(object):
+    """A store that is queued for pre-translation."""
+
+    def __init__(self, trans_store, source_lang, target_lang, on_done=None):
+        self.trans_store = trans_store
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.on_done = on_done
+        self.started = False
+        self.pending = 0
+        """The number of queries for this store that are still outstanding."""
+        self.best_matches = {}
+
+        self.units_by_source = {}
+        self.sources = []
+        for unit in trans_store.units:
+            if not unit.istranslatable() or unit.hasplural() or unit.target or not unit.source:
+                continue
+            source = forceunicode(unit.source)
+            if source not in self.units_by_source:
+                self.units_by_source[source] = []
+                self.sources.append(source)
+            self.units_by_source[source].append(unit)
+        self._next = 0
+
+    def next_source(self):
+        """Return the next source text to query, or C{None} if all were."""
+        if self._next >= len(self.sources):
+            return None
+        self._next += 1
+        return self.sources[self._next - 1]
+
+    def is_done(self):
+        return self._next >= len(self.sources) and self.pending == 0
+
+    def apply_matches(self):
+        """Store the best matches as fuzzy translations.
+
+            @returns: The number of units that received a translation."""
+        count = 0
+        for source, match in self.best_matches.iteritems():
+            for unit in self.units_by_source.get(source, []):
+                unit.target = forceunicode(match['target'])
+                unit.markfuzzy(True)
+                count += 1
+        return count
+
+
+class Query(object):
+    """A source text that the models were asked about."""
+
+    def __init__(self, models, deadline):
+        self.models = set(models)
+        """The models that might still answer."""
+        self.deadline = deadline
+        self.jobs = []
+        """The jobs waiting for the answer (one entry per store)."""
+        self.best = None
+
+
+class Pretranslator(GObjectWrapper):
+    """Queries the TM models for whole stores and fills in the best matches.
+
+        This takes the place of L{TMController} for the models. Up to
+        C{concurrency} queries are kept in flight at the same time, across
+        the units of all the stores that were added."""
+
+    __gtype_name__ = 'Pretranslator'
+    __gsignals__ = {
+        'start-query': (gobject.SIGNAL_RUN_FIRST, None, (object,))
+    }
+
+    POLL_INTERVAL = 20
+    """How often (in milliseconds) we check whether queries are answered."""
+
+    # INITIALIZERS #
+    def __init__(self, main_controller, model_names=None, disabled_models=(),
+            min_quality=75, max_matches=5, concurrency=15, timeout=10):
+        GObjectWrapper.__init__(self)
+        self.main_controller = main_controller
+        self.min_quality = min_quality
+        self.max_matches = max_matches
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.disabled_model_names = ['basetmmodel'] + list(disabled_models)
+        self._jobs = []
+        """Jobs with sources that were not queried yet, in order."""
+        self._running_jobs = []
+        self._queries = {}
+        """Outstanding queries by source text."""
+        self._answers = {}
+        """The best matches (or C{None}) of finished queries by source text,
+            for the current languages."""
+        self._async_models = set()
+        """Models that answered outside of the "start-query" emission."""
+        self._emitting = False
+        self._load_models(model_names)
+
+    def _load_models(self, model_names):
+        from virtaal.controllers.plugincontroller import PluginController
+        self.plugin_controller = PluginController(self, 'TMModel')
+        self.plugin_controller.PLUGIN_CLASS_INFO_ATTRIBS = ['display_name', 'description']
+        self.plugin_controller.PLUGIN_DIRS = [os.path.join(dir, 'tm', 'models') for dir in self.plugin_controller.PLUGIN_DIRS]
+
+        from models.basetmmodel import BaseTMModel
+        self.plugin_controller.PLUGIN_INTERFACE = BaseTMModel
+        self.plugin_controller.PLUGIN_MODULES = ['virtaal_plugins.tm.models', 'virtaal.plugins.tm.models']
+
+        self.plugin_controller.connect('plugin-enabled', self._on_model_enabled)
+        if model_names:
+            for name in model_names:
+                self.plugin_controller.enable_plugin(name)
+        else:
+            self.plugin_controller.get_disabled_plugins = lambda *args: self.disabled_model_names
+            self.plugin_controller.load_plugins()
+            # Models are enabled from idle callbacks
+            context = gobject.main_context_default()
+            while context.pending():
+                context.iteration(False)
+
+    def get_models(self):
+        return self.plugin_controller.plugins.values()
+
+
+    # METHODS #
+    def destroy(self):
+        self.plugin_controller.shutdown()
+
+    def add_store(self, trans_store, source_lang=None, target_lang=None, on_done=None):
+        """Queue C{trans_store} to be pre-translated by L{run()}.
+
+            @param on_done: Called as C{on_done(trans_store, count)} when all
+                the queries for the store were answered and the best matches
+                were filled in."""
+        lang_controller = self.main_controller.lang_controller
+        job = PretranslateJob(
+            trans_store,
+            source_lang or lang_controller.source_lang.code,
+            target_lang or lang_controller.target_lang.code,
+            on_done
+        )
+        self._jobs.append(job)
+        return job
+
+    def run(self):
+        """Pre-translate all the stores that were added, and return when
+            they are done."""
+        context = gobject.main_context_default()
+        # Make sure that we wake up regularly, even if nothing else happens
+        poll_id = gobject.timeout_add(self.POLL_INTERVAL, lambda: True)
+        try:
+            while self._jobs or self._running_jobs:
+                started = self._start_queries()
+                while context.pending():
+                    context.iteration(False)
+                finished = self._finish_queries()
+                if not started and not finished:
+                    context.iteration(True)
+        finally:
+            gobject.source_remove(poll_id)
+
+    def pretranslate_store(self, trans_store, source_lang=None, target_lang=None):
+        """Add the best TM match to every unit without a translation.
+
+            @returns: The number of units that received a translation."""
+        counts = []
+        self.add_store(trans_store, source_lang, target_lang, lambda store, count: counts.append(count))
+        self.run()
+        return counts[0]
+
+    def accept_response(self, tmmodel, query_str, matches):
+        """Remember the best match for the query.
+            (This method is used as Model-Controller communications)"""
+        if not self._emitting:
+            self._async_models.add(tmmodel)
+        query = self._queries.get(forceunicode(query_str), None)
+        if query is None:
+            # We stopped waiting for this query
+            return
+        query.models.discard(tmmodel)
+        for match in matches:
+            quality = int(match.get('quality', 0) or 0)
+            if quality < self.min_quality or not match.get('target'):
+                continue
+            if query.best is None or quality > int(query.best.get('quality', 0) or 0):
+                query.best = match
+
+    def _start_job(self, job):
+        lang_controller = self.main_controller.lang_controller
+        if (job.source_lang, job.target_lang) != (lang_controller.source_lang.code, lang_controller.target_lang.code):
+            self._answers = {}
+            lang_controller.set_languages(job.source_lang, job.target_lang)
+        self.main_controller.store_controller.set_store(job.trans_store)
+        job.started = True
+        self._running_jobs.append(job)
+
+    def _finish_job(self, job):
+        self._running_jobs.remove(job)
+        count = job.apply_matches()
+        logging.debug('Pre-translated %d units' % (count))
+        if job.on_done:
+            job.on_done(job.trans_store, count)
+
+    def _start_queries(self):
+        """Query the next sources until C{concurrency} queries are
+            outstanding.
+
+            @returns: The number of queries that were started."""
+        lang_controller = self.main_controller.lang_controller
+        started = 0
+        while self._jobs and len(self._queries) < self.concurrency:
+            job = self._jobs[0]
+            if not job.started:
+                if self._running_jobs and (job.source_lang, job.target_lang) != \
+                        (lang_controller.source_lang.code, lang_controller.target_lang.code):
+                    # The models query one language pair at a time
+                    break
+                self._start_job(job)
+            source = job.next_source()
+            if source is None:
+                self._jobs.pop(0)
+                continue
+
+            if source in self._answers:
+                # Another store had the same text
+                if self._answers[source] is not None:
+                    job.best_matches[source] = self._answers[source]
+                continue
+            job.pending += 1
+            query = self._queries.get(source, None)
+            if query is not None:
+                # Another store has the same text
+                query.jobs.append(job)
+                continue
+            query = Query(self.get_models(), time.time() + self.timeout)
+            query.jobs.append(job)
+            self._queries[source] = query
+            self._emitting = True
+            try:
+                self.emit('start-query', job.units_by_source[source][0])
+            finally:
+                self._emitting = False
+            started += 1
+        return started
+
+    def _finish_queries(self):
+        """Stop waiting for queries that all models answered, or that timed
+            out, and finish the jobs that have no more queries outstanding.
+
+            @returns: The number of queries that were finished."""
+        idle_models = set([model for model in self.get_models() if self._is_idle(model)])
+        now = time.time()
+        finished = 0
+        for source, query in self._queries.items():
+            query.models -= idle_models
+            if query.models and now < query.deadline:
+                continue
+            if query.models:
+                logging.debug('No answer for "%s" in time' % (source))
+            del self._queries[source]
+            self._answers[source] = query.best
+            finished += 1
+            for job in query.jobs:
+                job.pending -= 1
+                if query.best is not None:
+                    job.best_matches[source] = query.best
+        for job in list(self._running_jobs):
+            if job.is_done():
+                self._finish_job(job)
+        return finished
+
+    def _is_idle(self, model):
+        """Whether C{model} will not answer any of the outstanding queries
+            any more."""
+        clients = self._get_http_clients(model.__dict__.values())
+        if clients:
+            return not [client for client in clients if client.requests]
+        # Models that answer while the query is emitted are done with it.
+        # Others are waited for until they answered or the query times out.
+        return model not in self._async_models
+
+    def _get_http_clients(self, values):
+        try:
+            from virtaal.support.httpclient import HTTPClient
+        except ImportError:
+            return []
+        clients = []
+        for value in values:
+            if isinstance(value, HTTPClient):
+                clients.append(value)
+            elif isinstance(value, dict):
+                # Like the clients of the Moses model, by language pair
+                clients.extend(self._get_http_clients(value.values()))
+        return clients
+
+
+    # EVENT HANDLERS #
+    def _on_model_enabled(self, plugin_controller, model):
+        model.connect('match-found', self.accept_response)
+
+
+def get_tm_config():
+    """Return the configuration of the TM plug-in, as used by Virtaal."""
+    from virtaal.plugins.tm import Plugin
+    config = dict(Plugin.default_config)
+    config.update(pan_app.load_config(os.path.join(pan_app.get_config_dir(), "plugins.ini"), 'tm'))
+    return config
+
+
+def open_file(filename, source_lang=None, target_lang=None):
+    """Open C{filename} and determine its languages.
+
+        @returns: A tuple C{(store, source_lang, target_lang)}."""
+    from translate.storage import factory
+    store = factory.getobject(filename)
+    source_lang = source_lang or store.getsourcelanguage() or pan_app.settings.language['sourcelang']
+    target_lang = target_lang or store.gettargetlanguage() or pan_app.settings.language['targetlang']
+    if not target_lang:
+        raise ValueError('Unknown target language for %s' % (filename))
+    return store, source_lang, target_lang
+
+
+def save_file(store, filename, output=None):
+    if output is None or output == filename:
+        store.save()
+    else:
+        store.savefile(output)
+
+
+def pretranslate_file(pretranslator, filename, output=None, source_lang=None, target_lang=None):
+    """Pre-translate the file C{filename} and save it to C{output} (or back
+        to C{filename}).
+
+        @returns: The number of units that received a translation."""
+    store, source_lang, target_lang = open_file(filename, source_lang, target_lang)
+    count = pretranslator.pretranslate_store(store, source_lang, target_lang)
+    save_file(store, filename, output)
+    return count
+
+
+def main(argv):
+    from optparse import OptionParser
+    from virtaal import __version__
+
+    config = get_tm_config()
+    usage = "%prog [options] translation_file..."
+    parser = OptionParser(usage=usage, version=__version__.ver)
+    parser.add_option("-o", "--output", dest="output", metavar="PATH",
+            help="write the result to PATH instead of changing the file (a directory if more than one file is given)")
+    parser.add_option("--source-lang", dest="source_lang", metavar="CODE",
+            help="the source language, if the files don't specify it")
+    parser.add_option("--target-lang", dest="target_lang", metavar="CODE",
+            help="the target language, if the files don't specify it")
+    parser.add_option("-m", "--models", dest="models", metavar="NAMES",
+            help="comma separated list of TM models to use (default: those enabled in Virtaal)")
+    parser.add_option("-q", "--min-quality", dest="min_quality", type="int", default=int(config['min_quality']),
+            help="only use matches of at least this quality (default: %default)")
+    parser.add_option("-j", "--concurrency", dest="concurrency", type="int", default=15,
+            help="number of queries to have in flight at the same time (default: %default)")
+    parser.add_option("--timeout", dest="timeout", type="float", default=10,
+            help="seconds to wait for answers to a query (default: %default)")
+    parser.add_option("-D", "--debug", dest="debug", action="store_true", default=False,
+            help="show debugging output")
+    options, args = parser.parse_args(argv[1:])
+    if not args:
+        parser.error("no translation files given")
+    if options.output and len(args) > 1 and not os.path.isdir(options.output):
+        parser.error("--output must be a directory when more than one file is given")
+
+    pan_app.DEBUG = options.debug
+    logging.basicConfig(
+        level=options.debug and logging.DEBUG or logging.WARNING,
+        format='%(levelname)s %(message)s', stream=sys.stderr
+    )
+
+    main_controller = HeadlessMainController(
+        options.source_lang or pan_app.settings.language['sourcelang'],
+        options.target_lang or pan_app.settings.language['targetlang'] or 'und',
+    )
+    model_names = options.models and [name.strip() for name in options.models.split(',')] or None
+    pretranslator = Pretranslator(
+        main_controller,
+        model_names=model_names,
+        disabled_models=config['disabled_models'].split(','),
+        min_quality=options.min_quality,
+        max_matches=int(config['max_matches']),
+        concurrency=max(1, options.concurrency),
+        timeout=options.timeout,
+    )
+    if not pretranslator.get_models():
+        print >> sys.stderr, "No TM models could be loaded"
+        return 1
+
+    errors = []
+    start = time.time()
+
+    def on_done(store, count, filename, output):
+        try:
+            save_file(store, filename, output)
+        except Exception, e:
+            logging.exception('Could not save %s' % (filename))
+            print >> sys.stderr, "%s: %s" % (filename, e)
+            errors.append(filename)
+            return
+        print "%s: %d units pre-translated in %.1fs" % (filename, count, time.time() - start)
+
+    try:
+        for filename in args:
+            output = options.output
+            if output and os.path.isdir(output):
+                output = os.path.join(output, os.path.basename(filename))
+            try:
+                store, source_lang, target_lang = open_file(filename, options.source_lang, options.target_lang)
+            except Exception, e:
+                logging.exception('Could not open %s' % (filename))
+                print >> sys.stderr, "%s: %s" % (filename, e)
+                errors.append(filename)
+                continue
+            pretranslator.add_store(
+                store, source_lang, target_lang,
+                lambda store, count, filename=filename, output=output: on_done(store, count, filename, output)
+            )
+        pretranslator.run()
+    finally:
+        pretranslator.destroy()
+    return errors and 1 or 0
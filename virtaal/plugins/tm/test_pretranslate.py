@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import gobject
+from translate.storage import po
+
+from virtaal.common import GObjectWrapper
+
+from pretranslate import HeadlessMainController, Pretranslator
+
+
+po_contents = """msgid "File"
+msgstr ""
+
+msgid "Edit"
+msgstr ""
+
+msgid "View"
+msgstr "Bekyk"
+
+msgid "Help"
+msgstr ""
+"""
+
+memory = {
+    u'File': [
+        {'source': u'File', 'target': u'Lêer', 'quality': 80},
+        {'source': u'File', 'target': u'Leêr', 'quality': 100},
+    ],
+    u'Edit': [
+        {'source': u'Edit', 'target': u'Redigeer', 'quality': 60},
+    ],
+}
+
+
+class StubTMModel(GObjectWrapper):
+    """Answers queries from a dictionary, either immediately or from an idle
+        callback like models that wait for a server."""
+
+    __gtype_name__ = 'StubTMModel'
+    __gsignals__ = {
+        'match-found': (gobject.SIGNAL_RUN_FIRST, None, (object, object))
+    }
+
+    def __init__(self, controller, delayed=False):
+        GObjectWrapper.__init__(self)
+        self.delayed = delayed
+        self.queries = []
+        controller.connect('start-query', self.query)
+
+    def query(self, controller, unit):
+        query_str = unicode(unit.source)
+        self.queries.append(query_str)
+        if query_str not in memory:
+            return
+        if self.delayed:
+            gobject.idle_add(self.emit, 'match-found', query_str, memory[query_str])
+        else:
+            self.emit('match-found', query_str, memory[query_str])
+
+
+class StubPretranslator(Pretranslator):
+    def _load_models(self, model_names):
+        self.models = []
+
+    def get_models(self):
+        return self.models
+
+    def add_model(self, delayed=False):
+        model = StubTMModel(self, delayed)
+        model.connect('match-found', self.accept_response)
+        self.models.append(model)
+        return model
+
+
+class TestPretranslator(object):
+    def setup_method(self, method):
+        self.main_controller = HeadlessMainController('en', 'af')
+        self.pretranslator = StubPretranslator(self.main_controller, min_quality=75, timeout=5)
+
+    def test_accept_response(self):
+        model = self.pretranslator.add_model()
+        store = po.pofile.parsestring(po_contents)
+        self.pretranslator.add_store(store)
+        self.pretranslator._start_queries()
+        assert model.queries == [u'File', u'Edit', u'Help']
+        # The best match is kept, matches below the threshold are ignored
+        assert self.pretranslator._queries[u'File'].best['target'] == u'Leêr'
+        assert self.pretranslator._queries[u'Edit'].best is None
+        # Answers to queries that are not outstanding are ignored
+        self.pretranslator.accept_response(model, u'View', memory[u'File'])
+        assert u'View' not in self.pretranslator._queries
+
+    def test_pretranslate_store(self):
+        self.pretranslator.add_model()
+        store = po.pofile.parsestring(po_contents)
+        assert self.pretranslator.pretranslate_store(store) == 1
+        assert store.units[0].target == u'Leêr'
+        assert store.units[0].isfuzzy()
+        assert not store.units[1].target
+        assert store.units[2].target == u'Bekyk'
+
+    def test_pretranslate_stores_delayed(self):
+        """Answers that arrive later are waited for, and queries for the
+            same text in several stores are only sent once."""
+        self.pretranslator.concurrency = 2
+        # The model does not answer for "Help"
+        self.pretranslator.timeout = 0.5
+        model = self.pretranslator.add_model(delayed=True)
+        stores = [po.pofile.parsestring(po_contents) for i in range(2)]
+        counts = []
+        for store in stores:
+            self.pretranslator.add_store(store, on_done=lambda store, count: counts.append(count))
+        self.pretranslator.run()
+        assert counts == [1, 1]
+        assert sorted(model.queries) == [u'Edit', u'File', u'Help']
+        for store in stores:
+            assert store.units[0].target == u'Leêr'
@@ -34,9 +34,9 @@ class TMController(BaseController):
         'start-query': (gobject.SIGNAL_RUN_FIRST, None, (object,))
     }
 
-    QUERY_DELAY = 300
-    """The delay after a unit is selected (C{Cursor}'s "cursor-changed" event)
-        before the TM is queried."""
+    QUERY_DELAY = 150
+    """The delay after the cursor settled on a unit (C{Cursor}'s
+        "cursor-settled" event) before the TM is queried."""
 
     # INITIALIZERS #
     def __init__(self, main_controller, config={}):
@@ -147,8 +147,8 @@ class TMController(BaseController):
 
         # Disconnect signals
         self.main_controller.store_controller.disconnect(self._store_loaded_id)
-        if getattr(self, '_cursor_changed_id', None):
-            self.main_controller.store_controller.cursor.disconnect(self._cursor_changed_id)
+        if getattr(self, '_cursor_settled_id', None):
+            self.main_controller.store_controller.cursor.disconnect(self._cursor_settled_id)
         if getattr(self, '_mode_selected_id', None):
             self.main_controller.mode_controller.disconnect(self._mode_selected_id)
         if getattr(self, '_target_focused_id', None):
@@ -202,7 +202,7 @@ class TMController(BaseController):
 
 
     # EVENT HANDLERS #
-    def _on_cursor_changed(self, cursor):
+    def _on_cursor_settled(self, cursor):
         self.storecursor = cursor
         if cursor is None:
             # this can happen if we close a big file before it finished loading
@@ -224,21 +224,21 @@ class TMController(BaseController):
         self.view.update_geometry()
 
     def _on_store_closed(self, storecontroller):
-        if hasattr(self, '_cursor_changed_id') and self.storecursor:
-            self.storecursor.disconnect(self._cursor_changed_id)
+        if hasattr(self, '_cursor_settled_id') and self.storecursor:
+            self.storecursor.disconnect(self._cursor_settled_id)
         self.storecursor = None
-        self._cursor_changed_id = 0
+        self._cursor_settled_id = 0
         self.view.hide()
 
     def _on_store_loaded(self, storecontroller):
         """Disconnect from the previous store's cursor and connect to the new one."""
-        if getattr(self, '_cursor_changed_id', None) and self.storecursor:
-            self.storecursor.disconnect(self._cursor_changed_id)
+        if getattr(self, '_cursor_settled_id', None) and self.storecursor:
+            self.storecursor.disconnect(self._cursor_settled_id)
         self.storecursor = storecontroller.cursor
-        self._cursor_changed_id = self.storecursor.connect('cursor-changed', self._on_cursor_changed)
+        self._cursor_settled_id = self.storecursor.connect('cursor-settled', self._on_cursor_settled)
 
         def handle_first_unit():
-            self._on_cursor_changed(self.storecursor)
+            self._on_cursor_settled(self.storecursor)
             return False
         gobject.idle_add(handle_first_unit)
 
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""A compact set of non-negative integers, stored as the bits of a Python
+long.
+
+Unions and intersections of sets with a million members are single C-level
+operations on the long. A L{Bitset} can also be used as a sorted sequence:
+C{bitset[pos]} returns the member at position C{pos} and L{Bitset.rank()}
+returns the position of a member, so it can be used in place of a sorted list
+of indexes.
+
+A Python long can't be changed in place, so L{Bitset.add()} and
+L{Bitset.discard()} copy it, and also shift the cached sorted list of members
+if there is one. They are O(n), although with a small constant (about 50us
+for a million members). This is fine for changing a few members after an
+edit, but large sets should be built at once with the constructor or the set
+operations."""
+
+from binascii import hexlify, unhexlify
+from bisect import bisect_left, insort
+
+
+# The positions of the set bits in every byte value
+_BYTE_BITS = [tuple([bit for bit in range(8) if value & (1 << bit)]) for value in range(256)]
+
+
+class Bitset(object):
+    """A set of non-negative integers that also behaves like a sorted list."""
+
+    __slots__ = ('_bits', '_len', '_positions')
+
+    # INITIALIZERS #
+    def __init__(self, iterable=()):
+        self._set_bits(_bits_from_iterable(iterable))
+
+    @classmethod
+    def from_bits(cls, bits):
+        """Create a set from a long with the bits of its members set."""
+        bitset = cls.__new__(cls)
+        bitset._set_bits(bits)
+        return bitset
+
+    @classmethod
+    def from_range(cls, stop):
+        """Create the set C{[0, stop)}."""
+        return cls.from_bits((1 << stop) - 1)
+
+    def _set_bits(self, bits):
+        self._bits = bits
+        self._len = None
+        self._positions = None
+
+
+    # SPECIAL METHODS #
+    def __len__(self):
+        if self._len is None:
+            self._len = bin(self._bits).count('1')
+        return self._len
+
+    def __nonzero__(self):
+        return self._bits != 0
+
+    def __contains__(self, value):
+        return value >= 0 and bool(self._bits >> value & 1)
+
+    def __iter__(self):
+        return iter(self._get_positions())
+
+    def __getitem__(self, pos):
+        """Return the member at (sorted) position C{pos}."""
+        return self._get_positions()[pos]
+
+    def __eq__(self, other):
+        if isinstance(other, Bitset):
+            return self._bits == other._bits
+        return NotImplemented
+
+    def __ne__(self, other):
+        if isinstance(other, Bitset):
+            return self._bits != other._bits
+        return NotImplemented
+
+    def __or__(self, other):
+        return Bitset.from_bits(self._bits | other._bits)
+
+    def __and__(self, other):
+        return Bitset.from_bits(self._bits & other._bits)
+
+    def __sub__(self, other):
+        return Bitset.from_bits(self._bits & ~other._bits)
+
+    def __repr__(self):
+        return 'Bitset(%r)' % (list(self))
+
+
+    # ACCESSORS #
+    def get_bits(self):
+        return self._bits
+
+    def _get_positions(self):
+        """Return the members as a sorted list, which is cached until the
+            set changes."""
+        if self._positions is None:
+            self._positions = _bit_positions(self._bits)
+        return self._positions
+
+
+    # METHODS #
+    def add(self, value):
+        """Add C{value}, keeping the cached length and positions up to
+            date. This is O(n), since the long and the cached positions are
+            copied or shifted."""
+        if value in self:
+            return
+        self._bits |= 1 << value
+        if self._len is not None:
+            self._len += 1
+        if self._positions is not None:
+            insort(self._positions, value)
+
+    def discard(self, value):
+        """Remove C{value} if it is a member. Like L{add()}, this is O(n)."""
+        if value not in self:
+            return
+        self._bits &= ~(1 << value)
+        if self._len is not None:
+            self._len -= 1
+        if self._positions is not None:
+            del self._positions[bisect_left(self._positions, value)]
+
+    def copy(self):
+        return Bitset.from_bits(self._bits)
+
+    def rank(self, value):
+        """Return the number of members smaller than C{value}. This is the
+            position of C{value} if it is a member, or the position where it
+            would be inserted otherwise (like C{bisect.bisect_left()}).
+
+            The first call builds the cached positions in O(n), after which
+            this is a O(log n) bisection until the set is rebuilt."""
+        if value <= 0:
+            return 0
+        return bisect_left(self._get_positions(), value)
+
+    def union(self, *others):
+        bits = self._bits
+        for other in others:
+            bits |= other._bits
+        return Bitset.from_bits(bits)
+
+    def intersection(self, *others):
+        bits = self._bits
+        for other in others:
+            bits &= other._bits
+        return Bitset.from_bits(bits)
+
+
+def _bits_from_iterable(iterable):
+    # Setting bits one by one in a long would copy the whole long every time
+    data = bytearray()
+    for value in iterable:
+        byte = value >> 3
+        if byte >= len(data):
+            data.extend('\0' * (byte + 1 - len(data)))
+        data[byte] |= 1 << (value & 7)
+    if not data:
+        return 0
+    data.reverse()
+    return int(hexlify(str(data)), 16)
+
+def _bit_positions(bits):
+    if not bits:
+        return []
+    hexbits = '%x' % bits
+    if len(hexbits) % 2:
+        hexbits = '0' + hexbits
+    data = unhexlify(hexbits)
+    positions = []
+    extend = positions.extend
+    last = len(data) - 1
+    # The least significant byte is at the end of the string
+    for i in xrange(last, -1, -1):
+        byte = ord(data[i])
+        if byte:
+            base = (last - i) * 8
+            extend([base + bit for bit in _BYTE_BITS[byte]])
+    return positions
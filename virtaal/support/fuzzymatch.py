@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Fuzzy matching of many source strings against a set of existing
+translations, spread over several processes.
+
+Only plain strings are sent to the worker processes, so this works for any
+store format. Each worker builds its own L{translate.search.match.matcher}
+from the candidates once and then matches chunks of queries."""
+
+import logging
+import sys
+
+
+CHUNK_SIZE = 200
+"""The number of source strings sent to a worker process at a time."""
+
+_matcher = None
+
+
+def make_candidates(units):
+    """Return the candidate translations from C{units} as plain
+        C{(source, target, translator notes)} tuples."""
+    candidates = []
+    for unit in units:
+        if not unit.istranslatable() or not unit.istranslated() or unit.hasplural():
+            continue
+        candidates.append((
+            unicode(unit.source), unicode(unit.target),
+            unit.getnotes(origin="translator") or u""
+        ))
+    return candidates
+
+def find_matches(candidates, queries, min_similarity=75, processes=None, progress=None, cancelled=None):
+    """Find the best fuzzy match for every query.
+
+        @param candidates: A list of C{(source, target, notes)} tuples, as
+            returned by L{make_candidates()}.
+        @param queries: A list of C{(key, source text)} tuples.
+        @param processes: The number of worker processes to use. C{None}
+            means one per CPU, and C{1} means that matching happens in the
+            calling thread.
+        @param progress: Called as C{progress(done, total)} after every chunk.
+        @param cancelled: Returns C{True} if matching should be stopped.
+        @returns: A dictionary mapping query keys to C{(target, notes)} of the
+            best match, or C{None} if matching was cancelled."""
+    chunks = [queries[i:i+CHUNK_SIZE] for i in xrange(0, len(queries), CHUNK_SIZE)]
+    if not chunks or not candidates:
+        return {}
+
+    pool = None
+    if getattr(sys, 'frozen', False):
+        # Frozen builds would start the whole application in every worker
+        processes = 1
+    if processes is None or processes > 1:
+        try:
+            import multiprocessing
+            pool = multiprocessing.Pool(processes, _init_matcher, (candidates, min_similarity))
+        except Exception, e:
+            # No multiprocessing support (like in some frozen builds)
+            logging.debug('Fuzzy matching in a single process: %s' % (e))
+            pool = None
+
+    if pool is None:
+        _init_matcher(candidates, min_similarity)
+        results = (_match_chunk(chunk) for chunk in chunks)
+    else:
+        results = pool.imap_unordered(_match_chunk, chunks)
+
+    matches = {}
+    done = 0
+    try:
+        for chunk_matches in results:
+            if cancelled and cancelled():
+                return None
+            matches.update(chunk_matches)
+            done += 1
+            if progress:
+                progress(done, len(chunks))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return matches
+
+
+def _init_matcher(candidates, min_similarity):
+    global _matcher
+    from translate.search import match
+    from translate.storage import base
+    store = base.TranslationStore()
+    for source, target, notes in candidates:
+        unit = base.TranslationUnit(source)
+        unit.target = target
+        if notes:
+            unit.addnote(notes, origin="translator")
+        store.addunit(unit)
+    _matcher = match.matcher(
+        store, max_candidates=1, min_similarity=min_similarity,
+        max_length=3000, usefuzzy=True
+    )
+    _matcher.addpercentage = False
+
+def _match_chunk(chunk):
+    matches = {}
+    for key, text in chunk:
+        candidates = _matcher.matches(text)
+        if candidates:
+            best = candidates[0]
+            matches[key] = (best.target, best.getnotes())
+    return matches
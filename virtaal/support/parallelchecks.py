@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Run the quality checks of a checker over all the units of a store,
+spread over several processes.
+
+Only plain strings are sent to the worker processes, so this works for any
+store format. Every worker creates its own checker from the checker class
+and target language once, and then checks chunks of units. The checkers in
+Virtaal are C{TranslationChecker}s, which only look at the source, target
+and locations of a unit."""
+
+import logging
+import sys
+
+
+CHUNK_SIZE = 500
+"""The number of units sent to a worker process at a time."""
+
+_checker = None
+
+
+class CheckUnit(object):
+    """A stand-in for a unit with just enough for
+        C{TranslationChecker.run_filters()}."""
+
+    def __init__(self, source, target, plural, locations):
+        self.source = source
+        self.target = target
+        self._plural = plural
+        self._locations = locations
+
+    def hasplural(self):
+        return self._plural
+
+    def getlocations(self):
+        return self._locations
+
+
+def make_check_units(units):
+    """Return the text of C{units} as plain
+        C{(source strings, target strings, has plural, locations)} tuples."""
+    check_units = []
+    for unit in units:
+        plural = unit.hasplural()
+        if plural:
+            sources = [unicode(s) for s in unit.source.strings]
+            targets = [unicode(s) for s in unit.target.strings]
+        else:
+            sources = [unicode(unit.source or u"")]
+            targets = [unicode(unit.target or u"")]
+        check_units.append((sources, targets, plural, unit.getlocations()))
+    return check_units
+
+def make_unit(check_unit):
+    """Return a L{CheckUnit} for a tuple from L{make_check_units()}."""
+    from translate.misc.multistring import multistring
+    sources, targets, plural, locations = check_unit
+    if plural:
+        return CheckUnit(multistring(sources), multistring(targets), True, locations)
+    return CheckUnit(sources[0], targets[0], False, locations)
+
+def run_checks(checker_class, target_language, units, processes=None, on_chunk=None, cancelled=None):
+    """Run the checks of C{checker_class} over all units.
+
+        @param units: A list of tuples as returned by L{make_check_units()}.
+            The checks that a unit fails are given by its index in this list.
+        @param processes: The number of worker processes to use. C{None}
+            means one per CPU, and C{1} means that checking happens in the
+            calling thread.
+        @param on_chunk: Called as C{on_chunk(failures, done, total)} for
+            every chunk of units, in order. C{failures} maps the index of
+            every unit in the chunk that fails checks to the result of
+            C{run_filters()} (check names and messages).
+        @param cancelled: Returns C{True} if checking should be stopped.
+        @returns: A dictionary mapping "check-" and the name of every check
+            that fails to the sorted list of indexes of the failing units,
+            or C{None} if checking was cancelled."""
+    chunks = [(i, units[i:i+CHUNK_SIZE]) for i in xrange(0, len(units), CHUNK_SIZE)]
+    if not chunks:
+        return {}
+
+    pool = None
+    if getattr(sys, 'frozen', False):
+        # Frozen builds would start the whole application in every worker
+        processes = 1
+    if processes is None or processes > 1:
+        try:
+            import multiprocessing
+            pool = multiprocessing.Pool(processes, _init_checker, (checker_class, target_language))
+        except Exception, e:
+            # No multiprocessing support (like in some frozen builds)
+            logging.debug('Checking units in a single process: %s' % (e))
+            pool = None
+
+    if pool is None:
+        _init_checker(checker_class, target_language)
+        results = (_check_chunk(chunk) for chunk in chunks)
+    else:
+        # imap() keeps the chunks in order, so that the lists stay sorted
+        results = pool.imap(_check_chunk, chunks)
+
+    checks = {}
+    done = 0
+    try:
+        for chunk_failures in results:
+            if cancelled and cancelled():
+                return None
+            for index in sorted(chunk_failures):
+                for name in chunk_failures[index]:
+                    checks.setdefault('check-' + name, []).append(index)
+            done += 1
+            if on_chunk:
+                on_chunk(chunk_failures, done, len(chunks))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return checks
+
+
+def _init_checker(checker_class, target_language):
+    global _checker
+    _checker = checker_class()
+    _checker.config.updatetargetlanguage(target_language)
+
+def _check_chunk(chunk):
+    start, units = chunk
+    failures = {}
+    for offset, check_unit in enumerate(units):
+        unit_failures = _checker.run_filters(make_unit(check_unit))
+        if unit_failures:
+            failures[start + offset] = unit_failures
+    return failures
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from bitset import Bitset
+
+
+def test_sequence():
+    bitset = Bitset([9, 0, 3, 64, 1000])
+    assert len(bitset) == 5
+    assert list(bitset) == [0, 3, 9, 64, 1000]
+    assert bitset[2] == 9 and bitset[-1] == 1000
+    assert 64 in bitset and 65 not in bitset and -1 not in bitset
+    assert bitset.rank(9) == 2
+    assert bitset.rank(10) == 3
+    assert bitset.rank(5000) == 5
+
+def test_operations():
+    odd = Bitset(range(1, 100, 2))
+    threes = Bitset(range(0, 100, 3))
+    assert list(odd | threes) == sorted(set(range(1, 100, 2)) | set(range(0, 100, 3)))
+    assert list(odd & threes) == range(3, 100, 6)
+    assert list(threes - odd) == range(0, 100, 6)
+    assert Bitset.from_range(4) == Bitset([0, 1, 2, 3])
+    assert not Bitset()
+
+def test_add_discard():
+    bitset = Bitset([1, 2])
+    assert bitset[0] == 1
+    bitset.add(0)
+    bitset.discard(2)
+    assert list(bitset) == [0, 1]
+    assert len(bitset) == 2
+    bitset.add(5)
+    assert bitset.rank(5) == 2 and bitset.rank(2) == 2
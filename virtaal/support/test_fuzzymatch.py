@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from virtaal.support import fuzzymatch
+
+
+candidates = [
+    (u"Open the file", u"Maak die lêer oop", u""),
+    (u"Save the file", u"Stoor die lêer", u"translator note"),
+]
+queries = [
+    (0, u"Open the files"),
+    (1, u"Something completely different"),
+]
+
+
+def test_find_matches_in_process():
+    matches = fuzzymatch.find_matches(candidates, queries, processes=1)
+    assert matches.keys() == [0]
+    assert matches[0][0] == u"Maak die lêer oop"
+
+
+def test_find_matches_in_pool():
+    done = []
+    matches = fuzzymatch.find_matches(candidates, queries, processes=2, progress=lambda d, t: done.append((d, t)))
+    assert matches.keys() == [0]
+    assert done == [(1, 1)]
+
+
+def test_find_matches_cancelled():
+    assert fuzzymatch.find_matches(candidates, queries, processes=1, cancelled=lambda: True) is None
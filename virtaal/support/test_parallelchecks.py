@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+from translate.filters import checks
+from translate.storage import po
+
+from virtaal.support import parallelchecks
+
+
+po_contents = """msgid "Open the file"
+msgstr "Maak die lêer oop"
+
+msgid "Save %s"
+msgstr "Stoor"
+
+msgid "Quit."
+msgstr "Maak toe"
+
+msgid "One file"
+msgid_plural "%d files"
+msgstr[0] "Een lêer"
+msgstr[1] "lêers"
+"""
+
+
+def _check_units():
+    store = po.pofile.parsestring(po_contents)
+    return store, parallelchecks.make_check_units(store.units)
+
+def _serial_checks(units):
+    checker = checks.StandardChecker()
+    checker.config.updatetargetlanguage('af')
+    result = {}
+    for index, unit in enumerate(units):
+        for name in checker.run_filters(unit):
+            result.setdefault('check-' + name, []).append(index)
+    return result
+
+
+def test_run_checks_in_process():
+    store, units = _check_units()
+    result = parallelchecks.run_checks(checks.StandardChecker, 'af', units, processes=1)
+    assert result == _serial_checks(store.units)
+    assert result['check-printf'] == [1]
+
+
+def test_run_checks_in_pool():
+    store, units = _check_units()
+    chunks = []
+    result = parallelchecks.run_checks(
+        checks.StandardChecker, 'af', units, processes=2,
+        on_chunk=lambda checks, done, total: chunks.append((done, total))
+    )
+    assert result == _serial_checks(store.units)
+    assert chunks == [(1, 1)]
+
+
+def test_run_checks_cancelled():
+    store, units = _check_units()
+    assert parallelchecks.run_checks(checks.StandardChecker, 'af', units, processes=1, cancelled=lambda: True) is None
@@ -19,13 +19,14 @@
 # along with this program; if not, see <http://www.gnu.org/licenses/>.
 
 
-import gtk
+import logging
 import threading
 import Queue
 
 
 def run_in_thread(widget, target, args):
     # Idea from tortoisehg's gtklib.py
+    import gtk
     q = Queue.Queue()
     def func(*kwargs):
         q.put(target(*kwargs))
@@ -49,3 +50,84 @@ def run_in_thread(widget, target, args):
     widget.set_sensitive(True)
     if q.qsize():
         return q.get(0)
+
+
+class BackgroundJob(object):
+    """Runs a function in a worker thread and hands its outcome back to the
+        gobject main loop.
+
+        The target is called as C{target(job, *args)} so that it can check
+        C{job.cancelled} and send partial results to the main loop with
+        C{job.post()}. The C{on_done} and C{on_error} callbacks are always
+        called on the main loop, and never if the job was cancelled."""
+
+    def __init__(self, target, args=(), on_done=None, on_error=None):
+        self.target = target
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self._cancelled = threading.Event()
+        self._outcome = None
+        self._thread = None
+
+    # ACCESSORS #
+    def _get_cancelled(self):
+        return self._cancelled.isSet()
+    cancelled = property(_get_cancelled)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.isAlive()
+
+    # METHODS #
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Ask the job to stop. Nothing that the job posts after this will be
+            delivered."""
+        self._cancelled.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def post(self, func, *args):
+        """Call C{func(*args)} on the main loop, unless the job is cancelled
+            by then."""
+        from gobject import idle_add
+        def deliver():
+            if not self.cancelled:
+                func(*args)
+            return False
+        idle_add(deliver)
+
+    def wait(self):
+        """Block until the job has finished, and call its C{on_done} or
+            C{on_error} callback right away instead of on the main loop.
+
+            This must be called from the main thread."""
+        self.join()
+        if not self.cancelled:
+            self._deliver_outcome()
+
+    def _run(self):
+        try:
+            result = self.target(self, *self.args)
+        except Exception, exc:
+            logging.exception('Background job %r failed' % (self.target))
+            self._outcome = (self.on_error, exc)
+        else:
+            self._outcome = (self.on_done, result)
+        self.post(self._deliver_outcome)
+
+    def _deliver_outcome(self):
+        if self._outcome is None:
+            # Already delivered by wait()
+            return
+        callback, value = self._outcome
+        self._outcome = None
+        if callback:
+            callback(value)
@@ -38,3 +38,46 @@ class TestCursor(TestScaffolding):
         assert cursor.pos == 0
         cursor.move(2)
         assert cursor.pos == 0
+
+    def test_bitset_indices(self):
+        from virtaal.support.bitset import Bitset
+        cursor = self.store_controller.cursor
+        indices = Bitset([0, 2])
+        cursor.indices = indices
+        assert cursor.indices is indices
+        cursor.index = 2
+        assert cursor.pos == 1
+        cursor.force_index(1)
+        assert list(cursor.indices) == [0, 1, 2]
+        assert cursor.index == 1
+
+    def test_add_remove_index(self):
+        from virtaal.support.bitset import Bitset
+        cursor = self.store_controller.cursor
+        cursor.indices = Bitset([0, 2])
+        cursor.index = 2
+        cursor.add_index(1)
+        assert cursor.index == 2 and cursor.pos == 2
+        cursor.remove_index(0)
+        assert cursor.index == 2 and cursor.pos == 1
+        # The current index stays valid until the cursor moves away
+        cursor.remove_index(2)
+        assert list(cursor.indices) == [1, 2]
+        cursor.index = 1
+        assert list(cursor.indices) == [1]
+
+    def test_settled(self):
+        import gobject
+        import time
+        from virtaal.controllers.cursor import Cursor
+        cursor = Cursor(range(5), range(5), settle_delay=10)
+        settled = []
+        cursor.connect('cursor-settled', lambda cursor: settled.append(cursor.index))
+        cursor.move(1)
+        cursor.move(1)
+        time.sleep(0.05)
+        context = gobject.main_context_default()
+        while context.pending():
+            context.iteration(False)
+        # Only emitted once, for where the cursor stopped
+        assert settled == [2]
@@ -28,7 +28,7 @@ from baseview import BaseView
 
 def _statistics(stats):
     """return string tuples (Description, value) when given the output of
-    statsdb.StatsCache::file_extended_totals"""
+    StoreModel.get_stats_totals()"""
     descriptions = {
             "empty": _("Untranslated:"),
             "needs-work": _("Needs work:"),
@@ -90,6 +90,12 @@ class StoreView(BaseView):
 
 
     # METHODS #
+    def add_units(self, start, count):
+        """Show units that were added to the store (during a progressive load)."""
+        model = self._treeview.get_model()
+        if model is not None:
+            model.add_rows(start, count)
+
     def hide(self):
         self.parent_widget.props.visible = False
         self.load_store(None)
@@ -116,7 +122,8 @@ class StoreView(BaseView):
         if not self._treeview.parent:
             self.parent_widget.add(self._treeview)
         self.parent_widget.show_all()
-        if not self.controller.get_store():
+        if not self.controller.get_store() or len(self.controller.get_store()) < 1:
+            # Nothing to select (yet)
             return
         self._treeview.select_index(0)
 
@@ -465,7 +465,7 @@ class UnitView(gtk.EventBox, GObjectWrapper, gtk.CellEditable, BaseView):
         return scrollwnd
 
     def _create_workflow_liststore(self):
-        workflow = self.controller.current_unit._workflow
+        workflow = self.controller.get_current_workflow()
         lst = gtk.ListStore(str, object)
         if not workflow:
             return lst
@@ -643,7 +643,7 @@ class UnitView(gtk.EventBox, GObjectWrapper, gtk.CellEditable, BaseView):
 
     # EVENT HANLDERS #
     def _on_state_changed(self, listnav, newstate):
-        if self.controller.current_unit._workflow:
+        if self.controller.get_current_workflow():
             self.controller.set_current_state(newstate, from_user=True)
         self.modified()
 
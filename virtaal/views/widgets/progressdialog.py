@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016 Zuza Software Foundation
+#
+# This file is part of Virtaal.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+import gtk
+from gobject import SIGNAL_RUN_FIRST
+
+from virtaal.common import GObjectWrapper
+
+
+class ProgressDialog(GObjectWrapper):
+    """
+    A modal dialog showing the progress of a long-running background task,
+    with a button to cancel it.
+    """
+
+    __gtype_name__ = 'ProgressDialog'
+    __gsignals__ = {
+        'cancelled': (SIGNAL_RUN_FIRST, None, ()),
+    }
+
+    # INITIALIZERS #
+    def __init__(self, title=None, message=None, parent=None):
+        super(ProgressDialog, self).__init__()
+        self._create_gui(title, message, parent)
+
+    def _create_gui(self, title, message, parent):
+        self.dialog = gtk.Dialog()
+        self.dialog.set_modal(True)
+        self.dialog.set_resizable(False)
+        self.dialog.set_deletable(False)
+        if isinstance(parent, gtk.Widget):
+            self.dialog.set_transient_for(parent)
+        self.dialog.set_title(title is not None and title or '')
+
+        self.message = gtk.Label(message is not None and message or '')
+        self.message.set_alignment(0, 0.5)
+        self.dialog.child.pack_start(self.message, expand=False, fill=False, padding=10)
+        self.progressbar = gtk.ProgressBar()
+        self.progressbar.set_size_request(350, -1)
+        self.dialog.child.pack_start(self.progressbar, expand=False, fill=False, padding=10)
+
+        self.dialog.add_buttons(gtk.STOCK_CANCEL, gtk.RESPONSE_CANCEL)
+        self.dialog.connect('response', self._on_response)
+
+
+    # METHODS #
+    def set_progress(self, fraction, text=None):
+        """Show the given progress. A C{fraction} of C{None} pulses the bar
+            for work of unknown length."""
+        if fraction is None:
+            self.progressbar.pulse()
+        else:
+            self.progressbar.set_fraction(max(0.0, min(1.0, fraction)))
+        if text is not None:
+            self.progressbar.set_text(text)
+
+    def show(self):
+        self.dialog.show_all()
+
+    def destroy(self):
+        self.dialog.destroy()
+
+
+    # EVENT HANDLERS #
+    def _on_response(self, dialog, response):
+        if response in (gtk.RESPONSE_CANCEL, gtk.RESPONSE_DELETE_EVENT):
+            self.dialog.set_response_sensitive(gtk.RESPONSE_CANCEL, False)
+            self.emit('cancelled')
@@ -32,7 +32,7 @@ class StoreTreeModel(gtk.GenericTreeModel):
     def __init__(self, storemodel):
         gtk.GenericTreeModel.__init__(self)
         self._store = storemodel
-        self._store_len = len(storemodel)
+        self._store_len = max(len(storemodel), 0)
         self._current_editable = 0
 
     def on_get_flags(self):
@@ -102,6 +102,14 @@ class StoreTreeModel(gtk.GenericTreeModel):
 
     # Non-model-interface methods
 
+    def add_rows(self, start, count):
+        """Make the C{count} units appended to the store from C{start} onwards
+            visible as rows."""
+        self._store_len = start + count
+        for store_index in xrange(start, start + count):
+            path = self.store_index_to_path(store_index)
+            self.row_inserted(path, self.get_iter(path))
+
     def set_editable(self, new_path):
         old_path = (self._current_editable,)
         self._current_editable = new_path[0]
@@ -57,6 +57,8 @@ class StoreTreeView(gtk.TreeView):
         # be better off writing better code. I'm sorry to leave it
         # to you.
         self._waiting_for_row_change = 0
+        # Keyboard moves that came in while waiting for the row to change
+        self._pending_move = 0
 
     def _enable_tooltips(self):
         if hasattr(self, "set_tooltip_column"):
@@ -114,6 +116,10 @@ class StoreTreeView(gtk.TreeView):
             def change_cursor():
                 self.set_cursor(newpath, self.get_columns()[0], start_editing=True)
                 self._waiting_for_row_change -= 1
+                if self._waiting_for_row_change == 0 and self._pending_move:
+                    offset = self._pending_move
+                    self._pending_move = 0
+                    self._keyboard_move(offset)
             self._waiting_for_row_change += 1
             gobject.idle_add(change_cursor, priority=gobject.PRIORITY_DEFAULT_IDLE)
 
@@ -122,6 +128,7 @@ class StoreTreeView(gtk.TreeView):
             model = StoreTreeModel(storemodel)
         else:
             model = None
+        self._pending_move = 0
         super(StoreTreeView, self).set_model(model)
 
     def _keyboard_move(self, offset):
@@ -133,7 +140,10 @@ class StoreTreeView(gtk.TreeView):
         # keep track of pending draw events. In reality, it should be impossible for
         # self._waiting_for_row_change to be larger than 1, but my superstition led me
         # to be safe about it.
+        # Moves that come in the meantime (like with key repeat) are added up
+        # and done as one move once the row changed, instead of being lost.
         if self._waiting_for_row_change > 0:
+            self._pending_move += offset
             return True
 
         try: